@@ -0,0 +1,125 @@
+"""
+Push delivery of task completion.
+
+Celery tasks publish a small event on a Redis pub/sub channel per task when they finish,
+so SSE and long-poll clients wait on a subscription instead of polling the result backend.
+Clients that registered a `callback_url` get the final result POSTed to it instead.
+"""
+import os
+import json
+import hmac
+import time
+import socket
+import hashlib
+import logging
+import ipaddress
+import urllib.request
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from typing import Dict, Any, Optional
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "neutrix-task-events:"
+
+_redis = None
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        if not REDIS_AVAILABLE:
+            raise ImportError("redis is required for task events")
+        url = os.environ.get("EVENTS_REDIS_URL") or os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+        _redis = redis.Redis.from_url(url)
+    return _redis
+
+def task_channel(task_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{task_id}"
+
+def publish_task_event(task_id: str, state: str):
+    try:
+        get_redis().publish(task_channel(task_id), json.dumps({"task_id": task_id, "state": state}))
+    except Exception as e:
+        # Subscribers fall back to re-reading the task state on their keepalive tick
+        logger.warning(f"Could not publish completion event for task {task_id}: {e}")
+
+@contextmanager
+def task_subscription(*task_ids: str):
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    try:
+        if task_ids:
+            pubsub.subscribe(*[task_channel(task_id) for task_id in task_ids])
+        yield pubsub
+    finally:
+        pubsub.close()
+
+def wait_for_event(pubsub, timeout: float) -> Optional[Dict[str, Any]]:
+    """Blocks on the subscription for up to `timeout` seconds, returns the event or None."""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        # Returns early (None) on ignored subscribe confirmations, hence the loop
+        message = pubsub.get_message(timeout=remaining)
+        if message and message.get("type") == "message":
+            return json.loads(message["data"])
+
+
+def validate_callback_url(url: str) -> str:
+    """
+    Accepts http(s) URLs, restricted to WEBHOOK_ALLOWED_HOSTS when that is set.
+    Webhooks carry full extraction results, so hosts resolving to loopback, private, link-local
+    or otherwise non-public addresses (e.g. 169.254.169.254) are refused unless allowlisted.
+    Checked again right before every delivery, since DNS may have changed in between.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("callback_url must be an http(s) URL")
+    host = parsed.hostname.lower()
+    allowed = [name.strip().lower() for name in os.environ.get("WEBHOOK_ALLOWED_HOSTS", "").split(",") if name.strip()]
+    if allowed:
+        if host not in allowed:
+            raise ValueError(f"callback_url host {parsed.hostname} is not allowed")
+        return url
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parsed.port or None, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"callback_url host {parsed.hostname} does not resolve")
+    for address in addresses:
+        # Scoped IPv6 addresses come back as "fe80::1%eth0"
+        if not ipaddress.ip_address(address.split("%")[0]).is_global:
+            raise ValueError(f"callback_url host {parsed.hostname} resolves to a non-public address")
+    return url
+
+class _NoRedirects(urllib.request.HTTPRedirectHandler):
+    # A redirect could point the result at a host validate_callback_url never saw
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+_opener = urllib.request.build_opener(_NoRedirects)
+
+def post_webhook(url: str, payload: Dict[str, Any]):
+    """
+    POSTs a JSON payload. With WEBHOOK_SECRET set, the body is signed with HMAC-SHA256
+    in the X-Neutrix-Signature header so receivers can verify where it came from.
+    Redirects are not followed.
+    """
+    validate_callback_url(url)
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "User-Agent": "neutrix-webhooks"}
+    secret = os.environ.get("WEBHOOK_SECRET")
+    if secret:
+        headers["X-Neutrix-Signature"] = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    # 3xx answers are not followed and fail the delivery (HTTPError)
+    with _opener.open(request, timeout=float(os.environ.get("WEBHOOK_TIMEOUT", 10))) as response:
+        if not 200 <= response.status < 300:
+            raise IOError(f"Webhook {url} answered {response.status}")
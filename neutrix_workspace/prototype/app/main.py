@@ -1,8 +1,12 @@
 from flask import Flask
 import os
+import sys
 import logging
 from celery import Celery
 from utils.logger import setup_logging
+from pipeline.warmup import start_warmup
+from pipeline.preload import preload_enabled, preload_models
+from app.results import configure_result_backend
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -11,9 +15,15 @@ def make_celery(app):
     celery = Celery(
         app.import_name,
         backend=app.config['CELERY_RESULT_BACKEND'],
-        broker=app.config['CELERY_BROKER_URL']
+        broker=app.config['CELERY_BROKER_URL'],
+        # Imported by the worker at start-up, which also connects the warm-up signal handler
+        include=['app.tasks', 'app.staged_tasks']
     )
     celery.conf.update(app.config)
+    # Result expiry and serialization, see app/results.py
+    configure_result_backend(celery)
+    # Pool children warm their models up in worker_process_init, which must finish within this timeout
+    celery.conf.worker_proc_alive_timeout = float(os.environ.get("WARMUP_TIMEOUT", 300))
     
     class ContextTask(celery.Task):
         def __call__(self, *args, **kwargs):
@@ -53,4 +63,33 @@ def create_app():
     from . import routes
     app.register_blueprint(routes.bp)
     
+    # Celery imports this factory too; its pool children warm up after fork instead (see app/tasks.py)
+    if _running_under_celery():
+        pass
+    elif preload_enabled() and _running_under_gunicorn():
+        # Loaded once in the gunicorn master (preload_app), workers warm up in post_fork (see gunicorn.conf.py)
+        preload_models(routes.extractor)
+    elif _running_in_reloader_parent():
+        # The debug reloader's parent only watches files, the child it spawns serves and warms up
+        logger.info("Skipping warm-up in the debug reloader's parent process.")
+    else:
+        start_warmup(routes.extractor)
+    
     return app
+
+def _running_under_celery() -> bool:
+    return os.path.basename(sys.argv[0]).startswith("celery")
+
+def _running_under_gunicorn() -> bool:
+    return os.path.basename(sys.argv[0]).startswith("gunicorn")
+
+def _running_in_reloader_parent() -> bool:
+    # run.py defaults to debug, the flask CLI does not; the reloader marks its child with WERKZEUG_RUN_MAIN
+    entrypoint = os.path.basename(sys.argv[0])
+    if entrypoint == "run.py":
+        debug = os.environ.get("FLASK_DEBUG", "True")
+    elif entrypoint == "flask":
+        debug = os.environ.get("FLASK_DEBUG", "False")
+    else:
+        return False
+    return debug.lower() in ("true", "1") and not os.environ.get("WERKZEUG_RUN_MAIN")
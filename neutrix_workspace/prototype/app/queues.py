@@ -0,0 +1,129 @@
+"""
+Celery queue routing by pipeline stage and request priority.
+
+With TASK_ROUTING enabled, OCR/regex work and Donut fallbacks go to separate queues so each
+can get its own worker pool, and every stage has an interactive and a bulk queue:
+
+    documents, documents.bulk   process_document_async / process_documents_batch_async
+    donut, donut.bulk           enrich_with_donut_async
+    webhooks                    deliver_webhook
+
+With STAGED_PIPELINE as well, each stage of app.staged_tasks gets a pipeline.<stage> queue
+(and pipeline.<stage>.bulk); its Donut stage shares the donut queues.
+
+Disabled (the default), every task stays on Celery's default queue as before.
+"""
+import os
+import json
+import time
+import logging
+from typing import Dict, Any, Optional, List
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("interactive", "bulk")
+STAGES = ("documents", "donut")
+WEBHOOK_QUEUE = "webhooks"
+PIPELINE_STAGES = ("rasterize", "preprocess", "ocr", "parse", "persist")
+# Queue waits reported by workers, newest first, trimmed to WAIT_SAMPLES per queue
+WAIT_KEY_PREFIX = "neutrix-queue-wait:"
+WAIT_SAMPLES = 200
+
+def routing_enabled() -> bool:
+    return os.environ.get("TASK_ROUTING", "False").lower() == "true"
+
+def staged_pipeline_enabled() -> bool:
+    return os.environ.get("STAGED_PIPELINE", "False").lower() == "true"
+
+def normalize_priority(priority: Optional[str]) -> str:
+    priority = (priority or "interactive").strip().lower()
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    return priority
+
+def queue_for(stage: str, priority: str = "interactive") -> Optional[str]:
+    """Queue for a stage and priority, or None (Celery's default queue) when routing is disabled."""
+    if not routing_enabled():
+        return None
+    if stage == WEBHOOK_QUEUE:
+        return WEBHOOK_QUEUE
+    return stage if priority == "interactive" else f"{stage}.bulk"
+
+def stage_queue(stage: str, priority: str = "interactive") -> Optional[str]:
+    """Queue of a staged pipeline task."""
+    return queue_for("donut" if stage == "donut" else f"pipeline.{stage}", priority)
+
+def all_queues() -> List[str]:
+    if not routing_enabled():
+        return ["celery"]
+    stages = list(STAGES)
+    if staged_pipeline_enabled():
+        stages += [f"pipeline.{stage}" for stage in PIPELINE_STAGES]
+    return [queue_for(stage, priority) for stage in stages for priority in PRIORITIES] + [WEBHOOK_QUEUE]
+
+_redis = None
+
+def _broker_redis():
+    global _redis
+    if _redis is None:
+        url = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
+        if not REDIS_AVAILABLE or not url.startswith(("redis://", "rediss://", "unix://")):
+            return None
+        _redis = redis.Redis.from_url(url)
+    return _redis
+
+def record_wait(queue: str, enqueued_at: float):
+    """Called by workers as a task starts, with the publish time stamped on its message."""
+    client = _broker_redis()
+    if client is None:
+        return
+    try:
+        key = WAIT_KEY_PREFIX + queue
+        with client.pipeline() as pipe:
+            pipe.lpush(key, round(time.time() - enqueued_at, 3))
+            pipe.ltrim(key, 0, WAIT_SAMPLES - 1)
+            pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not record queue wait for {queue}: {e}")
+
+def queue_stats() -> Dict[str, Any]:
+    """
+    Per queue: messages waiting (depth), age of the oldest waiting message, and the
+    p50/p95 wait of recently started tasks, to size each worker pool independently.
+    Only available on a Redis broker.
+    """
+    client = _broker_redis()
+    if client is None:
+        return {}
+    stats = {}
+    now = time.time()
+    for queue in all_queues():
+        try:
+            # Kombu pushes on the left and workers pop from the right, so the oldest message is last
+            depth = client.llen(queue)
+            oldest = client.lindex(queue, -1)
+            waits = sorted(float(wait) for wait in client.lrange(WAIT_KEY_PREFIX + queue, 0, -1))
+        except Exception as e:
+            logger.warning(f"Could not read queue stats for {queue}: {e}")
+            continue
+        enqueued_at = _enqueued_at(oldest) if oldest else None
+        stats[queue] = {
+            "depth": depth,
+            "oldest_wait_s": round(now - enqueued_at, 3) if enqueued_at else None,
+            "recent_wait_p50_s": waits[len(waits) // 2] if waits else None,
+            "recent_wait_p95_s": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else None,
+            "recent_samples": len(waits),
+        }
+    return stats
+
+def _enqueued_at(raw_message: bytes) -> Optional[float]:
+    try:
+        return float(json.loads(raw_message)["headers"]["enqueued_at"])
+    except (ValueError, KeyError, TypeError):
+        return None
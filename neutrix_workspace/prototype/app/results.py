@@ -0,0 +1,70 @@
+"""
+How task results are kept in the Celery result backend.
+
+- CELERY_RESULT_EXPIRES bounds how long results (and batch manifests) stay in Redis.
+- RESULT_SERIALIZER=msgpack-zstd stores them as zstd-compressed msgpack instead of JSON.
+- RESULT_ARTIFACTS=blob moves the base64 face crop out of the result into the artifact store;
+  the result carries a `face_image_url` to fetch it from /api/v1/face instead, as with face=url.
+"""
+import os
+import base64
+import logging
+from typing import Dict, Any, Optional
+from kombu.serialization import register
+
+try:
+    import msgpack
+    import zstandard
+    MSGPACK_ZSTD_AVAILABLE = True
+except ImportError:
+    MSGPACK_ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MSGPACK_ZSTD = "msgpack-zstd"
+
+def result_expires() -> int:
+    return int(os.environ.get("CELERY_RESULT_EXPIRES", 86400))
+
+def _register_msgpack_zstd():
+    level = int(os.environ.get("RESULT_ZSTD_LEVEL", 3))
+
+    def dumps(value):
+        return zstandard.ZstdCompressor(level=level).compress(msgpack.packb(value, use_bin_type=True))
+
+    def loads(payload):
+        return msgpack.unpackb(zstandard.ZstdDecompressor().decompress(payload), raw=False)
+
+    register(MSGPACK_ZSTD, dumps, loads, content_type="application/x-neutrix-msgpack-zstd", content_encoding="binary")
+
+def configure_result_backend(celery):
+    """Applies result expiry and serialization to a Celery app; API and workers must agree on both."""
+    celery.conf.result_expires = result_expires()
+
+    serializer = os.environ.get("RESULT_SERIALIZER", "json").lower()
+    if serializer == MSGPACK_ZSTD and not MSGPACK_ZSTD_AVAILABLE:
+        logger.warning("RESULT_SERIALIZER=msgpack-zstd needs msgpack and zstandard, storing results as JSON")
+        serializer = "json"
+    if serializer == MSGPACK_ZSTD:
+        _register_msgpack_zstd()
+    celery.conf.result_serializer = serializer
+    # Task messages stay JSON, results are only ever decoded with the configured serializer
+    celery.conf.result_accept_content = ["json"] if serializer == "json" else ["json", serializer]
+
+def artifacts_enabled() -> bool:
+    return os.environ.get("RESULT_ARTIFACTS", "inline").lower() == "blob"
+
+def compact_result(result: Optional[Dict[str, Any]], face_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Result as stored in the backend and POSTed to webhooks. With RESULT_ARTIFACTS=blob the
+    face crop is stored the way face=url stores it, under `face_id` (the document's SHA-256,
+    or the crop's own when not given), and replaced by a `face_image_url`; otherwise the
+    result is returned unchanged.
+    """
+    if not artifacts_enabled() or not isinstance(result, dict) or not result.get("face_image"):
+        return result
+    from pipeline.extractor import store_face
+    from pipeline.result_cache import ResultCache
+    jpeg = base64.b64decode(result["face_image"])
+    # Falls back to the inlined face if the store cannot take it
+    return dict(result, **store_face(face_id or ResultCache.hash_bytes(jpeg), jpeg))
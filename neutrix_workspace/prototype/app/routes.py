@@ -1,25 +1,46 @@
-from flask import Blueprint, render_template, request, jsonify, current_app
+from flask import Blueprint, Response, render_template, request, jsonify, stream_with_context
 from werkzeug.utils import secure_filename
 import os
+import re
+import json
+import math
+import time
+import shutil
 import logging
+import zipfile
+import tempfile
+import threading
+from contextlib import closing
 from pipeline import HybridExtractorPipeline
-from utils.pdf_processor import PDFProcessor
+from pipeline.extractor import normalize_face_mode, face_key
+from pipeline.result_cache import ResultCache
+from utils.memory import worker_memory_report
+from utils.blob_store import get_blob_store, get_artifact_store
+from app.queues import queue_for, normalize_priority, queue_stats, staged_pipeline_enabled
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('routes', __name__)
 
+# SSE streams and long-polls waiting at once in this worker; the remaining gthread threads stay
+# free for regular requests
+_stream_slots = threading.BoundedSemaphore(
+    int(os.environ.get("EVENTS_MAX_STREAMS", max(1, int(os.environ.get("GUNICORN_THREADS", 16)) - 4)))
+)
+
 # Initialize singletons
 extractor = None
 pdf_processor = None
+blob_store = None
 
 @bp.record_once
 def register(state):
-    global extractor, pdf_processor
+    global extractor, pdf_processor, blob_store
     logger.info("⏳ Initializing Extractor Pipeline inside routes...")
     # NOTE: In production, consider lazy loading or moving this outside request threads.
     extractor = HybridExtractorPipeline(use_donut=True)
-    pdf_processor = PDFProcessor()
+    pdf_processor = extractor.pdf_processor
+    blob_store = get_blob_store()
     logger.info("✅ Extractor Pipeline Ready!")
 
 
@@ -32,7 +53,10 @@ def process_file():
     """
     Synchronous Document Extraction
     Uploads an image or PDF identity document and synchronously processes it. 
-    Not recommended for large PDFs in production.
+    Images are decoded straight from the request body; PDFs are kept in a temp file only for the
+    duration of the request. Not recommended for large PDFs in production.
+    With DONUT_ASYNC enabled, documents regex cannot classify are returned right away with
+    `donut_pending: true` and a `donut_task_id` to poll on /api/v1/status for the enriched result.
     ---
     tags:
       - Synchronous Extraction
@@ -44,11 +68,31 @@ def process_file():
         type: file
         required: true
         description: The image or PDF file to process
+      - name: pages
+        in: formData
+        type: string
+        required: false
+        description: PDF pages to process, "all", "first" or 1-based ranges like "1-3,5" (defaults to PDF_DEFAULT_PAGES, "first")
+      - name: docling
+        in: formData
+        type: boolean
+        required: false
+        description: Run the Docling layout stage on PDFs (defaults to the DOCLING_DOCUMENT_TYPES policy)
+      - name: document_type
+        in: formData
+        type: string
+        required: false
+        description: Optional document type hint, used to decide whether Docling runs and to size the Donut fallback
+      - name: face
+        in: formData
+        type: string
+        required: false
+        description: inline (base64 face_image), url (face_image_url to /api/v1/face/<id>) or none (no face detection); defaults to FACE_MODE
     responses:
       200:
         description: A JSON dictionary of the extracted Pydantic schema
       400:
-        description: Bad request (missing file)
+        description: Bad request (missing file or invalid face mode)
       500:
         description: Internal server error or ML inference failure
     """
@@ -59,27 +103,66 @@ def process_file():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
     
+    try:
+        face_mode = normalize_face_mode(request.form.get('face') or extractor.face_mode)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     if file:
         filename = secure_filename(file.filename)
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        extension = os.path.splitext(filename)[1]
+        pages = request.form.get('pages') or extractor.default_pages
+        document_type = request.form.get('document_type') or None
+        use_docling = extractor.wants_docling(request.form.get('docling'), document_type)
+        filepath, blob_key, lease, result = None, None, None, None
         
         try:
-            if filename.lower().endswith(".pdf"):
-                logger.info(f"PDF detected: {filename}. Converting pages...")
-                _ = pdf_processor.extract_structure_docling(filepath)
-                img_paths = pdf_processor.extract_images_from_pdf(filepath)
-                if not img_paths:
-                    return jsonify({"error": "Failed to parse PDF pages."}), 500
-                process_target = img_paths[0]
+            is_pdf = filename.lower().endswith(".pdf")
+            if is_pdf:
+                # PyMuPDF and Docling open PDFs by path, so the upload is kept in a temp file for the request
+                with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as tmp:
+                    filepath = tmp.name
+                    shutil.copyfileobj(file.stream, tmp)
+                content_hash = ResultCache.hash_file(filepath)
+                cache_key = extractor.cache_key_for_hash(content_hash, extractor.pdf_cache_options(filepath, pages, use_docling), face_mode)
             else:
-                process_target = filepath
-                
-            result = extractor.process_file(process_target)
+                data = file.read()
+                content_hash = ResultCache.hash_bytes(data)
+                cache_key = extractor.cache_key_for_hash(content_hash, "", face_mode)
+            cached = extractor.get_cached(cache_key)
+            if cached is not None:
+                return jsonify(cached)
+            
+            if is_pdf:
+                logger.info(f"PDF detected: {filename}. Processing pages '{pages}'...")
+                result = extractor.process_pdf(filepath, pages, use_docling=use_docling, face_mode=face_mode, face_id=content_hash,
+                                               document_type=document_type)
+            else:
+                result = extractor.process_image_bytes(data, filename, face_mode=face_mode, face_id=content_hash,
+                                                       document_type=document_type)
+            if result.get("donut_pending"):
+                from app.tasks import queue_donut_enrichment
+                # Only documents waiting on Donut need their bytes past this request
+                if is_pdf:
+                    with open(filepath, "rb") as f:
+                        blob_key, lease = blob_store.put(f, extension)
+                else:
+                    blob_key, lease = blob_store.put_bytes(data, extension)
+                result = queue_donut_enrichment(extractor, blob_key, result, cache_key, lease, document_type=document_type)
+            extractor.store_cached(cache_key, result)
             return jsonify(result)
+        except ValueError as e:
+            logger.warning(f"Rejected document {filename}: {e}")
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             logger.error(f"❌ Error processing file: {e}", exc_info=True)
             return jsonify({"error": str(e)}), 500
+        finally:
+            if filepath:
+                os.remove(filepath)
+            # A queued enrichment task took over the lease and releases it when done
+            if lease and not (result and result.get("donut_task_id")):
+                blob_store.release(blob_key, lease)
 
 @bp.route('/api/v1/process_async', methods=['POST'])
 def process_file_async():
@@ -98,9 +181,41 @@ def process_file_async():
         type: file
         required: true
         description: The document to process
+      - name: pages
+        in: formData
+        type: string
+        required: false
+        description: PDF pages to process, "all", "first" or 1-based ranges like "1-3,5" (defaults to PDF_DEFAULT_PAGES, "first")
+      - name: docling
+        in: formData
+        type: boolean
+        required: false
+        description: Run the Docling layout stage on PDFs (defaults to the DOCLING_DOCUMENT_TYPES policy)
+      - name: document_type
+        in: formData
+        type: string
+        required: false
+        description: Optional document type hint, used to decide whether Docling runs and to size the Donut fallback
+      - name: callback_url
+        in: formData
+        type: string
+        required: false
+        description: Webhook receiving the final result as a JSON POST (after Donut enrichment, if any)
+      - name: priority
+        in: formData
+        type: string
+        required: false
+        description: interactive (default) or bulk; with TASK_ROUTING each has its own queues and worker pools
+      - name: face
+        in: formData
+        type: string
+        required: false
+        description: inline (base64 face_image), url (face_image_url to /api/v1/face/<id>) or none (no face detection); defaults to FACE_MODE
     responses:
       202:
         description: Processing started successfully, returns task_id
+      400:
+        description: Bad request (missing file, invalid callback_url, priority or face mode)
     """
     if 'file' not in request.files:
         return jsonify({"error": "No file part"}), 400
@@ -109,28 +224,240 @@ def process_file_async():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
         
+    callback_url = request.form.get('callback_url')
+    try:
+        priority = normalize_priority(request.form.get('priority'))
+        face_mode = normalize_face_mode(request.form.get('face') or extractor.face_mode)
+        if callback_url:
+            from app.events import validate_callback_url
+            validate_callback_url(callback_url)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+        
     if file:
         filename = secure_filename(file.filename)
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # Streamed into the blob store under its content hash, the task carries only the key
+        blob_key, lease = blob_store.put(file.stream, os.path.splitext(filename)[1])
         
         # Dispatch to celery
         try:
              from app.tasks import process_document_async
-             task = process_document_async.delay(filepath, filename)
+             document_type = request.form.get('document_type') or None
+             use_docling = extractor.wants_docling(request.form.get('docling'), document_type)
+             if staged_pipeline_enabled():
+                 # Same task_id contract, the document runs as a chain of stage tasks
+                 from app.staged_tasks import submit_staged
+                 task = submit_staged(blob_key, filename, request.form.get('pages'), use_docling, lease, callback_url, priority,
+                                      face_mode, document_type)
+             else:
+                 task = process_document_async.apply_async(
+                     (blob_key, filename, request.form.get('pages'), use_docling, lease, callback_url, priority, face_mode,
+                      document_type),
+                     queue=queue_for("documents", priority))
              return jsonify({
                  "task_id": task.id,
                  "status": "Processing Started"
              }), 202
         except Exception as e:
              logger.error(f"Failed to start async task: {e}")
+             blob_store.release(blob_key, lease)
              return jsonify({"error": "Failed to start background task"}), 500
 
+BATCH_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+@bp.route('/api/v1/batch', methods=['POST'])
+def process_batch():
+    """
+    Batch Document Extraction
+    Uploads several documents (e.g. Aadhaar + PAN + marksheet of one customer), as repeated
+    `files` fields and/or ZIP archives, and queues them as one batch. Documents are split into
+    chunks that run in parallel, each chunk with a single batched OCR pass.
+    Returns a batch_id to poll on /api/v1/batch/<batch_id>.
+    ---
+    tags:
+      - Asynchronous Tasks
+    consumes:
+      - multipart/form-data
+    parameters:
+      - name: files
+        in: formData
+        type: file
+        required: true
+        description: Images, PDFs or ZIP archives of them (repeat the field for several files)
+      - name: pages
+        in: formData
+        type: string
+        required: false
+        description: PDF pages to process for every PDF in the batch (defaults to PDF_DEFAULT_PAGES, "first")
+      - name: docling
+        in: formData
+        type: boolean
+        required: false
+        description: Run the Docling layout stage on the PDFs of the batch
+      - name: document_type
+        in: formData
+        type: string
+        required: false
+        description: Optional document type hint, used to decide whether Docling runs and to size the Donut fallback
+      - name: priority
+        in: formData
+        type: string
+        required: false
+        description: interactive (default) or bulk; with TASK_ROUTING each has its own queues and worker pools
+      - name: face
+        in: formData
+        type: string
+        required: false
+        description: inline (base64 face_image), url (face_image_url to /api/v1/face/<id>) or none (no face detection); defaults to FACE_MODE
+    responses:
+      202:
+        description: Batch queued, returns batch_id and the item list
+      400:
+        description: No documents, too many documents, a bad archive, or an invalid priority or face mode
+    """
+    uploads = request.files.getlist('files') + request.files.getlist('file')
+    uploads = [upload for upload in uploads if upload.filename]
+    if not uploads:
+        return jsonify({"error": "No files part"}), 400
+    
+    max_items = int(os.environ.get("BATCH_MAX_ITEMS", 20))
+    pages = request.form.get('pages')
+    document_type = request.form.get('document_type') or None
+    use_docling = extractor.wants_docling(request.form.get('docling'), document_type)
+    items = []
+    try:
+        priority = normalize_priority(request.form.get('priority'))
+        face_mode = normalize_face_mode(request.form.get('face') or extractor.face_mode)
+        for filename, stream in _batch_documents(uploads):
+            if len(items) >= max_items:
+                raise ValueError(f"A batch holds at most {max_items} documents")
+            blob_key, lease = blob_store.put(stream, os.path.splitext(filename)[1])
+            items.append({"blob_key": blob_key, "blob_lease": lease, "filename": filename,
+                          "pages": pages, "docling": use_docling})
+        if not items:
+            raise ValueError(f"No supported documents in the upload ({', '.join(sorted(BATCH_EXTENSIONS))})")
+        
+        from app.tasks import submit_batch
+        manifest = submit_batch(items, chunk_size=int(os.environ.get("BATCH_CHUNK_SIZE", 4)), priority=priority, face_mode=face_mode,
+                                document_type=document_type)
+    except (ValueError, zipfile.BadZipFile) as e:
+        _release_items(items)
+        logger.warning(f"Rejected batch: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        _release_items(items)
+        logger.error(f"Failed to start batch: {e}")
+        return jsonify({"error": "Failed to start background task"}), 500
+    
+    return jsonify({
+        "batch_id": manifest["batch_id"],
+        "status": "Processing Started",
+        "items": [{"index": idx, "filename": filename} for idx, filename in enumerate(manifest["items"])]
+    }), 202
+
+def _batch_documents(uploads):
+    """Yields (filename, stream) for every document of a batch upload, expanding ZIP archives."""
+    max_unzipped = int(os.environ.get("BATCH_MAX_UNZIPPED_BYTES", 64 * 1024 * 1024))
+    for upload in uploads:
+        filename = _document_name(upload.filename)
+        if not filename.lower().endswith(".zip"):
+            if os.path.splitext(filename)[1].lower() in BATCH_EXTENSIONS:
+                yield filename, upload.stream
+            continue
+        
+        with zipfile.ZipFile(upload.stream) as archive:
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and not os.path.basename(info.filename).startswith(".")
+                       and os.path.splitext(info.filename)[1].lower() in BATCH_EXTENSIONS]
+            # Checked against the sizes declared in the archive before anything is inflated
+            if sum(info.file_size for info in members) > max_unzipped:
+                raise ValueError(f"{filename} expands to more than {max_unzipped} bytes")
+            for info in members:
+                with archive.open(info) as member:
+                    yield _document_name(os.path.basename(info.filename)), member
+
+def _document_name(filename: str) -> str:
+    """secure_filename, keeping the extension the pipeline dispatches on even for non-ASCII names."""
+    extension = os.path.splitext(filename)[1].lower()
+    safe_name = secure_filename(filename)
+    return safe_name if os.path.splitext(safe_name)[1].lower() == extension else f"document{extension}"
+
+def _release_items(items):
+    for item in items:
+        blob_store.release(item["blob_key"], item["blob_lease"])
+
+@bp.route('/api/v1/batch/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    """
+    Get Batch Status
+    Aggregated state of a batch plus the state and result of each of its documents,
+    in upload order. The batch state is PENDING, PROCESSING, SUCCESS, PARTIAL_FAILURE or FAILURE.
+    ---
+    tags:
+      - Asynchronous Tasks
+    parameters:
+      - name: batch_id
+        in: path
+        type: string
+        required: true
+        description: The batch id returned by /api/v1/batch
+    responses:
+      200:
+        description: Batch state, per-state item counts and per-item results
+      404:
+        description: Unknown or expired batch
+    """
+    from app.tasks import load_batch, process_documents_batch_async
+    manifest = load_batch(batch_id)
+    if manifest is None:
+        return jsonify({"error": "Unknown or expired batch"}), 404
+    
+    items = [{"index": idx, "filename": filename} for idx, filename in enumerate(manifest["items"])]
+    for chunk in manifest["chunks"]:
+        task = process_documents_batch_async.AsyncResult(chunk["task_id"])
+        # Each access to task.state is a backend read; a finished task caches its meta,
+        # so info is then read from the same fetch
+        state = task.state
+        info = task.info if state in ('SUCCESS', 'FAILURE') else None
+        for position, idx in enumerate(chunk["items"]):
+            item = items[idx]
+            if state == 'SUCCESS':
+                result = info[position]
+                if "error" in result:
+                    item.update(state='FAILURE', error=result["error"])
+                else:
+                    item.update(state='SUCCESS', result=_with_donut_enrichment(result))
+            elif state == 'FAILURE':
+                item.update(state='FAILURE', error=str(info))
+            else:
+                item["state"] = 'PROCESSING' if state == 'PROCESSING' else 'PENDING'
+    
+    counts = {state: sum(item["state"] == state for item in items) for state in ('PENDING', 'PROCESSING', 'SUCCESS', 'FAILURE')}
+    if counts['PENDING'] == len(items):
+        state = 'PENDING'
+    elif counts['PENDING'] or counts['PROCESSING']:
+        state = 'PROCESSING'
+    elif not counts['FAILURE']:
+        state = 'SUCCESS'
+    else:
+        state = 'FAILURE' if counts['FAILURE'] == len(items) else 'PARTIAL_FAILURE'
+    
+    return jsonify({
+        "batch_id": batch_id,
+        "state": state,
+        "counts": counts,
+        "items": items
+    })
+
 @bp.route('/api/v1/status/<task_id>', methods=['GET'])
 def get_task_status(task_id):
     """
     Get Asynchronous Task Status
     Poll this endpoint using the task_id to get processing completion status.
+    Results still waiting on Donut enrichment carry `donut_pending: true` and are
+    replaced by the merged result once the enrichment task finishes.
+    With `wait`, the request long-polls: it is held until the task (or its Donut enrichment)
+    finishes or `wait` seconds pass, without touching the result backend while it waits.
     ---
     tags:
       - Asynchronous Tasks
@@ -140,10 +467,136 @@ def get_task_status(task_id):
         type: string
         required: true
         description: The task UUID returned by /process_async
+      - name: wait
+        in: query
+        type: number
+        required: false
+        description: Seconds to hold the request until the task finishes (capped by EVENTS_MAX_WAIT)
     responses:
       200:
         description: The current state of the job (PENDING, PROCESSING, SUCCESS, FAILURE)
     """
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        wait = math.nan
+    if not math.isfinite(wait):
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+    wait = min(wait, float(os.environ.get("EVENTS_MAX_WAIT", 60)))
+    
+    if wait <= 0:
+        return jsonify(_task_status(task_id))
+    if not _stream_slots.acquire(blocking=False):
+        # Every waiting slot of this worker is taken, answer right away instead of holding a thread
+        return jsonify(_task_status(task_id))
+    
+    updates = _status_updates(task_id, timeout=wait, keepalive=wait)
+    try:
+        response = next(updates)
+        if _awaited_task_id(task_id, response) is not None:
+            for update in updates:
+                if update is not None:
+                    response = update
+                    break
+    except Exception as e:
+        logger.warning(f"Long-poll for task {task_id} failed, answering with the current state: {e}")
+        response = _task_status(task_id)
+    finally:
+        updates.close()
+        _stream_slots.release()
+    return jsonify(response)
+
+@bp.route('/api/v1/events/<task_id>', methods=['GET'])
+def stream_task_events(task_id):
+    """
+    Task Status Stream (Server-Sent Events)
+    Streams a `status` event with the same payload as /api/v1/status whenever the task changes
+    state (and again when its Donut enrichment finishes), then an `end` event. Waiting is driven
+    by Redis pub/sub, so a pending task costs no result backend reads beyond a keepalive check.
+    ---
+    tags:
+      - Asynchronous Tasks
+    produces:
+      - text/event-stream
+    parameters:
+      - name: task_id
+        in: path
+        type: string
+        required: true
+        description: The task UUID returned by /process_async
+    responses:
+      200:
+        description: text/event-stream of status events
+      503:
+        description: This worker already holds EVENTS_MAX_STREAMS open streams
+    """
+    timeout = float(os.environ.get("EVENTS_STREAM_TIMEOUT", 300))
+    keepalive = float(os.environ.get("EVENTS_KEEPALIVE", 15))
+    if not _stream_slots.acquire(blocking=False):
+        return jsonify({"error": "Too many open event streams, retry later or poll /api/v1/status"}), 503, {"Retry-After": "5"}
+    
+    def stream():
+        try:
+            for update in _status_updates(task_id, timeout=timeout, keepalive=keepalive):
+                if update is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: status\ndata: {json.dumps(update)}\n\n"
+            yield "event: end\ndata: {}\n\n"
+        except Exception as e:
+            logger.warning(f"Event stream for task {task_id} failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    response = Response(stream_with_context(stream()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Runs once the server is done with the response, even if the stream never started
+    response.call_on_close(_stream_slots.release)
+    return response
+
+FACE_ID = re.compile(r"^[0-9a-f]{64}$")
+
+@bp.route('/api/v1/face/<face_id>', methods=['GET'])
+def get_face(face_id):
+    """
+    Get Face Crop
+    Serves the face crop of a document processed with `face=url` (or any result compacted with
+    RESULT_ARTIFACTS=blob) as a raw JPEG, the link found in its result's `face_image_url`. The id
+    is the SHA-256 of the uploaded document, and the crop is stored once per document however
+    often it is processed.
+    ---
+    tags:
+      - Asynchronous Tasks
+    produces:
+      - image/jpeg
+    parameters:
+      - name: face_id
+        in: path
+        type: string
+        required: true
+        description: SHA-256 of the document, as found in the result's `face_image_url`
+    responses:
+      200:
+        description: The face crop as JPEG
+      304:
+        description: Not modified (If-None-Match matched)
+      404:
+        description: No face stored for this document, or it expired
+    """
+    if not FACE_ID.match(face_id):
+        return jsonify({"error": "Unknown or expired face"}), 404
+    try:
+        with closing(get_artifact_store().open(face_key(face_id))) as stream:
+            jpeg = stream.read()
+    except FileNotFoundError:
+        return jsonify({"error": "Unknown or expired face"}), 404
+    
+    # Crops are a few KB, so the ETag is the hash of the bytes actually served
+    response = Response(jpeg, mimetype="image/jpeg",
+                        headers={"Cache-Control": f"private, max-age={os.environ.get('FACE_CACHE_MAX_AGE', 3600)}"})
+    response.set_etag(ResultCache.hash_bytes(jpeg))
+    return response.make_conditional(request)
+
+def _task_status(task_id):
     from app.tasks import process_document_async
     task = process_document_async.AsyncResult(task_id)
     
@@ -161,7 +614,7 @@ def get_task_status(task_id):
     elif task.state == 'SUCCESS':
         response = {
             'state': task.state,
-            'result': task.info # The JSON result
+            'result': _with_donut_enrichment(task.info) # The JSON result
         }
     elif task.state == 'FAILURE':
         response = {
@@ -173,5 +626,100 @@ def get_task_status(task_id):
             'state': task.state,
             'status': str(task.info)
         }
-        
-    return jsonify(response)
+    return response
+
+def _awaited_task_id(task_id, response):
+    """The task whose completion changes `response` next: the task itself, its Donut enrichment, or None."""
+    if response['state'] not in ('SUCCESS', 'FAILURE'):
+        return task_id
+    result = response.get('result')
+    if isinstance(result, dict) and result.get('donut_pending') and result.get('donut_task_id'):
+        return result['donut_task_id']
+    return None
+
+def _status_updates(task_id, timeout, keepalive):
+    """
+    Yields the task status whenever it changes until it is final, or None on each keepalive
+    tick without an event. Subscribes before reading the state, so a completion published
+    in between is not missed.
+    """
+    from app.events import task_subscription, wait_for_event, task_channel
+    deadline = time.monotonic() + timeout
+    last = None
+    with task_subscription(task_id) as subscription:
+        subscribed = {task_id}
+        while True:
+            response = _task_status(task_id)
+            if response != last:
+                yield response
+                last = response
+            awaited = _awaited_task_id(task_id, response)
+            if awaited is None:
+                return
+            if awaited not in subscribed:
+                subscription.subscribe(task_channel(awaited))
+                subscribed.add(awaited)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if wait_for_event(subscription, min(keepalive, remaining)) is None:
+                yield None
+
+def _with_donut_enrichment(result):
+    """Swaps in the Donut-enriched result when the enrichment task queued for it has finished."""
+    if isinstance(result, list):
+        return [_with_donut_enrichment(item) for item in result]
+    if not isinstance(result, dict) or not result.get("donut_task_id"):
+        return result
+    
+    from app.tasks import enrich_with_donut_async
+    donut_task = enrich_with_donut_async.AsyncResult(result["donut_task_id"])
+    if donut_task.state == 'SUCCESS':
+        return donut_task.info
+    if donut_task.state == 'FAILURE':
+        # Enrichment is best effort, the regex/OCR result stands on its own
+        logger.warning(f"Donut enrichment {result['donut_task_id']} failed: {donut_task.info}")
+        return dict(result, donut_pending=False, donut_error=str(donut_task.info))
+    return result
+
+@bp.route('/api/v1/ready', methods=['GET'])
+def get_readiness():
+    """
+    Readiness Probe
+    Reports ready only once this worker has loaded its models and run the warm-up inference.
+    ---
+    tags:
+      - Monitoring
+    responses:
+      200:
+        description: Models are loaded and warmed up
+      503:
+        description: Warm-up still running or failed
+    """
+    from pipeline.warmup import WARMUP_STATE
+    state = WARMUP_STATE.snapshot()
+    return jsonify(state), 200 if state["ready"] else 503
+
+@bp.route('/api/v1/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Inference Backend Metrics
+    Reports how often each OCR backend (MKLDNN or safe CPU fallback) served a request in this worker,
+    result cache hit rates, Donut per-call latency and generated token counts, the RSS/PSS
+    of this worker and its sibling workers, and the depth and wait times of each Celery queue.
+    ---
+    tags:
+      - Monitoring
+    responses:
+      200:
+        description: Per-backend request counts and MKLDNN health state
+    """
+    return jsonify({
+        "ocr": extractor.ocr_engine.get_metrics(),
+        "result_cache": extractor.result_cache.stats() if extractor.result_cache else None,
+        "donut": extractor.donut_engine.get_metrics() if extractor.donut_engine else None,
+        "donut_batcher": extractor.donut_batcher.get_metrics() if extractor.donut_batcher else None,
+        "memory": worker_memory_report(),
+        "queues": queue_stats()
+    })
@@ -0,0 +1,240 @@
+"""
+Staged variant of process_document_async, enabled with STAGED_PIPELINE:
+
+    rasterize -> preprocess/face -> OCR -> classify/parse -> (Donut) -> validate/persist
+
+Every stage is its own task on its own queue (see app.queues), so each one can run on a pool
+sized for it instead of one worker holding every model. Stages pass a small JSON state along
+the chain; page images travel as compressed .npz blobs in the blob store and are decoded only once.
+Only the task the client polls stores a result: the intermediate stages ignore theirs, but still
+store failures, which the chain propagates to that id.
+"""
+import uuid
+import base64
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+from celery import shared_task, chain, states
+from utils.blob_store import BlobStore, get_blob_store, get_blob_cache
+from app.queues import stage_queue
+from app.results import compact_result
+from app.tasks import get_extractor, release_blob, notify_webhook, queue_donut_enrichment, process_document_async
+
+logger = logging.getLogger(__name__)
+
+def submit_staged(blob_key: str, filename: str, pages: Optional[str] = None, use_docling: bool = False,
+                  blob_lease: Optional[str] = None, callback_url: Optional[str] = None, priority: str = "interactive",
+                  face_mode: Optional[str] = None, document_type: Optional[str] = None):
+    """
+    Queues the stage chain for one document. Returns the AsyncResult the final result is stored
+    under, which is the id the client polls: the parse stage carries it and hands it on to the
+    stages it is replaced with (Donut, persist).
+    """
+    task_id = str(uuid.uuid4())
+    state = {
+        "task_id": task_id,
+        "blob_key": blob_key,
+        "blob_lease": blob_lease,
+        "filename": filename,
+        "is_pdf": filename.lower().endswith(".pdf"),
+        "pages": pages,
+        "use_docling": use_docling,
+        "callback_url": callback_url,
+        "priority": priority,
+        "face_mode": face_mode,
+        "document_type": document_type,
+        # (key, lease) of every intermediate blob, released once the document is done
+        "artifacts": [],
+    }
+    return chain(
+        rasterize_stage.s(state).set(queue=stage_queue("rasterize", priority)),
+        preprocess_stage.s().set(queue=stage_queue("preprocess", priority)),
+        ocr_stage.s().set(queue=stage_queue("ocr", priority)),
+        parse_stage.s().set(queue=stage_queue("parse", priority), task_id=task_id),
+    ).apply_async()
+
+@contextmanager
+def _stage(task, state: Dict[str, Any], status: str):
+    logger.info(f"Task {task.request.id}: {status} ({state['filename']})")
+    # Progress is reported under the id the client polls, not under each stage's own id
+    process_document_async.backend.store_result(state["task_id"], {"status": status}, "PROCESSING")
+    try:
+        yield
+    except Exception as e:
+        logger.error(f"Task {task.request.id}: Stage failed for {state['filename']}: {e}", exc_info=True)
+        notify_webhook(state.get("callback_url"), state["task_id"], states.FAILURE, error=str(e))
+        _release(state, keep_upload=False)
+        raise
+
+def _portable_face(face):
+    # The state is JSON, so the JPEG bytes of "url" mode travel base64 encoded until persist stores them
+    return base64.b64encode(face).decode("utf-8") if isinstance(face, bytes) else face
+
+def _put_array(state: Dict[str, Any], array) -> str:
+    key, lease = get_blob_store().put_array(array)
+    state["artifacts"].append([key, lease])
+    return key
+
+def _release(state: Dict[str, Any], keep_upload: bool):
+    for key, lease in state["artifacts"]:
+        release_blob(key, lease)
+    state["artifacts"] = []
+    if not keep_upload:
+        release_blob(state["blob_key"], state.get("blob_lease"))
+
+@shared_task(bind=True, ignore_result=True, store_errors_even_if_ignored=True)
+def rasterize_stage(self, state: Dict[str, Any]):
+    """Checks the result cache, then decodes the upload (or renders the selected PDF pages) once."""
+    extractor = get_extractor()
+    with _stage(self, state, "Rasterizing document..."):
+        state["pages"] = state["pages"] or extractor.default_pages
+        # A PDF is keyed by the pages it resolves to, so it is fetched before the cache lookup
+        filepath = get_blob_cache().fetch(state["blob_key"]) if state["is_pdf"] else None
+        options = extractor.pdf_cache_options(filepath, state["pages"], state["use_docling"]) if state["is_pdf"] else ""
+        state["face_mode"] = state["face_mode"] or extractor.face_mode
+        state["cache_key"] = extractor.cache_key_for_hash(BlobStore.content_hash(state["blob_key"]), options, state["face_mode"])
+        cached = extractor.get_cached(state["cache_key"])
+        if cached is not None:
+            logger.info(f"Task {self.request.id}: Served from result cache.")
+            state["result"] = cached
+            return state
+
+        filepath = filepath or get_blob_cache().fetch(state["blob_key"])
+        page_list = []
+        if state["is_pdf"]:
+            with extractor.pdf_processor.open(filepath) as document:
+                page_indexes, native_lines, layout = extractor.plan_pdf(filepath, state["pages"], state["use_docling"], document)
+                for page_index in page_indexes:
+                    if page_index in native_lines:
+                        # Text is known and nothing is rendered, embedded text counts as full confidence
+                        lines = native_lines[page_index]
+                        face = extractor.face_from_embedded(document, page_index, state["face_mode"]) if page_index == page_indexes[0] else None
+                        page_list.append({"index": page_index, "text": " ".join(lines), "lines": lines, "confidence": 1.0,
+                                          "face": _portable_face(face)})
+                        continue
+                    page = extractor.pdf_processor.render_page(document, page_index)
+                    region = extractor.pdf_processor.layout_region(layout, page_index) if layout else None
+                    page_list.append({"index": page_index, "image": _put_array(state, page), "region": list(region) if region else None})
+            state["pages_processed"] = [i + 1 for i in page_indexes]
+        else:
+            image = extractor.preprocessor.load_image(filepath)
+            if image is None:
+                raise ValueError(f"Could not decode image: {state['filename']}")
+            page_list.append({"index": 0, "image": _put_array(state, image), "region": None})
+        state["page_list"] = page_list
+        return state
+
+@shared_task(bind=True, ignore_result=True, store_errors_even_if_ignored=True)
+def preprocess_stage(self, state: Dict[str, Any]):
+    """Face extraction from the first page and OCR preprocessing of every rendered page."""
+    if "result" in state:
+        return state
+    extractor = get_extractor()
+    with _stage(self, state, "Preprocessing pages..."):
+        for page in state["page_list"]:
+            if "image" not in page:
+                continue
+            image = get_blob_cache().fetch_array(page["image"])
+            if page is state["page_list"][0]:
+                page["face"] = _portable_face(extractor.detect_face(image, state["face_mode"]))
+            ocr_input = image
+            if page["region"]:
+                x1, y1, x2, y2 = page["region"]
+                ocr_input = image[y1:y2, x1:x2]
+            page["proc"] = _put_array(state, extractor.preprocessor.preprocess_image(ocr_input))
+        return state
+
+@shared_task(bind=True, ignore_result=True, store_errors_even_if_ignored=True)
+def ocr_stage(self, state: Dict[str, Any]):
+    """One batched OCR pass over the preprocessed pages."""
+    if "result" in state:
+        return state
+    extractor = get_extractor()
+    with _stage(self, state, "Running OCR..."):
+        slots = [page for page in state["page_list"] if "proc" in page]
+        images = [get_blob_cache().fetch_array(page["proc"]) for page in slots]
+        if len(images) == 1:
+            outputs = [extractor.ocr_engine.extract_text(images[0])]
+        else:
+            outputs = extractor.ocr_engine.extract_text_batch(images)
+        for page, (text, lines, confidence) in zip(slots, outputs):
+            page.update(text=text, lines=lines, confidence=confidence)
+        return state
+
+@shared_task(bind=True, ignore_result=True, store_errors_even_if_ignored=True)
+def parse_stage(self, state: Dict[str, Any]):
+    """
+    Classifies and parses the OCR text, then replaces itself with the rest of the chain:
+    validate/persist, preceded by Donut only when regex could not classify the document.
+    """
+    needs_donut = False
+    if "result" not in state:
+        extractor = get_extractor()
+        with _stage(self, state, "Parsing document..."):
+            pages = [page for page in state["page_list"] if "lines" in page]
+            raw_text, lines, avg_confidence = extractor.merge_pages([(page["text"], page["lines"], page["confidence"]) for page in pages])
+            extracted_data, _ = extractor.parse_text(raw_text, lines)
+            state.update(extracted=extracted_data, raw_text=raw_text, avg_confidence=avg_confidence,
+                         face=next((page.get("face") for page in state["page_list"] if page.get("face")), None))
+            if extractor.needs_donut(extracted_data):
+                if extractor.donut_async:
+                    # Returned early as usual, persist queues the enrichment task
+                    extracted_data["donut_pending"] = True
+                else:
+                    needs_donut = True
+
+    # Replacing hands this task's id to the last task of the replacement, so persist finishes under it;
+    # it must store its result even though this stage ignores its own
+    persist = dict(queue=stage_queue("persist", state["priority"]), ignore_result=False)
+    if needs_donut:
+        return self.replace(chain(donut_stage.s(state).set(queue=stage_queue("donut", state["priority"])),
+                                  persist_stage.s().set(**persist)))
+    return self.replace(persist_stage.s(state).set(**persist))
+
+@shared_task(bind=True, ignore_result=True, store_errors_even_if_ignored=True)
+def donut_stage(self, state: Dict[str, Any]):
+    """Donut fallback on the first page, merged into the regex result."""
+    extractor = get_extractor()
+    with _stage(self, state, "Running Donut fallback..."):
+        first = state["page_list"][0]
+        if "image" in first:
+            image = get_blob_cache().fetch_array(first["image"])
+        else:
+            # A text-native first page is only rendered now that Donut needs it
+            image = extractor.load_donut_image(get_blob_cache().fetch(state["blob_key"]), state)
+        extractor.donut_fallback(state["extracted"], image, state["document_type"])
+        return state
+
+@shared_task(bind=True)
+def persist_stage(self, state: Dict[str, Any]):
+    """Validation, dataset record, result cache and delivery; runs under the id the client polls."""
+    if "result" in state:
+        result = compact_result(state["result"], BlobStore.content_hash(state["blob_key"]))
+        notify_webhook(state["callback_url"], self.request.id, states.SUCCESS, result)
+        _release(state, keep_upload=False)
+        return result
+
+    extractor = get_extractor()
+    with _stage(self, state, "Validating and saving result..."):
+        first = state["page_list"][0]
+        # PDFs are recorded as their rendered first page, images as the original upload
+        image = get_blob_cache().fetch_array(first["image"]) if state["is_pdf"] and "image" in first else None
+        filepath = get_blob_cache().fetch(state["blob_key"])
+        face = state["face"]
+        if face and state["face_mode"] == "url":
+            face = base64.b64decode(face)
+        result = extractor.finalize(filepath, image, state["extracted"], state["raw_text"], face, state["avg_confidence"],
+                                    face_id=BlobStore.content_hash(state["blob_key"]))
+        if state["is_pdf"]:
+            result["pages_processed"] = state["pages_processed"]
+        result = queue_donut_enrichment(extractor, state["blob_key"], result, state["cache_key"], state["blob_lease"],
+                                        state["callback_url"], self.request.id, state["priority"], state["document_type"])
+        extractor.store_cached(state["cache_key"], result)
+        result = compact_result(result, BlobStore.content_hash(state["blob_key"]))
+        if not result.get("donut_task_id"):
+            notify_webhook(state["callback_url"], self.request.id, states.SUCCESS, result)
+
+    # A queued enrichment task took over the upload's lease
+    _release(state, keep_upload=bool(result.get("donut_task_id")))
+    logger.info(f"Task {self.request.id}: Processing complete.")
+    return result
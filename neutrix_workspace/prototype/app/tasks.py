@@ -1,14 +1,22 @@
-from celery import shared_task
+from celery import shared_task, states
+from celery.signals import worker_init, worker_process_init, task_postrun, before_task_publish, task_prerun
 from pipeline import HybridExtractorPipeline
-from utils.pdf_processor import PDFProcessor
+from pipeline.warmup import start_warmup
+from pipeline.preload import preload_enabled, preload_models
+from utils.blob_store import BlobStore, get_blob_store, get_blob_cache
+from app.events import publish_task_event, post_webhook
+from app.results import compact_result
+from app.queues import queue_for, routing_enabled, record_wait, WEBHOOK_QUEUE
 import os
+import json
+import time
 import logging
+from typing import List, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
 # Lazy initialization in worker
 _extractor = None
-_pdf_processor = None
 
 def get_extractor():
     global _extractor
@@ -18,41 +26,320 @@ def get_extractor():
     return _extractor
 
 def get_pdf_processor():
-    global _pdf_processor
-    if _pdf_processor is None:
-        logger.info("Initializing PDFProcessor in Celery Worker...")
-        _pdf_processor = PDFProcessor()
-    return _pdf_processor
+    return get_extractor().pdf_processor
+
+def release_blob(blob_key: str, blob_lease: Optional[str]):
+    if blob_lease:
+        try:
+            get_blob_store().release(blob_key, blob_lease)
+        except Exception as e:
+            logger.warning(f"Could not release blob {blob_key}: {e}")
+
+@worker_init.connect
+def preload_worker(**kwargs):
+    # Runs once in the parent before the prefork pool starts, children inherit the loaded weights
+    if preload_enabled():
+        preload_models(get_extractor())
+
+@worker_process_init.connect
+def warm_up_worker(**kwargs):
+    # Runs in each pool child right after fork, before it accepts tasks
+    start_warmup(get_extractor(), background=False)
+
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, **kwargs):
+    # Read back by queue_stats() (oldest waiting message) and record_task_wait()
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
+@task_prerun.connect
+def record_task_wait(task=None, **kwargs):
+    enqueued_at = getattr(task.request, "enqueued_at", None) if task else None
+    queue = (task.request.delivery_info or {}).get("routing_key") if task else None
+    if enqueued_at and queue:
+        record_wait(queue, float(enqueued_at))
+
+@task_postrun.connect
+def publish_task_completion(task_id=None, state=None, **kwargs):
+    # The result is already stored when this fires, so subscribers can read it right away
+    if state in states.READY_STATES:
+        publish_task_event(task_id, state)
+
+def notify_webhook(callback_url: Optional[str], task_id: str, state: str, result: Optional[Dict] = None, error: Optional[str] = None):
+    """Queues delivery of a task's final result to the callback_url registered at submit time."""
+    if not callback_url:
+        return
+    payload = {"task_id": task_id, "state": state}
+    if result is not None:
+        payload["result"] = result
+    if error is not None:
+        payload["error"] = error
+    try:
+        deliver_webhook.apply_async((callback_url, payload), queue=queue_for(WEBHOOK_QUEUE))
+    except Exception as e:
+        logger.warning(f"Could not queue webhook for task {task_id}: {e}")
+
+def queue_donut_enrichment(extractor, blob_key: str, result: Dict, cache_key: Optional[str] = None,
+                           blob_lease: Optional[str] = None, callback_url: Optional[str] = None,
+                           callback_task_id: Optional[str] = None, priority: str = "interactive",
+                           document_type: Optional[str] = None) -> Dict:
+    """
+    Queues Donut for a result returned early with `donut_pending` and records the task id on it,
+    so the status endpoint can serve the merged result once it finishes.
+    Runs Donut inline if the broker cannot take the task.
+    The blob lease and the webhook (delivered once, with the merged result) are handed to the
+    enrichment task only if one was queued (the result has a `donut_task_id`); otherwise the
+    caller still owns them.
+    `document_type` is the request's hint, which picks the Donut generation budget.
+    """
+    if not result.get("donut_pending"):
+        return result
+    try:
+        task = enrich_with_donut_async.apply_async((blob_key, result, cache_key, blob_lease, callback_url, callback_task_id, document_type),
+                                                   queue=queue_for("donut", priority))
+    except Exception as e:
+        logger.warning(f"Could not queue Donut enrichment for {blob_key} ({e}), running it inline...")
+        return extractor.enrich_with_donut(result, extractor.load_donut_image(get_blob_cache().fetch(blob_key), result), document_type)
+    result["donut_task_id"] = task.id
+    return result
 
 @shared_task(bind=True)
-def process_document_async(self, filepath: str, filename: str):
+def process_document_async(self, blob_key: str, filename: str, pages: Optional[str] = None, use_docling: bool = False,
+                           blob_lease: Optional[str] = None, callback_url: Optional[str] = None,
+                           priority: str = "interactive", face_mode: Optional[str] = None,
+                           document_type: Optional[str] = None):
+    """
+    Processes one uploaded document. The task carries only the blob store key of the upload,
+    which is streamed into the worker's blob cache after the result cache has been checked.
+    The final result is POSTed to `callback_url` when one was registered.
+    With TASK_ROUTING, Donut never runs here: fallbacks are deferred to the donut queue of `priority`.
+    `face_mode` selects how the face crop is returned (see FACE_MODES), keyed by the upload's hash.
+    `document_type` is the client's hint, which picks the Donut generation budget.
+    """
     logger.info(f"Task {self.request.id}: Starting background processing for {filename}")
     
     # Update state
     self.update_state(state='PROCESSING', meta={'status': 'Starting extraction...'})
     
     extractor = get_extractor()
-    pdf_processor = get_pdf_processor()
+    result = None
     
     try:
-        if filename.lower().endswith(".pdf"):
-            logger.info(f"Task {self.request.id}: PDF detected. Converting pages...")
-            self.update_state(state='PROCESSING', meta={'status': 'Converting PDF to images...'})
-            
-            _ = pdf_processor.extract_structure_docling(filepath)
-            img_paths = pdf_processor.extract_images_from_pdf(filepath)
-            if not img_paths:
-                raise Exception("Failed to parse PDF pages.")
-            process_target = img_paths[0]
+        is_pdf = filename.lower().endswith(".pdf")
+        pages = pages or extractor.default_pages
+        content_hash = BlobStore.content_hash(blob_key)
+        # A PDF is keyed by the pages it resolves to, so it is fetched before the cache lookup
+        filepath = get_blob_cache().fetch(blob_key) if is_pdf else None
+        options = extractor.pdf_cache_options(filepath, pages, use_docling) if is_pdf else ""
+        cache_key = extractor.cache_key_for_hash(content_hash, options, face_mode)
+        cached = extractor.get_cached(cache_key)
+        if cached is not None:
+            logger.info(f"Task {self.request.id}: Served from result cache.")
+            cached = compact_result(cached, content_hash)
+            notify_webhook(callback_url, self.request.id, states.SUCCESS, cached)
+            return cached
+        
+        filepath = filepath or get_blob_cache().fetch(blob_key)
+        if is_pdf:
+            logger.info(f"Task {self.request.id}: PDF detected. Processing pages '{pages}'...")
+            self.update_state(state='PROCESSING', meta={'status': 'Running ML Pipeline on PDF pages...'})
+            result = extractor.process_pdf(filepath, pages, use_docling=use_docling, defer_donut=_defer_donut(),
+                                           face_mode=face_mode, face_id=content_hash, document_type=document_type)
         else:
-            process_target = filepath
-            
-        self.update_state(state='PROCESSING', meta={'status': 'Running ML Pipeline...'})
-        result = extractor.process_file(process_target)
+            self.update_state(state='PROCESSING', meta={'status': 'Running ML Pipeline...'})
+            result = extractor.process_file(filepath, defer_donut=_defer_donut(), face_mode=face_mode, face_id=content_hash,
+                                            document_type=document_type)
+        result = queue_donut_enrichment(extractor, blob_key, result, cache_key, blob_lease, callback_url, self.request.id, priority,
+                                        document_type)
+        extractor.store_cached(cache_key, result)
+        result = compact_result(result, content_hash)
+        if not result.get("donut_task_id"):
+            notify_webhook(callback_url, self.request.id, states.SUCCESS, result)
         
         logger.info(f"Task {self.request.id}: Processing complete.")
         return result
         
     except Exception as e:
         logger.error(f"Task {self.request.id}: Error processing file: {e}", exc_info=True)
+        notify_webhook(callback_url, self.request.id, states.FAILURE, error=str(e))
+        raise e
+    finally:
+        # The upload is only needed past this point by a queued Donut enrichment
+        if not (result and result.get("donut_task_id")):
+            release_blob(blob_key, blob_lease)
+
+@shared_task(bind=True)
+def process_documents_batch_async(self, items: List[Dict[str, str]], priority: str = "interactive",
+                                  face_mode: Optional[str] = None, document_type: Optional[str] = None):
+    """
+    Processes a burst of queued documents with a single batched OCR pass.
+    Each item is a dict with 'blob_key' and 'filename' keys (plus an optional 'blob_lease',
+    and 'pages' and 'docling' settings for PDFs); results are returned in the same order.
+    `face_mode` and the `document_type` hint apply to every document of the burst.
+    A document that fails gets `{"error": ...}` in its slot instead of failing the whole batch.
+    """
+    logger.info(f"Task {self.request.id}: Starting batch processing for {len(items)} documents")
+    self.update_state(state='PROCESSING', meta={'status': 'Starting batch extraction...'})
+    
+    extractor = get_extractor()
+    results = [None] * len(items)
+    cache_keys = [None] * len(items)
+    
+    try:
+        self.update_state(state='PROCESSING', meta={'status': f'Running ML Pipeline on {len(items)} documents...'})
+        filepaths = {}
+        for idx, item in enumerate(items):
+            is_pdf = item['filename'].lower().endswith(".pdf")
+            try:
+                # A PDF is keyed by the pages it resolves to, so it is fetched before the cache lookup
+                filepath = get_blob_cache().fetch(item['blob_key']) if is_pdf else None
+                options = extractor.pdf_cache_options(filepath, item.get('pages'), bool(item.get('docling'))) if is_pdf else ""
+            except Exception as e:
+                results[idx] = _item_error(item, e)
+                continue
+            cache_keys[idx] = extractor.cache_key_for_hash(BlobStore.content_hash(item['blob_key']), options, face_mode)
+            results[idx] = extractor.get_cached(cache_keys[idx])
+            if results[idx] is None:
+                try:
+                    filepaths[idx] = filepath or get_blob_cache().fetch(item['blob_key'])
+                except Exception as e:
+                    results[idx] = _item_error(item, e)
+        
+        # PDFs run through the page-aware flow, images share one batched OCR pass
+        image_slots = []
+        for idx, filepath in filepaths.items():
+            item = items[idx]
+            if item['filename'].lower().endswith(".pdf"):
+                try:
+                    results[idx] = extractor.process_pdf(filepath, item.get('pages'), use_docling=bool(item.get('docling')), defer_donut=_defer_donut(),
+                                                         face_mode=face_mode, face_id=BlobStore.content_hash(item['blob_key']),
+                                                         document_type=document_type)
+                except Exception as e:
+                    results[idx] = _item_error(item, e)
+            else:
+                image_slots.append(idx)
+        
+        try:
+            image_results = extractor.process_files([filepaths[idx] for idx in image_slots], defer_donut=_defer_donut(), face_mode=face_mode,
+                                                    face_ids=[BlobStore.content_hash(items[idx]['blob_key']) for idx in image_slots],
+                                                    document_type=document_type)
+        except Exception as e:
+            # One unreadable image fails the batched pass, so retry one by one to isolate it
+            logger.warning(f"Task {self.request.id}: Batched OCR pass failed ({e}), processing documents one by one...")
+            image_results = []
+            for idx in image_slots:
+                try:
+                    image_results.append(extractor.process_file(filepaths[idx], defer_donut=_defer_donut(), face_mode=face_mode,
+                                                                face_id=BlobStore.content_hash(items[idx]['blob_key']),
+                                                                document_type=document_type))
+                except Exception as item_error:
+                    image_results.append(_item_error(items[idx], item_error))
+        for idx, result in zip(image_slots, image_results):
+            results[idx] = result
+        
+        for idx, item in enumerate(items):
+            if idx not in filepaths or "error" in results[idx]:
+                continue
+            results[idx] = queue_donut_enrichment(extractor, item['blob_key'], results[idx], cache_keys[idx], item.get('blob_lease'),
+                                                  priority=priority, document_type=document_type)
+            extractor.store_cached(cache_keys[idx], results[idx])
+        
+        logger.info(f"Task {self.request.id}: Batch processing complete.")
+        return [compact_result(result, BlobStore.content_hash(item['blob_key'])) for result, item in zip(results, items)]
+        
+    except Exception as e:
+        logger.error(f"Task {self.request.id}: Error processing batch: {e}", exc_info=True)
         raise e
+    finally:
+        for item, result in zip(items, results):
+            if not (result and result.get("donut_task_id")):
+                release_blob(item['blob_key'], item.get('blob_lease'))
+
+def _defer_donut() -> Optional[bool]:
+    # Routed deployments keep Donut off the documents pools; otherwise DONUT_ASYNC decides
+    return True if routing_enabled() else None
+
+def _item_error(item: Dict[str, str], error: Exception) -> Dict[str, str]:
+    logger.warning(f"Batch item {item['filename']} failed: {error}")
+    return {"error": str(error)}
+
+def submit_batch(items: List[Dict[str, str]], chunk_size: int = 4, priority: str = "interactive",
+                 face_mode: Optional[str] = None, document_type: Optional[str] = None) -> Dict:
+    """
+    Fans a batch out as a Celery group of process_documents_batch_async chunks, so each
+    worker runs one batched OCR pass per chunk and the chunks run in parallel.
+    The manifest mapping items to their chunk task is kept in the result backend
+    (expiring with the results) and returned; its `batch_id` is the group id.
+    """
+    from celery import group
+    backend = process_documents_batch_async.backend
+    if not hasattr(backend, "set"):
+        raise RuntimeError("Batches need a key-value Celery result backend such as Redis")
+    
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    queue = queue_for("documents", priority)
+    group_result = group(process_documents_batch_async.s(chunk, priority, face_mode, document_type).set(queue=queue) for chunk in chunks).apply_async()
+    manifest = {
+        "batch_id": group_result.id,
+        "items": [item['filename'] for item in items],
+        "chunks": [
+            {"task_id": task.id, "items": list(range(start, start + len(chunk)))}
+            for task, chunk, start in zip(group_result.results, chunks, range(0, len(items), chunk_size))
+        ],
+    }
+    backend.set(_batch_key(group_result.id), json.dumps(manifest))
+    return manifest
+
+def load_batch(batch_id: str) -> Optional[Dict]:
+    raw = process_documents_batch_async.backend.get(_batch_key(batch_id))
+    return json.loads(raw) if raw else None
+
+def _batch_key(batch_id: str) -> str:
+    return f"neutrix-batch-{batch_id}"
+
+@shared_task(bind=True)
+def enrich_with_donut_async(self, blob_key: str, result: Dict, cache_key: Optional[str] = None,
+                            blob_lease: Optional[str] = None, callback_url: Optional[str] = None,
+                            callback_task_id: Optional[str] = None, document_type: Optional[str] = None):
+    """
+    Runs the Donut fallback for a result that was returned early with `donut_pending`.
+    Returns the merged result and refreshes the result cache entry it was stored under.
+    `callback_task_id` is the task the client submitted, reported to its webhook.
+    """
+    logger.info(f"Task {self.request.id}: Starting Donut enrichment for {blob_key}")
+    self.update_state(state='PROCESSING', meta={'status': 'Running Donut enrichment...'})
+    
+    extractor = get_extractor()
+    
+    try:
+        filepath = get_blob_cache().fetch(blob_key)
+        merged = extractor.enrich_with_donut(result, extractor.load_donut_image(filepath, result), document_type)
+        if cache_key:
+            extractor.store_cached(cache_key, merged)
+        merged = compact_result(merged, BlobStore.content_hash(blob_key))
+        
+        logger.info(f"Task {self.request.id}: Donut enrichment complete.")
+        notify_webhook(callback_url, callback_task_id, states.SUCCESS, merged)
+        return merged
+        
+    except Exception as e:
+        logger.error(f"Task {self.request.id}: Error during Donut enrichment: {e}", exc_info=True)
+        # Enrichment is best effort, the regex/OCR result is still delivered
+        notify_webhook(callback_url, callback_task_id, states.SUCCESS,
+                       compact_result(dict(result, donut_pending=False, donut_error=str(e)), BlobStore.content_hash(blob_key)))
+        raise e
+    finally:
+        release_blob(blob_key, blob_lease)
+
+@shared_task(bind=True, max_retries=int(os.environ.get("WEBHOOK_MAX_RETRIES", 5)))
+def deliver_webhook(self, callback_url: str, payload: Dict):
+    """POSTs a task result to its callback_url, retrying with exponential backoff."""
+    try:
+        post_webhook(callback_url, payload)
+        logger.info(f"Task {self.request.id}: Webhook for task {payload.get('task_id')} delivered.")
+    except ValueError as e:
+        # The URL no longer passes validation (e.g. it now resolves to an internal address), retrying will not help
+        logger.error(f"Task {self.request.id}: Webhook to {callback_url} refused: {e}")
+    except Exception as e:
+        logger.warning(f"Task {self.request.id}: Webhook delivery to {callback_url} failed: {e}")
+        raise self.retry(exc=e, countdown=min(5 * 2 ** self.request.retries, 300))
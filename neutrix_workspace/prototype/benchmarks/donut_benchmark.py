@@ -0,0 +1,134 @@
+"""
+Compares Donut CPU load-time variants against the fp32 baseline.
+
+Each variant runs in a fresh process so RSS is not shared between them. For every
+fixture image it reports latency, memory, and how many of the fields fp32 extracted
+come back with the same value.
+
+Usage (from neutrix_workspace/prototype):
+    python benchmarks/donut_benchmark.py --fixtures path/to/images --runs 3
+    python benchmarks/donut_benchmark.py --fixtures path/to/images --variants fp32,int8,int8+channels_last,onnx
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import statistics
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def flatten(data, prefix=""):
+    """Flattens nested Donut output into {"a.b": value} so fields can be compared one by one."""
+    if isinstance(data, dict):
+        items = {}
+        for key, value in data.items():
+            items.update(flatten(value, f"{prefix}{key}."))
+        return items
+    if isinstance(data, list):
+        items = {}
+        for idx, value in enumerate(data):
+            items.update(flatten(value, f"{prefix}{idx}."))
+        return items
+    return {prefix.rstrip("."): data}
+
+
+def run_variant(variant: str, fixtures, runs: int, queue):
+    from pipeline.donut_engine import DonutEngine
+
+    parts = set(variant.split("+"))
+    engine = DonutEngine(
+        quantize="int8" if "int8" in parts else "none",
+        compile_model="compile" in parts,
+        channels_last="channels_last" in parts,
+        backend="onnx" if "onnx" in parts else "torch",
+    )
+    baseline_rss = rss_mb()
+    engine.load()
+    loaded_rss = rss_mb()
+
+    # First call pays for lazy init and compilation, it is not part of the latency numbers
+    engine.process_image(fixtures[0])
+
+    latencies = []
+    outputs = {}
+    for path in fixtures:
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = engine.process_image(path)
+            latencies.append(time.perf_counter() - start)
+        outputs[path] = result
+
+    queue.put({
+        "variant": variant,
+        "model_mb": loaded_rss - baseline_rss,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "latencies": latencies,
+        "outputs": outputs,
+        "tokens": engine.get_metrics()["avg_generated_tokens"],
+    })
+
+
+def agreement(reference, candidate) -> float:
+    """Share of fields in the fp32 output that the variant reproduced exactly."""
+    matched = total = 0
+    for path, ref_output in reference.items():
+        ref_fields = flatten(ref_output)
+        cand_fields = flatten(candidate.get(path, {}))
+        total += len(ref_fields)
+        matched += sum(1 for key, value in ref_fields.items() if cand_fields.get(key) == value)
+    return matched / total if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", required=True, help="Directory of document images")
+    parser.add_argument("--variants", default="fp32,int8,int8+channels_last,compile")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    fixtures = sorted(
+        os.path.join(args.fixtures, name) for name in os.listdir(args.fixtures)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not fixtures:
+        sys.exit(f"No images found in {args.fixtures}")
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    if "fp32" not in variants:
+        variants.insert(0, "fp32")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for variant in variants:
+        print(f"Running {variant} on {len(fixtures)} fixtures x {args.runs} runs...")
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_variant, args=(variant, fixtures, args.runs, queue))
+        proc.start()
+        results[variant] = queue.get()
+        proc.join()
+
+    reference = results["fp32"]["outputs"]
+    print(f"\n{'variant':<24}{'p50 (s)':>9}{'p95 (s)':>9}{'tokens':>8}{'model (MB)':>12}{'peak RSS (MB)':>15}{'agreement':>11}")
+    for variant, res in results.items():
+        latencies = sorted(res["latencies"])
+        p50 = statistics.median(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{variant:<24}{p50:>9.2f}{p95:>9.2f}{res['tokens']:>8.1f}{res['model_mb']:>12.0f}"
+              f"{res['peak_rss_mb']:>15.0f}{agreement(reference, res['outputs']):>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
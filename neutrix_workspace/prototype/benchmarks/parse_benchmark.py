@@ -0,0 +1,125 @@
+"""
+Micro-benchmark for the field parsers against the pre-registry baseline.
+
+The baseline parsers (inline re.search/re.match literals) are loaded straight from git at
+--baseline (default: the initial commit) into a throwaway package, so both sides parse the
+same fixtures with the same parser logic apart from how their regexes are compiled. Each
+row reports the per-document parse time of both and whether their output matches.
+
+Usage (from neutrix_workspace/prototype):
+    python benchmarks/parse_benchmark.py --rounds 2000
+    python benchmarks/parse_benchmark.py --baseline <commit>
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import importlib
+
+PROTOTYPE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROTOTYPE_DIR)
+
+from pipeline import passport_processor, driving_license_processor
+from pipeline.cleaner import RegexCleaner
+
+BASELINE_REV = "af0a73d"
+BASELINE_MODULES = ("cleaner", "passport_processor", "driving_license_processor")
+
+FIXTURES = {
+    "aadhaar": [
+        "Government of India", "Rahul Kumar", "DOB: 01/01/1990", "MALE", "1234 5678 9012",
+    ],
+    "pan": [
+        "INCOME TAX DEPARTMENT", "GOVT. OF INDIA", "RAHUL KUMAR", "SURESH KUMAR",
+        "01/01/1990", "Permanent Account Number", "ABCDE1234F",
+    ],
+    "marksheet": [
+        "Visvesvaraya Technological University", "Student Name : ravi kumar", "1AB19CS001",
+        "Semester : 3", "18CS31", "Data Structures", "40", "50", "90", "P",
+        "18CS32", "Maths", "30", "40", "70", "F", "2023-01-01",
+    ],
+    "driving_license": [
+        "Indian Union Driving Licence", "FORM - 7", "DL No : KA01 20110012345", "DOI 01-02-2011",
+        "NAME", "RAMESH", "S/O", "SURESH", "DOB", "01-01-1990", "Valid Till 01-01-2030",
+        "MCWG", "01-02-2011", "LMV", "Valid Throughout India",
+        "ADDRESS: CHURCH ROAD MARATA STREET ANEKAL TOwN Anekal, BANGALORE KARNATAKA 562106",
+        "Sign", "RTO ANEKAL",
+    ],
+    "passport": [
+        "REPUBLIC OF INDIA", "X6248911", "DORESWAMY", "GIRISH", "KUMAR", "/Sex", "11/09/2000",
+        "BENGALURU-KARNATAKA", "01/01/2015", "31/12/2024",
+        "P<INDDORESWAMY<<GIRISH<KUMAR<<<<<<<<<<<<<<<<",
+        "X6248911<1IND0009113M2412312<<<<<<<<<<<<<<<0",
+    ],
+}
+
+
+# Fixture -> parser, looked up on the RegexCleaner or as a module-level processor
+PARSERS = {
+    "aadhaar": ("cleaner", "parse_aadhaar"),
+    "pan": ("cleaner", "parse_pan"),
+    "marksheet": ("cleaner", "extract_marksheet_details"),
+    "driving_license": ("cleaner", "parse_dl"),
+    "passport": ("passport_processor", "process_passport"),
+}
+
+
+def bench(fn, rounds: int) -> float:
+    """Average seconds per call."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def load_baseline(rev: str, target_dir: str):
+    """Writes the parser modules as of `rev` into a `baseline_pipeline` package and imports it."""
+    package_dir = os.path.join(target_dir, "baseline_pipeline")
+    os.makedirs(package_dir)
+    open(os.path.join(package_dir, "__init__.py"), "w").close()
+    for module in BASELINE_MODULES:
+        source = subprocess.run(
+            ["git", "show", f"{rev}:./pipeline/{module}.py"],
+            cwd=PROTOTYPE_DIR, check=True, capture_output=True,
+        ).stdout
+        with open(os.path.join(package_dir, f"{module}.py"), "wb") as f:
+            f.write(source)
+    sys.path.insert(0, target_dir)
+    return {module: importlib.import_module(f"baseline_pipeline.{module}") for module in BASELINE_MODULES}
+
+
+def resolve(modules, owner: str, name: str):
+    if owner == "cleaner":
+        return getattr(modules["cleaner"].RegexCleaner(), name)
+    return getattr(modules[owner], name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--baseline", default=BASELINE_REV, help="git revision to load the baseline parsers from")
+    args = parser.parse_args()
+
+    current = {
+        "cleaner": sys.modules[RegexCleaner.__module__],
+        "passport_processor": passport_processor,
+        "driving_license_processor": driving_license_processor,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = load_baseline(args.baseline, tmp)
+        print(f"baseline {args.baseline} vs working tree, {args.rounds} rounds\n")
+        print(f"{'document':<18}{'baseline (us)':>15}{'registry (us)':>15}{'speedup':>10}{'same output':>13}")
+        for name, lines in FIXTURES.items():
+            raw_text = " ".join(lines)
+            old_parse = resolve(baseline, *PARSERS[name])
+            new_parse = resolve(current, *PARSERS[name])
+            old = bench(lambda: old_parse(raw_text, lines), args.rounds)
+            new = bench(lambda: new_parse(raw_text, lines), args.rounds)
+            same = old_parse(raw_text, lines) == new_parse(raw_text, lines)
+            print(f"{name:<18}{old * 1e6:>15.1f}{new * 1e6:>15.1f}{old / new:>9.2f}x{'yes' if same else 'no':>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import os
+
+# gunicorn -c gunicorn.conf.py run:flask_app
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 300))
+# gthread workers, so SSE streams and long-polls each hold a thread rather than a whole worker;
+# routes cap how many of the threads may wait at once (EVENTS_MAX_STREAMS)
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+
+# With MODEL_PRELOAD the app (and its model weights) is loaded once in the master and
+# shared copy-on-write by every forked worker
+preload_app = os.environ.get("MODEL_PRELOAD", "False").lower() == "true"
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    # The master only loaded weights; the warm-up inference runs per worker, after fork
+    from app import routes
+    from pipeline.warmup import start_warmup
+    start_warmup(routes.extractor)
@@ -1,10 +1,21 @@
-from .preprocess import Preprocessor
-from .ocr_engine import OCREngine
-from .donut_engine import DonutEngine
-from .cleaner import RegexCleaner
-from .validator import Validator
-from .dataset_builder import DatasetBuilder
-from .extractor import HybridExtractorPipeline
+import importlib
+
+# Exports are imported on first access, so a process that only talks to the inference
+# server (or only needs the parsers) never imports paddle or torch
+_EXPORTS = {
+    "Preprocessor": ".preprocess",
+    "OCREngine": ".ocr_engine",
+    "DonutEngine": ".donut_engine",
+    "RegexCleaner": ".cleaner",
+    "Validator": ".validator",
+    "DatasetBuilder": ".dataset_builder",
+    "HybridExtractorPipeline": ".extractor",
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     "Preprocessor",
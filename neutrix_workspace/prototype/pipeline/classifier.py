@@ -0,0 +1,94 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Routing targets, named after the document_type each parser emits
+AADHAAR = "Aadhaar Card"
+PAN = "PAN Card"
+MARKSHEET = "Marksheet"
+DRIVING_LICENSE = "driving_license"        # RegexCleaner.parse_dl (structured)
+DRIVING_LICENSE_BASIC = "Driving License"  # process_driving_license (label based)
+PASSPORT = "passport"
+UNKNOWN = "Unknown"
+
+# Order used to break score ties, mirroring the historic cascade
+PRIORITY = [AADHAAR, PAN, MARKSHEET, DRIVING_LICENSE, DRIVING_LICENSE_BASIC, PASSPORT]
+
+# Each signature is matched at most once per document and votes for one or more types.
+# Case-insensitive signatures use scoped (?i:...) groups so the text never needs an upper()/lower() copy.
+SIGNATURES: List[Tuple[str, Dict[str, int]]] = [
+    # Aadhaar
+    (r"\b\d{4}\s?\d{4}\s?\d{4}\b", {AADHAAR: 3}),
+    (r"(?i:aadhaa?r|unique\s+identification)", {AADHAAR: 3}),
+    (r"(?i:male)", {AADHAAR: 1}),  # also hits FEMALE
+    (r"(?i:dob)", {AADHAAR: 1}),
+    # PAN
+    (r"[A-Z]{5}\d{4}[A-Z]", {PAN: 3}),
+    (r"(?i:income\s*tax\s*department|permanent\s*account\s*number)", {PAN: 3}),
+    # Marksheet
+    (r"(?i:university)", {MARKSHEET: 2}),
+    (r"(?i:marks|result)", {MARKSHEET: 1}),
+    # Driving License
+    (r"DL\s?No", {DRIVING_LICENSE: 3, DRIVING_LICENSE_BASIC: 2}),
+    (r"(?i:driving\s?licen[cs]e)", {DRIVING_LICENSE: 3, DRIVING_LICENSE_BASIC: 2}),
+    (r"(?i:throughout\s+india)", {DRIVING_LICENSE: 2, DRIVING_LICENSE_BASIC: 1}),
+    (r"(?i:licen[cs]ing\s+authority)", {DRIVING_LICENSE: 2}),
+    (r"(?i:dl\sno)", {DRIVING_LICENSE_BASIC: 2}),
+    (r"(?i:\bmcwg\b|\blmv\b|\bform\s7\b)", {DRIVING_LICENSE_BASIC: 1}),
+    # Passport (whitespace tolerant, OCR often splits MRZ and label fragments)
+    (r"(?i:passport)", {PASSPORT: 3}),
+    (r"(?i:\bp\s*<(?:\s*ind)?)", {PASSPORT: 3}),
+    (r"(?i:/\s*nationality|/\s*place\s*of\s*s?sue)", {PASSPORT: 2}),
+    (r"(?i:x(?:\s*[0-9]){7})", {PASSPORT: 2}),
+    (r"(?i:republic\s*of\s*india)", {PASSPORT: 1}),
+]
+
+
+@dataclass
+class ClassificationResult:
+    document_type: str
+    confidence: float
+    ranking: List[Tuple[str, int]] = field(default_factory=list)
+
+
+class DocumentClassifier:
+    """
+    Scores every document type in a single scan of the OCR text.
+    All signatures are compiled once into one pattern, so routing cost stays flat
+    as document types are added. Each signature sits in its own zero-width lookahead,
+    so signatures matching the same span all vote instead of only the first one.
+    """
+    def __init__(self, signatures: List[Tuple[str, Dict[str, int]]] = SIGNATURES, min_score: int = 1):
+        self.min_score = min_score
+        self._votes = {}
+        lookaheads = []
+        for idx, (pattern, votes) in enumerate(signatures):
+            name = f"s{idx}"
+            lookaheads.append(f"(?:(?=(?P<{name}>{pattern})))?")
+            self._votes[name] = votes
+        # The leading lookahead only stops at positions where some signature starts
+        any_signature = "|".join(f"(?:{pattern})" for pattern, _ in signatures)
+        self._pattern = re.compile(f"(?=(?:{any_signature}))" + "".join(lookaheads))
+        self._rank = {doc_type: i for i, doc_type in enumerate(PRIORITY)}
+
+    def classify(self, raw_text: str) -> ClassificationResult:
+        matched = set()
+        for m in self._pattern.finditer(raw_text):
+            matched.update(name for name, value in m.groupdict().items() if value is not None)
+
+        scores: Dict[str, int] = {}
+        for name in matched:
+            for doc_type, weight in self._votes[name].items():
+                scores[doc_type] = scores.get(doc_type, 0) + weight
+
+        ranking = sorted(scores.items(), key=lambda item: (-item[1], self._rank.get(item[0], len(PRIORITY))))
+        if not ranking or ranking[0][1] < self.min_score:
+            return ClassificationResult(UNKNOWN, 0.0, ranking)
+
+        top_type, top_score = ranking[0]
+        confidence = round(top_score / sum(scores.values()), 4)
+        logger.debug(f"Classified as {top_type} (confidence {confidence}), ranking: {ranking}")
+        return ClassificationResult(top_type, confidence, ranking)
@@ -1,35 +1,50 @@
-import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from . import classifier
+from .patterns import Common, Aadhaar, PAN, Marksheet, DrivingLicense
+from .classifier import DocumentClassifier, ClassificationResult
+from .driving_license_processor import process_driving_license
+from .passport_processor import process_passport
 
 class RegexCleaner:
+    def __init__(self, document_classifier: Optional[DocumentClassifier] = None):
+        self.classifier = document_classifier or DocumentClassifier()
+        self.parsers = {
+            classifier.AADHAAR: self.parse_aadhaar,
+            classifier.PAN: self.parse_pan,
+            classifier.MARKSHEET: self.extract_marksheet_details,
+            classifier.DRIVING_LICENSE: self.parse_dl,
+            classifier.DRIVING_LICENSE_BASIC: process_driving_license,
+            classifier.PASSPORT: process_passport,
+        }
+
     def parse_aadhaar(self, text: str, full_text_lines: list) -> Dict[str, Any]:
         data = {
             "document_type": "Aadhaar Card",
         }
-        aadhaar_match = re.search(r"\b(\d{4}\s?\d{4}\s?\d{4})\b", text)
+        aadhaar_match = Aadhaar.NUMBER.search(text)
         if aadhaar_match:
             raw_num = aadhaar_match.group(1).replace(" ", "")
             data["aadhaar_number"] = f"{raw_num[:4]} {raw_num[4:8]} {raw_num[8:]}"
             
-        dob_match = re.search(r"\b(\d{2}[\/\-]\d{2}[\/\-]\d{4})\b", text)
+        dob_match = Common.DATE.search(text)
         if dob_match:
             data["dob"] = dob_match.group(1).replace("/", "-")
             
         if "dob" not in data:
-             yob_match = re.search(r"Year of Birth\s*[:\-]?\s*(\d{4})", text, re.IGNORECASE)
+             yob_match = Aadhaar.YEAR_OF_BIRTH.search(text)
              if yob_match:
                  data["dob"] = f"{yob_match.group(1)}-01-01"
         
-        if re.search(r"\b(Male|MALE)\b", text):
+        if Aadhaar.MALE.search(text):
             data["gender"] = "Male"
-        elif re.search(r"\b(Female|FEMALE)\b", text):
+        elif Aadhaar.FEMALE.search(text):
             data["gender"] = "Female"
             
         lines = [line.strip() for line in full_text_lines if line.strip()]
         for line in lines:
              if any(x in line.lower() for x in ["govt", "india", "unique", "authorit", "enrollment", "help", "www", "dob", "year", "male", "female"]):
                  continue
-             if re.match(r"^[A-Z][a-z]+(\s[A-Z][a-z]+)+$", line) or re.match(r"^[A-Z\s]+$", line):
+             if Aadhaar.NAME_TITLE.match(line) or Aadhaar.NAME_UPPER.match(line):
                  if len(line.split()) < 2: continue
                  data["name"] = line.title()
                  break
@@ -39,13 +54,11 @@ class RegexCleaner:
         data = {
             "document_type": "PAN Card",
         }
-        pan_pattern = re.compile(r"[A-Z]{5}[0-9]{4}[A-Z]")
-        pan_match = pan_pattern.search(text)
+        pan_match = PAN.NUMBER.search(text)
         if pan_match:
             data["pan_number"] = pan_match.group(0)
 
-        dob_pattern = re.compile(r"\b(\d{2}[/-]\d{2}[/-]\d{4})\b")
-        dob_match = dob_pattern.search(text)
+        dob_match = Common.DATE.search(text)
         if dob_match:
             data["dob"] = dob_match.group(1).replace('/', '-')
         
@@ -74,7 +87,7 @@ class RegexCleaner:
             dob_str = data["dob"].replace('-', '/')
             dob_index = -1
             for i, line in enumerate(lines):
-                if dob_str in line or data["dob"] in line or re.search(r"\b\d{2}[/-]\d{2}[/-]\d{4}\b", line):
+                if dob_str in line or data["dob"] in line or Common.DATE.search(line):
                     dob_index = i
                     break
                     
@@ -111,11 +124,11 @@ class RegexCleaner:
             "semester_1": [], 
             "remarks": {"P": "Pass", "F": "Fail", "A": "Absent", "W": "Withheld", "X": "Not Eligible"}
         }
-        uni_match = re.search(r"(Visvesvaraya\s+Technological\s+University|VTU|Anna\s+University)", text, re.IGNORECASE)
+        uni_match = Marksheet.UNIVERSITY.search(text)
         if uni_match:
             data["university_name"] = uni_match.group(1).title()
             
-        usn_match = re.search(r"\b([1-4][A-Z]{2}\d{2}[A-Z]{2,6}\d{1,3})\b", text)
+        usn_match = Marksheet.USN.search(text)
         if usn_match:
             data["university_seat_number"] = usn_match.group(1).upper()
             
@@ -144,14 +157,11 @@ class RegexCleaner:
         name_buffer = []
         marks_buffer = []
         
-        sem_header_pattern = re.compile(r"Semester\s*[:\-]?\s*(\d+)", re.IGNORECASE)
-        code_pattern = re.compile(r"^[A-Z0-9]{5,8}$")
-        
         for line in lines:
             clean_line = line.strip()
             if not clean_line: continue
             
-            sem_match = sem_header_pattern.search(clean_line)
+            sem_match = Marksheet.SEMESTER_HEADER.search(clean_line)
             if sem_match:
                 sem_val = sem_match.group(1)
                 current_semester = sem_val
@@ -167,7 +177,7 @@ class RegexCleaner:
             is_new_code = False
             if "Code" not in clean_line and "Subject" not in clean_line:
                 parts = clean_line.split()
-                if len(parts) == 1 and (re.match(r"^\d{2}[A-Z]{2,3}\d{2,4}$", parts[0]) or re.match(r"^[A-Z]{2,3}\d{2,4}$", parts[0])):
+                if len(parts) == 1 and (Marksheet.SUBJECT_CODE.match(parts[0]) or Marksheet.SUBJECT_CODE_SHORT.match(parts[0])):
                     is_new_code = True
 
             if is_new_code:
@@ -190,7 +200,7 @@ class RegexCleaner:
             if state == 'LOOKING_FOR_CODE':
                 # If we have a completed subject, append orphan text to its name to fix alignment splits
                 if current_subject and 'result' in current_subject:
-                    if re.match(r"\d{4}-\d{2}-\d{2}", clean_line) or clean_line.upper() in ["OF", "NA", "N/A"]: continue
+                    if Common.DATE_ISO.match(clean_line) or clean_line.upper() in ["OF", "NA", "N/A"]: continue
                     if clean_line.lower() in ["internal", "external", "total", "result", "grade", "marks", "announced", "/updated", "on", "fail", "pass", "p", "f", "a", "w", "x", "ne->"]: continue
                     if "Nomenclature" in clean_line or "->" in clean_line or "ELIGIBLE" in clean_line.upper(): continue
                     
@@ -202,7 +212,7 @@ class RegexCleaner:
                     marks_buffer = [clean_line]
                     current_subject['subject_name'] = " ".join(name_buffer).strip()
                     state = 'LOOKING_FOR_MARKS'
-                elif re.match(r"^\d+$", clean_line):
+                elif Common.DIGITS.match(clean_line):
                      marks_buffer = [clean_line]
                      current_subject['subject_name'] = " ".join(name_buffer).strip()
                      state = 'LOOKING_FOR_MARKS'
@@ -215,7 +225,7 @@ class RegexCleaner:
                     marks_buffer.append(clean_line)
                 elif clean_line.upper() in ["A", "X", "-"]:
                      marks_buffer.append("0" if clean_line == "-" else clean_line)
-                elif re.match(r"^[PFAWX]$", clean_line.upper()) or clean_line.upper() in ["PASS", "FAIL", "OF", "0F", "NA"]:
+                elif Marksheet.RESULT_LETTER.match(clean_line.upper()) or clean_line.upper() in ["PASS", "FAIL", "OF", "0F", "NA"]:
                      state = 'LOOKING_FOR_RESULT'
                      res = clean_line.upper()
                      if res in ["PASS", "FAIL"]: res = res[0]
@@ -264,9 +274,11 @@ class RegexCleaner:
         lines = [line.strip() for line in full_text_lines if line.strip()]
         
         for i, line in enumerate(lines):
+            line_upper = line.upper()
+            
             # Form Number
-            if "FORM" in line.upper():
-                form_match = re.search(r"FORM\s*-\s*\d+", line, re.IGNORECASE)
+            if "FORM" in line_upper:
+                form_match = DrivingLicense.FORM_NUMBER.search(line)
                 if form_match: data["form_number"] = form_match.group(0).upper()
             
             # DL Number
@@ -277,56 +289,56 @@ class RegexCleaner:
                     data["dl_number"] = lines[i+1].replace(":", "").strip()
                     
             # Issue Date
-            if "DOI" in line.upper() and not "CDOI" in line.upper():
-                doi_match = re.search(r"\d{2}-\d{2}-\d{4}", line)
+            if "DOI" in line_upper and not "CDOI" in line_upper:
+                doi_match = Common.DATE_DASHED.search(line)
                 if doi_match: data["date_of_issue"] = doi_match.group(0)
 
             # Name
-            if line.upper() == "NAME":
+            if line_upper == "NAME":
                 if i + 1 < len(lines):
                     data["name"] = lines[i+1].replace(":", "").strip()
                     
             # DOB
-            if "D.O.B" in line.upper() or "DOB" in line.upper():
-                if i + 1 < len(lines) and re.match(r"\d{2}-\d{2}-\d{4}", lines[i+1]):
+            if "D.O.B" in line_upper or "DOB" in line_upper:
+                if i + 1 < len(lines) and Common.DATE_DASHED.match(lines[i+1]):
                     data["date_of_birth"] = lines[i+1]
                 else:
-                    dob_match = re.search(r"\d{2}-\d{2}-\d{4}", line)
+                    dob_match = Common.DATE_DASHED.search(line)
                     if dob_match: data["date_of_birth"] = dob_match.group(0)
 
             # Valid Till
-            if "VALIDTILL" in line.upper() or "VALID TILL" in line.upper():
-                val_match = re.search(r"\d{2}-\d{2}-\d{4}", line)
+            if "VALIDTILL" in line_upper or "VALID TILL" in line_upper:
+                val_match = Common.DATE_DASHED.search(line)
                 if val_match: data["valid_till"] = val_match.group(0)
                 
             # National Validity
-            if "THROUGHOUT INDIA" in line.upper():
+            if "THROUGHOUT INDIA" in line_upper:
                 data["national_validity"] = line.strip()
 
             # Father Name
-            if line.upper() == "S/O" or line.upper() == "SLO" or line.upper() == "D/O" or line.upper() == "W/O" or "S/O" in line.upper() or "SLO" in line.upper():
+            if line_upper == "S/O" or line_upper == "SLO" or line_upper == "D/O" or line_upper == "W/O" or "S/O" in line_upper or "SLO" in line_upper:
                  if ":" in line and len(line.split(":")) > 1:
                      data["father_name"] = line.split(":")[1].strip()
                  elif i + 1 < len(lines):
                      data["father_name"] = lines[i+1].replace(":", "").strip()
                      
             # Vehicle Classes (MCWG, LMV etc)
-            if "MCWG" in line.upper() or "LMV" in line.upper() or "HMV" in line.upper() or "MCWOG" in line.upper():
+            if "MCWG" in line_upper or "LMV" in line_upper or "HMV" in line_upper or "MCWOG" in line_upper:
                  vclass = ""
-                 if "MCWG" in line.upper(): vclass = "MCWG"
-                 elif "LMV" in line.upper(): vclass = "LMV"
-                 elif "HMV" in line.upper(): vclass = "HMV"
-                 elif "MCWOG" in line.upper(): vclass = "MCWOG"
+                 if "MCWG" in line_upper: vclass = "MCWG"
+                 elif "LMV" in line_upper: vclass = "LMV"
+                 elif "HMV" in line_upper: vclass = "HMV"
+                 elif "MCWOG" in line_upper: vclass = "MCWOG"
                  
                  issue_dt = ""
-                 if i + 1 < len(lines) and re.match(r"\d{2}-\d{2}-\d{4}", lines[i+1]):
+                 if i + 1 < len(lines) and Common.DATE_DASHED.match(lines[i+1]):
                      issue_dt = lines[i+1]
-                 elif i - 1 >= 0 and re.match(r"\d{2}-\d{2}-\d{4}", lines[i-1]):
+                 elif i - 1 >= 0 and Common.DATE_DASHED.match(lines[i-1]):
                      issue_dt = lines[i-1]
-                 elif "DOI" in line.upper():
-                     dt_match = re.search(r"\d{2}-\d{2}-\d{4}", line)
+                 elif "DOI" in line_upper:
+                     dt_match = Common.DATE_DASHED.search(line)
                      if dt_match: issue_dt = dt_match.group(0)
-                 elif dt_local := re.search(r"\d{2}-\d{2}-\d{4}", line):
+                 elif dt_local := Common.DATE_DASHED.search(line):
                      issue_dt = dt_local.group(0)
                  
                  if vclass and not any(vc.get('class') == vclass for vc in data["vehicle_classes"]):
@@ -336,7 +348,7 @@ class RegexCleaner:
                      })
                  
             # Address parsing logic (Starts at "ADDRESS" and ends at "Sign." or "Pin")
-            if "ADDRESS" in line.upper():
+            if "ADDRESS" in line_upper:
                 full_address = ""
                 if ":" in line:
                     full_address += line.split(":")[1].strip() + " "
@@ -352,7 +364,7 @@ class RegexCleaner:
                 # Attempt to structure if it contains commas or specific formatting
                 if full_address:
                     data["address"]["full_raw_address"] = full_address
-                    parts = [p.strip() for p in re.split(r'[,|]', full_address) if p.strip()]
+                    parts = [p.strip() for p in DrivingLicense.ADDRESS_PARTS.split(full_address) if p.strip()]
                     
                     if len(parts) > 0:
                         # Street is usually the first chunk
@@ -360,7 +372,7 @@ class RegexCleaner:
                         # Try to find 'TOWN', 'STREET', etc to split Area from Street if no comma
                         street_val = parts[0]
                         
-                        street_parts = [s.strip() for s in re.split(r'(?i)(TOWN\b)', street_val) if s.strip()]
+                        street_parts = [s.strip() for s in DrivingLicense.ADDRESS_TOWN.split(street_val) if s.strip()]
                         
                         if len(street_parts) > 1:
                             data["address"]["street"] = street_parts[0].replace("TOWN", "").strip()
@@ -391,33 +403,28 @@ class RegexCleaner:
                             data["address"]["state"] = dist_state[1]
 
                     # Extract pincode anywhere
-                    pin_match = re.search(r"\b\d{6}\b", full_address)
+                    pin_match = Common.PINCODE.search(full_address)
                     if pin_match:
                          data["address"]["postal_code"] = pin_match.group(0)
                 
             # Issuing Authority (usually at the bottom with RTO)
-            if "RTO" in line.upper():
+            if "RTO" in line_upper:
                  data["issuing_authority"] = line.strip()
 
         return data
 
-    def extract_document(self, raw_text: str, lines: list) -> Dict[str, Any]:
-        """Tries to parse document parameters from arbitrary text. Returns dict of keys."""
-        base_data = {}
-        # Aadhaar detection: Look for 12 digits (with or without spaces), or MALE/FEMALE keywords
-        if re.search(r"\b\d{4}\s?\d{4}\s?\d{4}\b", raw_text) or "MALE" in raw_text.upper() or "FEMALE" in raw_text.upper() or "DOB" in raw_text.upper():
-             base_data = self.parse_aadhaar(raw_text, lines)
+    def extract_document(self, raw_text: str, lines: list, classification: Optional[ClassificationResult] = None) -> Dict[str, Any]:
+        """
+        Tries to parse document parameters from arbitrary text. Returns dict of keys.
+        Routing uses a single classifier scan; pass a precomputed `classification` to reuse one.
+        """
+        if classification is None:
+            classification = self.classifier.classify(raw_text)
         
-        if not base_data.get("document_type") and re.search(r"[A-Z]{5}\d{4}[A-Z]", raw_text):
-             base_data = self.parse_pan(raw_text, lines)
-             
-        if not base_data.get("document_type") and ( "UNIVERSITY" in raw_text.upper() or "MARKS" in raw_text.upper() or "RESULT" in raw_text.upper()):
-             base_data = self.extract_marksheet_details(raw_text, lines)
-             
-        if not base_data.get("document_type") and ( "DL No" in raw_text or "DLNo" in raw_text or "DRIVING LICENCE" in raw_text.upper() or "THROUGHOUT INDIA" in raw_text.upper() or "LICENCING AUTHORITY" in raw_text.upper()):
-             base_data = self.parse_dl(raw_text, lines)
+        parser = self.parsers.get(classification.document_type)
+        base_data = parser(raw_text, lines) if parser else {}
         
-        # Simple extraction for DL/Passport/VoterID logic would go here, falling back to Donut usually
+        # Unrecognized documents fall back to Donut usually
         if not base_data.get("document_type"):
             base_data["document_type"] = "Unknown"
             
@@ -2,7 +2,9 @@ import json
 import shutil
 import os
 import uuid
-from typing import Dict, Any
+import cv2
+import numpy as np
+from typing import Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,16 +20,17 @@ class DatasetBuilder:
         os.makedirs(self.annotations_dir, exist_ok=True)
         os.makedirs(self.rejected_dir, exist_ok=True)
 
-    def save_record(self, original_image_path: str, is_valid: bool, data: Dict[str, Any], error_msg: str = ""):
+    def save_record(self, original_image_path: str, is_valid: bool, data: Dict[str, Any], error_msg: str = "", image: Optional[np.ndarray] = None):
         """
         Saves image and JSON based on validation status.
-        Uses a unique identifier.
+        Uses a unique identifier. If an in-memory `image` is given it is written
+        as JPEG instead of copying the original file.
         """
         doc_type = data.get('document_type', 'Unknown').replace(" ", "_").lower()
         unique_id = f"{doc_type}_{uuid.uuid4().hex[:8]}"
         
         # Determine image extension
-        ext = os.path.splitext(original_image_path)[1]
+        ext = ".jpg" if image is not None else os.path.splitext(original_image_path)[1]
         image_filename = f"{unique_id}{ext}"
         
         if doc_type in ["driving_license", "passport"]:
@@ -44,7 +47,11 @@ class DatasetBuilder:
              target_json_path = os.path.join(self.rejected_dir if not is_valid else self.annotations_dir, f"{unique_id}.json")
         
         try:
-             shutil.copy2(original_image_path, target_img_path)
+             if image is not None:
+                 if not cv2.imwrite(target_img_path, image):
+                     raise IOError(f"cv2.imwrite failed for {target_img_path}")
+             else:
+                 shutil.copy2(original_image_path, target_img_path)
         except Exception as e:
              logger.error(f"Failed to copy image to dataset: {e}")
              return
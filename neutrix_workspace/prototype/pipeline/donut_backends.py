@@ -0,0 +1,260 @@
+import os
+import sys
+import logging
+import subprocess
+import numpy as np
+from typing import List, Optional, Tuple, Dict
+try:
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Both backends share one contract: a batch of pixel values in, one (token ids incl. prompt, confidence) per row out.
+# torch is only imported by the torch backend, so ONNX workers never pay for it.
+
+class TorchDonutBackend:
+    name = "torch"
+
+    def __init__(self, model_name: str, quantize: str = "none", compile_model: bool = False, channels_last: bool = False):
+        self.model_name = model_name
+        self.quantize = quantize
+        self.compile_model = compile_model
+        self.channels_last = channels_last
+        self.model = None
+
+    @property
+    def variant(self) -> str:
+        parts = []
+        if self.quantize != "none":
+            parts.append(self.quantize)
+        if self.channels_last:
+            parts.append("channels_last")
+        if self.compile_model:
+            parts.append("compile")
+        return "+".join(parts) or "fp32"
+
+    @property
+    def max_positions(self) -> int:
+        return self.model.decoder.config.max_position_embeddings
+
+    def load(self):
+        from transformers import VisionEncoderDecoderModel
+        self.model = VisionEncoderDecoderModel.from_pretrained(self.model_name)
+        self.model.to("cpu")
+        self.model.eval()
+        self._optimize(self.model)
+
+    def _optimize(self, model):
+        import torch
+        if self.quantize == "int8":
+            # Dynamic quantization: Linear weights stored as int8, activations quantized per batch at runtime.
+            # Covers the Swin encoder and mBART decoder projections, which dominate CPU time.
+            model.encoder = torch.quantization.quantize_dynamic(model.encoder, {torch.nn.Linear}, dtype=torch.qint8)
+            model.decoder = torch.quantization.quantize_dynamic(model.decoder, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info("Donut Linear layers quantized to int8.")
+
+        if self.channels_last:
+            # Only the encoder's patch embedding is convolutional, the input is converted per call as well
+            model.encoder.to(memory_format=torch.channels_last)
+
+        if self.compile_model:
+            # The encoder sees a fixed input size and compiles once; the decoder's shape changes every
+            # generation step and stays eager to avoid recompiles
+            try:
+                model.encoder = torch.compile(model.encoder)
+                logger.info("Donut encoder compiled with torch.compile.")
+            except Exception as e:
+                logger.warning(f"torch.compile unavailable for Donut encoder, staying eager: {e}")
+
+    def generate(self, pixel_values: np.ndarray, prompt_ids: List[int], max_new_tokens: int, num_beams: int,
+                 stop_ids: List[int], pad_id: int, bad_ids: List[int], with_confidence: bool) -> List[Tuple[List[int], Optional[float]]]:
+        import torch
+        pixel_tensor = torch.from_numpy(pixel_values)
+        if self.channels_last:
+            pixel_tensor = pixel_tensor.contiguous(memory_format=torch.channels_last)
+        # Every row shares the prompt, so the batch needs no decoder padding
+        decoder_input_ids = torch.tensor([prompt_ids] * len(pixel_values), dtype=torch.long)
+
+        with torch.inference_mode():
+            outputs = self.model.generate(
+                pixel_tensor,
+                decoder_input_ids=decoder_input_ids,
+                max_new_tokens=max_new_tokens,
+                num_beams=num_beams,
+                early_stopping=num_beams > 1,
+                pad_token_id=pad_id,
+                eos_token_id=stop_ids,
+                bad_words_ids=[[token_id] for token_id in bad_ids],
+                return_dict_in_generate=True,
+                output_scores=with_confidence
+            )
+
+        sequences = [trim_sequence(row, len(prompt_ids), stop_ids, pad_id) for row in outputs.sequences.tolist()]
+        confidences = self._confidences(outputs, num_beams, sequences, len(prompt_ids)) if with_confidence else [None] * len(sequences)
+        return list(zip(sequences, confidences))
+
+    def _confidences(self, outputs, num_beams: int, sequences: List[List[int]], prompt_length: int) -> List[Optional[float]]:
+        """Mean probability of each row's generated tokens, ignoring the padding after it stopped."""
+        try:
+            transition_scores = self.model.compute_transition_scores(
+                outputs.sequences, outputs.scores,
+                beam_indices=getattr(outputs, "beam_indices", None) if num_beams > 1 else None,
+                normalize_logits=num_beams == 1
+            )
+            confidences = []
+            for row, sequence in zip(transition_scores, sequences):
+                generated = max(1, len(sequence) - prompt_length)
+                confidences.append(round(float(row[:generated].exp().mean()), 4))
+            return confidences
+        except Exception as e:
+            logger.warning(f"Could not compute Donut confidence: {e}")
+            return [None] * len(sequences)
+
+
+class OnnxDonutBackend:
+    """
+    Runs Donut through onnxruntime's CPU provider. The encoder and both decoders
+    (first step, and with past key/values) are exported once with optimum into
+    `onnx_dir` and reused from disk afterwards. Decoding is greedy with KV-cache reuse.
+    """
+    name = "onnx"
+    ENCODER = "encoder_model.onnx"
+    DECODER = "decoder_model.onnx"
+    DECODER_WITH_PAST = "decoder_with_past_model.onnx"
+
+    def __init__(self, model_name: str, onnx_dir: Optional[str] = None, intra_op_threads: int = 0):
+        self.model_name = model_name
+        self.onnx_dir = onnx_dir or os.path.join("models", "donut_onnx", model_name.replace("/", "--"))
+        self.intra_op_threads = intra_op_threads
+        self.encoder = None
+        self.decoder = None
+        self.decoder_with_past = None
+        self._max_positions = None
+        self._output_names: Dict[int, List[str]] = {}
+
+    @property
+    def variant(self) -> str:
+        return "onnx"
+
+    @property
+    def max_positions(self) -> int:
+        return self._max_positions
+
+    def load(self):
+        if not ONNX_AVAILABLE:
+            raise RuntimeError("onnxruntime is not installed, cannot use DONUT_BACKEND=onnx")
+        from transformers import AutoConfig
+
+        self.export()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.intra_op_threads:
+            options.intra_op_num_threads = self.intra_op_threads
+
+        def session(filename):
+            sess = ort.InferenceSession(os.path.join(self.onnx_dir, filename), options, providers=["CPUExecutionProvider"])
+            self._output_names[id(sess)] = [output.name for output in sess.get_outputs()]
+            return sess
+
+        self.encoder = session(self.ENCODER)
+        self.decoder = session(self.DECODER)
+        self.decoder_with_past = session(self.DECODER_WITH_PAST)
+        self._max_positions = AutoConfig.from_pretrained(self.model_name).decoder.max_position_embeddings
+
+    def export(self):
+        """Exports the model with optimum once. Runs in a child process so torch never loads into the worker."""
+        expected = [self.ENCODER, self.DECODER, self.DECODER_WITH_PAST]
+        if all(os.path.exists(os.path.join(self.onnx_dir, name)) for name in expected):
+            return
+
+        logger.info(f"⏳ Exporting {self.model_name} to ONNX in {self.onnx_dir} (one-time)...")
+        os.makedirs(self.onnx_dir, exist_ok=True)
+        subprocess.run(
+            [sys.executable, "-m", "optimum.exporters.onnx", "--model", self.model_name,
+             "--task", "image-to-text-with-past", "--no-post-process", self.onnx_dir],
+            check=True
+        )
+        logger.info("✅ Donut ONNX export complete.")
+
+    def generate(self, pixel_values: np.ndarray, prompt_ids: List[int], max_new_tokens: int, num_beams: int,
+                 stop_ids: List[int], pad_id: int, bad_ids: List[int], with_confidence: bool) -> List[Tuple[List[int], Optional[float]]]:
+        if num_beams > 1:
+            logger.debug("ONNX Donut backend decodes greedily, ignoring num_beams.")
+
+        # One encoder pass for the whole batch; its output is reused by every decoding step
+        encoder_hidden_states = self.encoder.run(None, {"pixel_values": pixel_values.astype(np.float32)})[0]
+        batch_size = len(pixel_values)
+
+        sequences = [list(prompt_ids) for _ in range(batch_size)]
+        finished = [False] * batch_size
+        probabilities = [[] for _ in range(batch_size)]
+        step_ids = np.array(sequences, dtype=np.int64)
+        past = {}
+        for _ in range(max_new_tokens):
+            # The first step sees the whole prompt, later steps only the new token plus the cached keys/values
+            session = self.decoder_with_past if past else self.decoder
+            feed = {}
+            for model_input in session.get_inputs():
+                if model_input.name == "input_ids":
+                    feed["input_ids"] = step_ids
+                elif model_input.name == "encoder_hidden_states":
+                    feed["encoder_hidden_states"] = encoder_hidden_states
+                elif model_input.name in past:
+                    feed[model_input.name] = past[model_input.name]
+
+            outputs = dict(zip(self._output_names[id(session)], session.run(None, feed)))
+            # Cross-attention keys/values only come out of the first step and stay in the cache as-is
+            for name, value in outputs.items():
+                if name.startswith("present."):
+                    past["past_key_values." + name[len("present."):]] = value
+
+            logits = outputs["logits"][:, -1]
+            logits[:, bad_ids] = -np.inf
+            next_ids = logits.argmax(axis=-1)
+            for row, token_id in enumerate(next_ids.tolist()):
+                if finished[row]:
+                    # Finished rows keep decoding padding so the batch stays rectangular
+                    next_ids[row] = pad_id
+                    continue
+                if with_confidence:
+                    shifted = np.exp(logits[row] - logits[row, token_id])
+                    probabilities[row].append(1.0 / float(shifted.sum()))
+                sequences[row].append(token_id)
+                finished[row] = token_id in stop_ids
+
+            if all(finished):
+                break
+            step_ids = next_ids.reshape(batch_size, 1).astype(np.int64)
+
+        return [
+            (sequence, round(float(np.mean(probs)), 4) if with_confidence and probs else None)
+            for sequence, probs in zip(sequences, probabilities)
+        ]
+
+
+def trim_sequence(sequence: List[int], prompt_length: int, stop_ids: List[int], pad_id: int) -> List[int]:
+    """Cuts a batched row after its first stop token, or drops the padding that filled it up."""
+    for idx in range(prompt_length, len(sequence)):
+        if sequence[idx] in stop_ids:
+            return sequence[:idx + 1]
+    while len(sequence) > prompt_length and sequence[-1] == pad_id:
+        sequence = sequence[:-1]
+    return sequence
+
+
+def build_backend(name: str, model_name: str, quantize: str = "none", compile_model: bool = False,
+                  channels_last: bool = False):
+    if name == "torch":
+        return TorchDonutBackend(model_name, quantize=quantize, compile_model=compile_model, channels_last=channels_last)
+    if name == "onnx":
+        if quantize != "none" or compile_model or channels_last:
+            logger.warning("DONUT_QUANTIZE / DONUT_TORCH_COMPILE / DONUT_CHANNELS_LAST only apply to the torch backend.")
+        return OnnxDonutBackend(
+            model_name,
+            onnx_dir=os.environ.get("DONUT_ONNX_DIR") or None,
+            intra_op_threads=int(os.environ.get("DONUT_ONNX_THREADS", 0)),
+        )
+    raise ValueError(f"Unsupported DONUT_BACKEND: {name}")
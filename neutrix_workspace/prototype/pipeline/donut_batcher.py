@@ -0,0 +1,111 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Union, Optional, List, Tuple
+import numpy as np
+from .donut_engine import DonutEngine, DEFAULT_PROMPT
+
+logger = logging.getLogger(__name__)
+
+class DonutBatcher:
+    """
+    Micro-batching scheduler in front of DonutEngine.
+    Fallback requests from concurrent callers are collected for up to `max_wait_ms`
+    or `max_batch_size` items, grouped by prompt, document type budget and confidence setting,
+    and each group runs as one encoder pass plus one batched decode.
+    Callers get a Future per request; process_image keeps the engine's blocking contract.
+    """
+    def __init__(self, engine: DonutEngine, max_batch_size: int = 4, max_wait_ms: int = 50):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "largest_batch": 0}
+        self._thread = None
+        self._owner_pid = None
+
+    @classmethod
+    def from_env(cls, engine: DonutEngine) -> Optional["DonutBatcher"]:
+        max_batch_size = int(os.environ.get("DONUT_BATCH_MAX_SIZE", 1))
+        if max_batch_size <= 1:
+            return None
+        return cls(engine, max_batch_size=max_batch_size, max_wait_ms=int(os.environ.get("DONUT_BATCH_MAX_WAIT_MS", 50)))
+
+    def submit(self, image: Union[str, np.ndarray], prompt: str = DEFAULT_PROMPT,
+               document_type: Optional[str] = None, with_confidence: Optional[bool] = None) -> Future:
+        self._ensure_started()
+        future = Future()
+        if with_confidence is None:
+            with_confidence = self.engine.return_confidence
+        # Requests only share a batch when they decode with the same prompt and settings
+        group = (prompt, document_type, with_confidence)
+        self._queue.put((group, image, future))
+        return future
+
+    def process_image(self, image: Union[str, np.ndarray], prompt: str = DEFAULT_PROMPT,
+                      document_type: Optional[str] = None, with_confidence: Optional[bool] = None) -> Dict[str, Any]:
+        return self.submit(image, prompt, document_type, with_confidence).result()
+
+    def _ensure_started(self):
+        # Started on first use, and again in a forked child, since threads do not survive fork
+        if self._thread is not None and self._owner_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._owner_pid != os.getpid():
+                self._queue = queue.Queue()
+                self._owner_pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="donut-batcher", daemon=True)
+                self._thread.start()
+                logger.info(f"Donut batcher started (batch up to {self.max_batch_size} requests, waiting at most {self.max_wait_ms} ms)")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            batches = self._stats["batches"]
+            return dict(
+                self._stats,
+                avg_batch_size=round(self._stats["requests"] / batches, 2) if batches else 0.0,
+                queued=self._queue.qsize(),
+            )
+
+    def _collect(self) -> List[Tuple[tuple, Any, Future]]:
+        """Blocks for the first request, then gathers more until the batch is full or the wait runs out."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            groups: Dict[tuple, List[Tuple[Any, Future]]] = {}
+            for group, image, future in batch:
+                groups.setdefault(group, []).append((image, future))
+
+            for (prompt, document_type, with_confidence), items in groups.items():
+                futures = [future for _, future in items]
+                try:
+                    results = self.engine.process_batch([image for image, _ in items], prompt, document_type, with_confidence)
+                    for future, result in zip(futures, results):
+                        future.set_result(result)
+                except Exception as e:
+                    logger.error(f"Donut batch of {len(items)} failed: {e}")
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+
+                with self._lock:
+                    self._stats["requests"] += len(items)
+                    self._stats["batches"] += 1
+                    self._stats["largest_batch"] = max(self._stats["largest_batch"], len(items))
@@ -1,68 +1,244 @@
-from transformers import AutoProcessor, VisionEncoderDecoderModel
-import torch
+from transformers import AutoProcessor
+import cv2
+import numpy as np
 from PIL import Image
+import os
 import re
 import json
+import time
 import logging
-from typing import Dict, Any
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Union, Optional, Tuple, List
+from .donut_backends import build_backend
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class GenerationBudget:
+    max_new_tokens: int = 256
+    num_beams: int = 1
+    # Generation stops as soon as one of these tags is produced, instead of waiting for </s>
+    stop_tags: Tuple[str, ...] = ("</s_answer>",)
+
+# Keyed by document type (the names pipeline.classifier uses), picked from the request's document_type
+# hint since Donut only runs on documents the classifier could not type; "default" otherwise
+DEFAULT_BUDGETS: Dict[str, GenerationBudget] = {
+    "default": GenerationBudget(),
+    "Aadhaar Card": GenerationBudget(max_new_tokens=128),
+    "PAN Card": GenerationBudget(max_new_tokens=128),
+    "passport": GenerationBudget(max_new_tokens=192),
+    "Marksheet": GenerationBudget(max_new_tokens=512),
+}
+
+DEFAULT_PROMPT = "<s_docvqa><s_question>extract all fields</s_question><s_answer>"
+
 class DonutEngine:
-    def __init__(self, model_name: str = "naver-clova-ix/donut-base-finetuned-docvqa"):
+    def __init__(self, model_name: str = "naver-clova-ix/donut-base-finetuned-docvqa", quantize: Optional[str] = None,
+                 compile_model: Optional[bool] = None, channels_last: Optional[bool] = None, backend: Optional[str] = None):
         self.model_name = model_name
         self.processor = None
         self.model = None
         self.device = None
 
-    def _get_model(self):
-        if self.model is None or self.processor is None:
+        # CPU load-time optimizations, all off by default (see benchmarks/donut_benchmark.py before enabling)
+        self.quantize = (quantize if quantize is not None else os.environ.get("DONUT_QUANTIZE", "none")).lower()
+        if self.quantize not in ("none", "int8"):
+            raise ValueError(f"Unsupported DONUT_QUANTIZE mode: {self.quantize}")
+        self.compile_model = compile_model if compile_model is not None else os.environ.get("DONUT_TORCH_COMPILE", "False").lower() == "true"
+        self.channels_last = channels_last if channels_last is not None else os.environ.get("DONUT_CHANNELS_LAST", "False").lower() == "true"
+
+        # "torch" runs VisionEncoderDecoderModel.generate, "onnx" an exported copy through onnxruntime
+        self.backend_name = (backend or os.environ.get("DONUT_BACKEND", "torch")).lower()
+        self.backend = build_backend(self.backend_name, model_name, quantize=self.quantize,
+                                     compile_model=self.compile_model, channels_last=self.channels_last)
+
+        self.budgets = self._load_budgets()
+        # Scores cost one logits tensor per generated step, so they are only kept when a confidence is wanted
+        self.return_confidence = os.environ.get("DONUT_RETURN_CONFIDENCE", "False").lower() == "true"
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stats = {"calls": 0, "generated_tokens": 0, "latency_ms": 0.0, "budget_exhausted": 0}
+        self._recent = deque(maxlen=100)
+
+    @staticmethod
+    def _load_budgets() -> Dict[str, GenerationBudget]:
+        """
+        Per document type budgets. DONUT_MAX_NEW_TOKENS / DONUT_NUM_BEAMS change the default,
+        DONUT_GENERATION_BUDGETS (JSON, e.g. {"Marksheet": {"max_new_tokens": 384}}) overrides single types.
+        """
+        budgets = dict(DEFAULT_BUDGETS)
+        default = budgets["default"]
+        budgets["default"] = GenerationBudget(
+            max_new_tokens=int(os.environ.get("DONUT_MAX_NEW_TOKENS", default.max_new_tokens)),
+            num_beams=int(os.environ.get("DONUT_NUM_BEAMS", default.num_beams)),
+            stop_tags=default.stop_tags,
+        )
+        overrides = os.environ.get("DONUT_GENERATION_BUDGETS")
+        if overrides:
             try:
-                logger.info("⏳ Loading Donut Processor & Model (Lazy Load)...")
-                self.processor = AutoProcessor.from_pretrained(self.model_name)
-                self.model = VisionEncoderDecoderModel.from_pretrained(self.model_name)
-                self.device = "cpu"
-                self.model.to(self.device)
-                self.model.eval()
-                logger.info(f"✅ Donut ready on {self.device}.")
+                for doc_type, values in json.loads(overrides).items():
+                    base = asdict(budgets.get(doc_type, budgets["default"]))
+                    base.update(values)
+                    base["stop_tags"] = tuple(base["stop_tags"])
+                    budgets[doc_type] = GenerationBudget(**base)
             except Exception as e:
-                logger.error(f"❌ Donut initialization failed: {e}")
-                raise
+                logger.error(f"❌ Ignoring invalid DONUT_GENERATION_BUDGETS: {e}")
+        return budgets
+
+    def _get_model(self):
+        if self.model is None or self.processor is None:
+            with self._load_lock:
+                if self.model is None or self.processor is None:
+                    try:
+                        logger.info(f"⏳ Loading Donut Processor & Model (Lazy Load, {self.backend_name} backend)...")
+                        self.processor = AutoProcessor.from_pretrained(self.model_name)
+                        self.backend.load()
+                        self.model = self.backend
+                        self.device = "cpu"
+                        logger.info(f"✅ Donut ready on {self.device} ({self.variant}).")
+                    except Exception as e:
+                        logger.error(f"❌ Donut initialization failed: {e}")
+                        raise
         return self.model, self.processor, self.device
 
-    def process_image(self, image_path: str, prompt: str = "<s_docvqa><s_question>extract all fields</s_question><s_answer>") -> Dict[str, Any]:
+    def load(self):
+        """Loads the processor and model now instead of on the first fallback (warm-up, preload)."""
+        self._get_model()
+
+    @property
+    def variant(self) -> str:
+        """Short name of the backend and load-time optimizations, part of the result cache version."""
+        return self.backend.variant
+
+    def budget_for(self, document_type: Optional[str] = None) -> GenerationBudget:
+        """Budget for a document type, matched loosely since hints come from clients ("aadhaar", "pan card", "PASSPORT")."""
+        if not document_type:
+            return self.budgets["default"]
+        budget = self.budgets.get(document_type)
+        if budget is not None:
+            return budget
+        wanted = document_type.strip().lower()
+        for name, budget in self.budgets.items():
+            if wanted in (name.lower(), name.lower().split()[0]):
+                return budget
+        return self.budgets["default"]
+
+    def process_image(self, image: Union[str, np.ndarray], prompt: str = DEFAULT_PROMPT,
+                      document_type: Optional[str] = None, with_confidence: Optional[bool] = None) -> Dict[str, Any]:
         """
-        Runs Donut layout-based extraction. 
+        Runs Donut layout-based extraction on an image path or a decoded BGR array.
+        Generation is bounded by the budget for `document_type`; with `with_confidence`
+        (defaults to DONUT_RETURN_CONFIDENCE) the result carries a `donut_confidence`.
         Returns parsed JSON dict or empty dict on failure.
         """
+        return self.process_batch([image], prompt, document_type, with_confidence)[0]
+
+    def process_batch(self, images: List[Union[str, np.ndarray]], prompt: str = DEFAULT_PROMPT,
+                      document_type: Optional[str] = None, with_confidence: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Same as process_image for several documents sharing a prompt and budget:
+        one encoder pass over the stacked batch, then one batched decode.
+        Returns one parsed dict per image (empty dicts on failure).
+        """
+        if with_confidence is None:
+            with_confidence = self.return_confidence
+        budget = self.budget_for(document_type)
+
         try:
             model, processor, device = self._get_model()
-            image = Image.open(image_path).convert("RGB")
-            
-            pixel_values = processor(image, return_tensors="pt").pixel_values
-            pixel_values = pixel_values.to(device)
-
-            decoder_input_ids = processor.tokenizer(prompt, add_special_tokens=False, return_tensors="pt").input_ids
-            decoder_input_ids = decoder_input_ids.to(device)
-            
-            outputs = model.generate(
+            pil_images = [self._to_pil(image) for image in images]
+            start = time.perf_counter()
+
+            # The processor resizes and pads every page to the encoder input size, so the batch stacks as-is
+            pixel_values = processor(pil_images, return_tensors="np").pixel_values
+            prompt_ids = processor.tokenizer(prompt, add_special_tokens=False).input_ids
+
+            # Never ask for more tokens than the decoder has positions left
+            max_new_tokens = min(budget.max_new_tokens, model.max_positions - len(prompt_ids))
+
+            generations = model.generate(
                 pixel_values,
-                decoder_input_ids=decoder_input_ids,
-                max_length=model.decoder.config.max_position_embeddings,
-                pad_token_id=processor.tokenizer.pad_token_id,
-                eos_token_id=processor.tokenizer.eos_token_id,
-                bad_words_ids=[[processor.tokenizer.unk_token_id]],
-                return_dict_in_generate=True,
-                output_scores=True
+                prompt_ids,
+                max_new_tokens=max_new_tokens,
+                num_beams=budget.num_beams,
+                stop_ids=self._stop_token_ids(processor.tokenizer, budget),
+                pad_id=processor.tokenizer.pad_token_id,
+                bad_ids=[processor.tokenizer.unk_token_id],
+                with_confidence=with_confidence
             )
-            
-            sequence = processor.batch_decode(outputs.sequences)[0]
-            sequence = sequence.replace(processor.tokenizer.eos_token, "").replace(processor.tokenizer.pad_token, "")
-            # Remove prompt
-            sequence = re.sub(r"<.*?>", "", sequence, count=1).strip()  
+            latency = time.perf_counter() - start
+
+            results = []
+            for sequence_ids, confidence in generations:
+                self._record(document_type, len(sequence_ids) - len(prompt_ids), max_new_tokens, latency, len(images))
 
-            return processor.token2json(sequence)
+                sequence = processor.batch_decode([sequence_ids])[0]
+                sequence = sequence.replace(processor.tokenizer.eos_token, "").replace(processor.tokenizer.pad_token, "")
+                # Remove prompt
+                sequence = re.sub(r"<.*?>", "", sequence, count=1).strip()
+
+                result = processor.token2json(sequence)
+                if confidence is not None and isinstance(result, dict):
+                    result["donut_confidence"] = confidence
+                results.append(result)
+            return results
 
         except Exception as e:
             logger.error(f"Donut Extraction Failed: {e}")
-            return {}
+            return [{} for _ in images]
+
+    @staticmethod
+    def _stop_token_ids(tokenizer, budget: GenerationBudget) -> list:
+        stop_ids = [tokenizer.eos_token_id]
+        for tag in budget.stop_tags:
+            token_id = tokenizer.convert_tokens_to_ids(tag)
+            # Tags missing from the vocabulary map to <unk> and would never stop anything useful
+            if token_id is not None and token_id != tokenizer.unk_token_id and token_id not in stop_ids:
+                stop_ids.append(token_id)
+        return stop_ids
+
+    def _record(self, document_type: Optional[str], generated_tokens: int, max_new_tokens: int, latency: float, batch_size: int = 1):
+        """
+        Records one document. Every row of a batch waits for the whole batch, so `latency_ms`
+        (and the averages) is the batch's wall time; `compute_share_ms` is the row's equal share of it.
+        """
+        latency_ms = round(latency * 1000, 1)
+        compute_share_ms = round(latency * 1000 / batch_size, 1)
+        exhausted = generated_tokens >= max_new_tokens
+        logger.info(f"Donut generated {generated_tokens}/{max_new_tokens} tokens in {latency_ms} ms "
+                    f"(budget: {document_type or 'default'}, batch of {batch_size}{', exhausted' if exhausted else ''})")
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["generated_tokens"] += generated_tokens
+            self._stats["latency_ms"] += latency_ms
+            self._stats["budget_exhausted"] += int(exhausted)
+            self._recent.append({
+                "document_type": document_type or "default",
+                "generated_tokens": generated_tokens,
+                "max_new_tokens": max_new_tokens,
+                "latency_ms": latency_ms,
+                "compute_share_ms": compute_share_ms,
+                "batch_size": batch_size,
+            })
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Per-call latency and token counts of recent generations, plus totals, for tuning the budgets."""
+        with self._lock:
+            calls = self._stats["calls"]
+            return dict(
+                self._stats,
+                avg_latency_ms=round(self._stats["latency_ms"] / calls, 1) if calls else 0.0,
+                avg_generated_tokens=round(self._stats["generated_tokens"] / calls, 1) if calls else 0.0,
+                recent=list(self._recent),
+                budgets={doc_type: asdict(budget) for doc_type, budget in self.budgets.items()},
+            )
+
+    @staticmethod
+    def _to_pil(image: Union[str, np.ndarray]) -> Image.Image:
+        if isinstance(image, np.ndarray):
+            code = cv2.COLOR_GRAY2RGB if image.ndim == 2 else cv2.COLOR_BGR2RGB
+            return Image.fromarray(cv2.cvtColor(image, code))
+        return Image.open(image).convert("RGB")
@@ -1,127 +1,499 @@
 import os
+import base64
 import logging
-from typing import Dict, Any
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, Callable, Union
 from .preprocess import Preprocessor
-from .ocr_engine import OCREngine
-from .donut_engine import DonutEngine
 from .cleaner import RegexCleaner
 from .validator import Validator
 from .dataset_builder import DatasetBuilder
+from .result_cache import ResultCache
+from utils.pdf_processor import PDFProcessor, PDFDocument
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever parsing or merge logic changes so stale cached results are not served
+PIPELINE_VERSION = "1.3.0"
+
+# Set by the pipeline itself after Donut runs, never taken from Donut output
+DONUT_PROTECTED_KEYS = ("raw_text", "face_image", "face_image_url", "ocr_accuracy_score")
+
+# How a result carries the face crop: inlined as base64, as a link to /api/v1/face/<document hash>,
+# or not at all (the face is then never detected or encoded)
+FACE_MODES = ("inline", "url", "none")
+FACE_ROUTE = "/api/v1/face/"
+
+def normalize_face_mode(face_mode: Optional[str]) -> str:
+    face_mode = (face_mode or "inline").strip().lower()
+    if face_mode not in FACE_MODES:
+        raise ValueError(f"face must be one of {', '.join(FACE_MODES)}")
+    return face_mode
+
+def face_key(face_id: str) -> str:
+    """Artifact store key of the face crop of a document, by the document's SHA-256."""
+    return f"{face_id}.face.jpg"
+
+def store_face(face_id: str, jpeg: bytes) -> Dict[str, Any]:
+    """
+    Stores a face crop once per document in the artifact store and returns the result
+    fields linking to it. Falls back to inlining it if the store cannot take it.
+    """
+    from utils.blob_store import get_artifact_store
+    try:
+        # Nothing releases artifacts, they expire with the store's TTL
+        get_artifact_store().put_bytes(jpeg, key=face_key(face_id), lease=False)
+    except Exception as e:
+        logger.warning(f"Could not store face crop of {face_id[:12]}, inlining it: {e}")
+        return {"face_image": base64.b64encode(jpeg).decode("utf-8")}
+    return {"face_image": None, "face_image_url": FACE_ROUTE + face_id}
+
 class HybridExtractorPipeline:
     def __init__(self, use_donut: bool = False):
         logger.info("Initializing Hybrid Extractor Pipeline...")
         self.preprocessor = Preprocessor()
-        self.ocr_engine = OCREngine()
         self.cleaner = RegexCleaner()
         self.dataset_builder = DatasetBuilder()
+        self.pdf_processor = PDFProcessor()
+        
+        # Pages of one PDF are rendered lazily and preprocessed on this many threads
+        self.page_workers = int(os.environ.get("PDF_PAGE_WORKERS", min(4, os.cpu_count() or 1)))
+        self.max_pages = int(os.environ.get("PDF_MAX_PAGES", 10))
+        self.default_pages = os.environ.get("PDF_DEFAULT_PAGES", "first")
+        
+        # Docling is opt-in: per request, or for the document types listed here (comma separated)
+        self.docling_document_types = {
+            t.strip().lower() for t in os.environ.get("DOCLING_DOCUMENT_TYPES", "").split(",") if t.strip()
+        }
+        self.docling_min_chars = int(os.environ.get("DOCLING_MIN_TEXT_CHARS", 40))
+        self.native_page_dpi = int(os.environ.get("PDF_NATIVE_PAGE_DPI", 150))
+        self.use_text_layer = os.environ.get("PDF_TEXT_LAYER", "True").lower() == "true"
+        self.layout_cache = ResultCache(
+            max_entries=int(os.environ.get("DOCLING_CACHE_SIZE", 64)),
+            cache_dir=os.environ.get("DOCLING_CACHE_DIR") or None,
+            ttl_seconds=int(os.environ.get("DOCLING_CACHE_TTL", 7 * 86400)),
+        )
         
         self.use_donut = use_donut
-        if self.use_donut:
-             self.donut_engine = DonutEngine()
+        self.donut_batcher = None
+        inference_socket = os.environ.get("INFERENCE_SERVER_SOCKET")
+        if inference_socket:
+            # Models live in the standalone inference server (pipeline.inference_server), which also
+            # batches across clients; engines are imported lazily so this process never loads paddle/torch
+            from .inference_client import InferenceClient, RemoteOCREngine, RemoteDonutEngine
+            client = InferenceClient(inference_socket)
+            self.ocr_engine = RemoteOCREngine(client)
+            self.donut_engine = RemoteDonutEngine(client) if self.use_donut else None
+            logger.info(f"Using inference server at {inference_socket}")
         else:
-             self.donut_engine = None
+            from .ocr_engine import OCREngine
+            from .donut_engine import DonutEngine
+            from .donut_batcher import DonutBatcher
+            self.ocr_engine = OCREngine()
+            self.donut_engine = DonutEngine() if self.use_donut else None
+            # Optional micro-batching of concurrent Donut fallbacks (DONUT_BATCH_MAX_SIZE > 1)
+            self.donut_batcher = DonutBatcher.from_env(self.donut_engine) if self.donut_engine else None
+        # In async mode the regex/OCR result is returned right away with `donut_pending`
+        # and the caller queues Donut enrichment separately (see enrich_with_donut)
+        self.donut_async = os.environ.get("DONUT_ASYNC", "False").lower() == "true"
+        
+        self.result_cache = ResultCache.from_env()
+        # Default for requests that do not pass `face`
+        self.face_mode = normalize_face_mode(os.environ.get("FACE_MODE"))
 
-    def process_file(self, file_path: str) -> Dict[str, Any]:
+    @property
+    def version(self) -> str:
+        """Identifies the pipeline and model versions that produced a result."""
+        donut_model = f"{self.donut_engine.model_name}@{self.donut_engine.variant}" if self.donut_engine else "off"
+        return f"pipeline={PIPELINE_VERSION};ocr={self.ocr_engine.lang};donut={donut_model}"
+
+    def cache_key(self, source: Union[str, bytes], options: str = "", face_mode: Optional[str] = None) -> str:
+        """
+        Result cache key: SHA-256 of the uploaded bytes (a file path or the bytes themselves)
+        plus the pipeline/model version.
+        `options` distinguishes request settings that change the result, such as the PDF page selection.
+        """
+        content_hash = ResultCache.hash_bytes(source) if isinstance(source, bytes) else ResultCache.hash_file(source)
+        return self.cache_key_for_hash(content_hash, options, face_mode)
+
+    def cache_key_for_hash(self, content_hash: str, options: str = "", face_mode: Optional[str] = None) -> str:
+        """Same key from an already known content hash, e.g. the one a blob store key carries."""
+        face_mode = face_mode or self.face_mode
+        if face_mode != "inline":
+            # Inline results keep their existing keys
+            options = f"{options};face={face_mode}"
+        return ResultCache.make_key(content_hash, f"{self.version};{options}")
+
+    def pdf_cache_options(self, pdf_path: str, pages: Optional[str] = None, use_docling: bool = False) -> str:
+        """
+        Cache key options of a PDF request. The selection is keyed by the page indexes it resolves to,
+        so equivalent selections ("1-2" and "1,2", the default and "first") share one entry.
+        """
+        page_indexes = self.pdf_processor.parse_page_selection(
+            pages or self.default_pages, self.pdf_processor.page_count(pdf_path), self.max_pages
+        )
+        return f"pages={','.join(str(i) for i in page_indexes)};docling={use_docling}"
+
+    def get_cached(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        if self.result_cache is None:
+            return None
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Result cache hit for {cache_key[:12]}")
+        return cached
+
+    def store_cached(self, cache_key: str, result: Dict[str, Any]):
+        if self.result_cache is not None:
+            self.result_cache.put(cache_key, result)
+
+    def process_file(self, file_path: str, defer_donut: Optional[bool] = None,
+                     face_mode: Optional[str] = None, face_id: Optional[str] = None,
+                     document_type: Optional[str] = None) -> Dict[str, Any]:
         """
         Main pipeline execution flow.
-        Input -> Preprocess -> OCR -> Regex/Donut -> Validate -> Dataset Build -> Result
+        Input -> Decode -> Preprocess -> OCR -> Regex/Donut -> Validate -> Dataset Build -> Result
+        The document is decoded once and the same array is shared by every stage.
+        `defer_donut` (defaults to DONUT_ASYNC) skips the Donut fallback and flags the result `donut_pending`.
+        `face_mode` (defaults to FACE_MODE) is one of FACE_MODES; in "url" mode the face is stored
+        under `face_id`, the document's SHA-256 (hashed from the file when not given).
+        `document_type` is the client's hint, used to pick the Donut generation budget.
         """
         logger.info(f"Processing: {file_path}")
+        image = self._load(file_path)
         
         # 1. Preprocess & Face Extraction
-        face_b64 = self.preprocessor.extract_face(file_path)
-        proc_image_path = self.preprocessor.preprocess_image(file_path)
+        face, proc_image = self._prepare(image, face_mode)
         
         # 2. OCR Extraction
-        raw_text, lines, avg_confidence = self.ocr_engine.extract_text(proc_image_path)
+        raw_text, lines, avg_confidence = self.ocr_engine.extract_text(proc_image)
         logger.debug(f"OCR Raw Text extracted length: {len(raw_text)}")
         
-        # Cleanup preprocessed image if temporary
-        if proc_image_path != file_path and os.path.exists(proc_image_path):
-             try:
-                 os.remove(proc_image_path)
-             except Exception:
-                 pass
-                 
-        # 3. Clean and parse using Regex Heuristics
-        extracted_data = self.cleaner.extract_document(raw_text, lines)
-        
-        # Additive Enhancement: Route to new processors if it's not an existing doc type
-        if extracted_data.get("document_type") == "Unknown":
-            import re
-            from .driving_license_processor import process_driving_license
-            from .passport_processor import process_passport
+        return self._extract(file_path, image, face, raw_text, lines, avg_confidence, defer_donut=defer_donut, face_id=face_id,
+                             document_type=document_type)
+
+    def process_image_bytes(self, data: bytes, source_name: str, defer_donut: Optional[bool] = None,
+                            face_mode: Optional[str] = None, face_id: Optional[str] = None,
+                            document_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Same flow as process_file for an upload held in memory: the bytes are decoded
+        straight from the request, nothing is written to uploads/.
+        `source_name` is only used for logging.
+        """
+        logger.info(f"Processing in-memory upload: {source_name}")
+        image = self.preprocessor.load_image(data)
+        if image is None:
+            raise ValueError(f"Could not decode image: {source_name}")
+        
+        face, proc_image = self._prepare(image, face_mode)
+        raw_text, lines, avg_confidence = self.ocr_engine.extract_text(proc_image)
+        if isinstance(face, bytes) and face_id is None:
+            face_id = ResultCache.hash_bytes(data)
+        
+        # There is no original file to copy, so the dataset record keeps the decoded image
+        return self._extract(source_name, image, face, raw_text, lines, avg_confidence,
+                             defer_donut=defer_donut, store_image=True, face_id=face_id, document_type=document_type)
+
+    def process_files(self, file_paths: List[str], defer_donut: Optional[bool] = None,
+                      face_mode: Optional[str] = None, face_ids: Optional[List[str]] = None,
+                      document_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Batched variant of process_file for multi-page PDFs and queued bursts.
+        Every document is preprocessed first, then all of them share a single
+        batched OCR pass before being parsed and validated one by one.
+        """
+        if not file_paths:
+            return []
+        logger.info(f"Processing batch of {len(file_paths)} documents")
+        
+        images = [self._load(file_path) for file_path in file_paths]
+        prepared = [self._prepare(image, face_mode) for image in images]
+        ocr_results = self.ocr_engine.extract_text_batch([proc_image for _, proc_image in prepared])
+        
+        results = []
+        face_ids = face_ids or [None] * len(file_paths)
+        for file_path, image, (face, _), (raw_text, lines, avg_confidence), face_id in zip(file_paths, images, prepared, ocr_results, face_ids):
+            results.append(self._extract(file_path, image, face, raw_text, lines, avg_confidence, defer_donut=defer_donut, face_id=face_id,
+                                         document_type=document_type))
+        return results
+
+    def process_pdf(self, pdf_path: str, pages: Optional[str] = None, use_docling: bool = False,
+                    defer_donut: Optional[bool] = None, face_mode: Optional[str] = None,
+                    face_id: Optional[str] = None, document_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Page-aware PDF flow. Only the selected pages are rasterized, lazily and in memory;
+        they are preprocessed on a worker pool, share one batched OCR pass and are merged
+        into a single document result.
+        `pages` accepts "all", "first" or 1-based ranges like "1-3,5" (defaults to PDF_DEFAULT_PAGES).
+        Born-digital pages with a usable embedded text layer skip rasterization and OCR entirely.
+        With `use_docling`, pages whose Docling layout carries text are treated the same way,
+        and the remaining pages are cropped to their layout region before OCR.
+        """
+        # Opened once: every page worker reads from this handle instead of reopening the file
+        with self.pdf_processor.open(pdf_path) as document:
+            page_indexes, native_lines, layout = self.plan_pdf(pdf_path, pages, use_docling, document)
+            first_page = page_indexes[0]
+            
+            # The holder photo is taken from the first selected page only, the other pages never run face detection
+            def prepare_page(page_index: int):
+                if page_index in native_lines:
+                    # Text is known and nothing is rendered: the photo is looked up in the embedded images
+                    face = self.face_from_embedded(document, page_index, face_mode) if page_index == first_page else None
+                    return None, face, None
+            
+                page = self.pdf_processor.render_page(document, page_index)
+                face = self.detect_face(page, face_mode) if page_index == first_page else None
+                ocr_input = page
+                region = self.pdf_processor.layout_region(layout, page_index) if layout else None
+                if region:
+                    x1, y1, x2, y2 = region
+                    ocr_input = page[y1:y2, x1:x2]
+                # Only the first page is kept whole, for Donut and the dataset record
+                return (page if page_index == first_page else None), face, self.preprocessor.preprocess_image(ocr_input)
+            
+            with ThreadPoolExecutor(max_workers=max(1, min(self.page_workers, len(page_indexes)))) as pool:
+                prepared = list(pool.map(prepare_page, page_indexes))
+            
+            ocr_slots = [i for i, (_, _, proc_image) in enumerate(prepared) if proc_image is not None]
+            proc_images = [prepared[i][2] for i in ocr_slots]
+            if len(proc_images) == 1:
+                ocr_outputs = [self.ocr_engine.extract_text(proc_images[0])]
+            else:
+                ocr_outputs = self.ocr_engine.extract_text_batch(proc_images)
+            
+            page_results = {}
+            for slot, ocr_output in zip(ocr_slots, ocr_outputs):
+                page_results[page_indexes[slot]] = ocr_output
+            for page_index, page_lines in native_lines.items():
+                # Embedded text is exact, so it counts as full confidence
+                page_results[page_index] = (" ".join(page_lines), page_lines, 1.0)
+            ocr_results = [page_results[page_index] for page_index in page_indexes if page_index in page_results]
             
-            text_lower = raw_text.lower()
+            # Merge pages: lines in page order, confidence weighted by line count, face of the first page
+            raw_text, lines, avg_confidence = self.merge_pages(ocr_results)
+            face = prepared[0][1]
             
-            def is_driving_license(text: str) -> bool:
-                patterns = [
-                    r"dl\sno",
-                    r"driving\slicence",
-                    r"driving\slicense",
-                    r"valid\sthroughout\sindia",
-                    r"\bmcwg\b",
-                    r"\blmv\b",
-                    r"\bform\s7\b"
-                ]
-                for pattern in patterns:
-                    if re.search(pattern, text):
-                        return True
-                return False
-
-            def is_passport(text: str) -> bool:
-                patterns = [
-                    r"passport",
-                    r"p<ind",
-                    r"republic\s*of\s*india",
-                    r"/nationality",
-                    r"/placeofssue",
-                    r"x[0-9]{7}",
-                    r"\bp<"
-                ]
-                text_clean = text.replace(" ", "")
-                for pattern in patterns:
-                    if re.search(pattern, text) or re.search(pattern, text_clean):
-                        return True
-                return False
-
-            if is_driving_license(text_lower):
-                extracted_data = process_driving_license(raw_text, lines)
-            elif is_passport(text_lower):
-                extracted_data = process_passport(raw_text, lines)
+            # A page that skipped rasterization is only rendered if Donut ends up needing it
+            def render_first_page() -> np.ndarray:
+                return self.pdf_processor.render_page(document, first_page, dpi=self.native_page_dpi)
+            
+            result = self._extract(pdf_path, prepared[0][0], face, raw_text, lines, avg_confidence,
+                                   image_loader=render_first_page, defer_donut=defer_donut, face_id=face_id,
+                                   document_type=document_type)
+            result["pages_processed"] = [i + 1 for i in page_indexes]
+            return result
+
+    def plan_pdf(self, pdf_path: str, pages: Optional[str] = None, use_docling: bool = False,
+                 document: Optional[PDFDocument] = None) -> Tuple[List[int], Dict[int, List[str]], Optional[Dict[str, Any]]]:
+        """
+        Decides what a PDF needs before anything is rasterized: the selected page indexes,
+        the lines of pages whose text is already known (text layer or Docling) and the
+        Docling layout, if one was computed.
+        Pages are read through `document` when the caller already opened the PDF.
+        """
+        source = document or pdf_path
+        page_indexes = self.pdf_processor.parse_page_selection(
+            pages or self.default_pages, self.pdf_processor.page_count(source), self.max_pages
+        )
+        if not page_indexes:
+            raise ValueError(f"No pages selected from PDF: {pdf_path}")
+        logger.info(f"Processing PDF {pdf_path}: pages {[i + 1 for i in page_indexes]}")
+        
+        # Pages whose text is already known never go through OCR: the PDF text layer is
+        # the cheapest source, Docling (when enabled) covers the pages it leaves behind
+        native_lines = {}
+        if self.use_text_layer:
+            for page_index in page_indexes:
+                page_lines = self.pdf_processor.extract_text_layer(source, page_index)
+                if page_lines:
+                    native_lines[page_index] = page_lines
+            if native_lines:
+                logger.info(f"PDF text layer used for pages {[i + 1 for i in native_lines]}, skipping OCR there.")
+        
+        layout = None
+        if use_docling and len(native_lines) < len(page_indexes):
+            layout = self._docling_layout(pdf_path)
+        if layout:
+            docling_pages = []
+            for page_index in page_indexes:
+                if page_index in native_lines:
+                    continue
+                page_lines = self.pdf_processor.layout_text_lines(layout, page_index)
+                if sum(len(line) for line in page_lines) >= self.docling_min_chars:
+                    native_lines[page_index] = page_lines
+                    docling_pages.append(page_index)
+            if docling_pages:
+                logger.info(f"Docling text used for pages {[i + 1 for i in docling_pages]}, skipping OCR there.")
+        
+        return page_indexes, native_lines, layout
+
+    @staticmethod
+    def merge_pages(ocr_results: List[Tuple[str, List[str], float]]) -> Tuple[str, List[str], float]:
+        """Merges per-page OCR output in page order, the confidence weighted by line count."""
+        lines = [line for _, page_lines, _ in ocr_results for line in page_lines]
+        raw_text = " ".join(page_text for page_text, _, _ in ocr_results if page_text)
+        weighted = sum(conf * len(page_lines) for _, page_lines, conf in ocr_results)
+        avg_confidence = weighted / len(lines) if lines else 0.0
+        return raw_text, lines, avg_confidence
+
+    def load_donut_image(self, file_path: str, result: Dict[str, Any]) -> np.ndarray:
+        """Image Donut reads for a result: the file itself, or the first processed page of a PDF."""
+        if file_path.lower().endswith(".pdf"):
+            first_page = (result.get("pages_processed") or [1])[0] - 1
+            return self.pdf_processor.render_page(file_path, first_page, dpi=self.native_page_dpi)
+        return self._load(file_path)
+
+    def enrich_with_donut(self, result: Dict[str, Any], image: np.ndarray, document_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Completes a result returned early with `donut_pending`: runs Donut on the document image,
+        merges the fields regex left empty and validates the merged result again.
+        `document_type` is the request's hint, see donut_fallback.
+        """
+        extracted_data = {k: v for k, v in result.items() if k not in ("donut_pending", "donut_task_id")}
+        self.donut_fallback(extracted_data, image, document_type)
+        
+        _, final_data, _ = Validator.validate_document(extracted_data)
+        return final_data
+
+    def _run_donut(self, image: np.ndarray, document_type: Optional[str]) -> Dict[str, Any]:
+        runner = self.donut_batcher or self.donut_engine
+        return runner.process_image(image, document_type=document_type)
+
+    @staticmethod
+    def _merge_donut(extracted_data: Dict[str, Any], donut_data: Dict[str, Any]):
+        # Merge logic - basic override if donut finds a type
+        if donut_data and isinstance(donut_data, dict):
+             if "document_type" in donut_data:
+                 for k, v in donut_data.items():
+                     if k in DONUT_PROTECTED_KEYS:
+                         continue
+                     if k not in extracted_data or not extracted_data[k]:
+                         extracted_data[k] = v
+
+    def face_from_embedded(self, pdf: Union[str, PDFDocument], page_index: int, face_mode: Optional[str] = None) -> Optional[Union[str, bytes]]:
+        if (face_mode or self.face_mode) == "none":
+            return None
+        for embedded in self.pdf_processor.extract_page_images(pdf, page_index):
+            face = self.detect_face(embedded, face_mode)
+            if face:
+                return face
+        return None
+
+    def detect_face(self, image: np.ndarray, face_mode: Optional[str] = None) -> Optional[Union[str, bytes]]:
+        """
+        Face crop as `face_mode` needs it: base64 for "inline", JPEG bytes for "url"
+        (stored by finalize), and nothing at all for "none", which skips detection and encoding.
+        """
+        face_mode = face_mode or self.face_mode
+        if face_mode == "none":
+            return None
+        return self.preprocessor.extract_face(image, encoding="jpeg" if face_mode == "url" else "base64")
+
+    def wants_docling(self, flag: Optional[str] = None, document_type: Optional[str] = None) -> bool:
+        """
+        Resolves whether the Docling stage runs for a request: an explicit flag wins,
+        otherwise it is enabled for the document types listed in DOCLING_DOCUMENT_TYPES.
+        """
+        if flag is not None and str(flag).strip() != "":
+            return str(flag).strip().lower() in ("1", "true", "yes", "on")
+        return bool(document_type) and document_type.strip().lower() in self.docling_document_types
+
+    def _docling_layout(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        """Docling layout for a PDF, cached per file hash since it is the most expensive PDF step."""
+        cache_key = ResultCache.make_key(ResultCache.hash_file(pdf_path), "docling-layout")
+        layout = self.layout_cache.get(cache_key)
+        if layout is not None:
+            logger.info(f"Docling layout cache hit for {pdf_path}")
+            return layout
+        
+        layout = self.pdf_processor.extract_layout_docling(pdf_path)
+        if layout is not None:
+            self.layout_cache.put(cache_key, layout)
+        return layout
+
+    def _load(self, file_path: str) -> np.ndarray:
+        image = self.preprocessor.load_image(file_path)
+        if image is None:
+            raise ValueError(f"Could not decode image: {file_path}")
+        return image
+
+    def _prepare(self, image: np.ndarray, face_mode: Optional[str] = None) -> Tuple[Optional[Union[str, bytes]], np.ndarray]:
+        face = self.detect_face(image, face_mode)
+        proc_image = self.preprocessor.preprocess_image(image)
+        return face, proc_image
+
+    def _extract(self, file_path: str, image: Optional[np.ndarray], face: Optional[Union[str, bytes]], raw_text: str, lines: List[str], avg_confidence: float,
+                 image_loader: Optional[Callable[[], np.ndarray]] = None, defer_donut: Optional[bool] = None,
+                 store_image: Optional[bool] = None, face_id: Optional[str] = None,
+                 document_type: Optional[str] = None) -> Dict[str, Any]:
+        # 3. Classify in a single scan, then parse using the matching Regex Heuristics
+        extracted_data, _ = self.parse_text(raw_text, lines)
         
         # 4. Fallback to Donut if primary extraction failed
-        # If document is still unknown, try Donut
-        if self.use_donut and extracted_data.get("document_type") == "Unknown":
-            logger.info("Regex extraction returned Unknown, falling back to Donut...")
-            donut_data = self.donut_engine.process_image(file_path)
-            
-            # Merge logic - basic override if donut finds a type
-            if donut_data and isinstance(donut_data, dict):
-                 if "document_type" in donut_data:
-                     for k, v in donut_data.items():
-                         if k not in extracted_data or not extracted_data[k]:
-                             extracted_data[k] = v
+        # If document is still unknown, try Donut (or leave it to a separate task in async mode)
+        if defer_donut is None:
+            defer_donut = self.donut_async
+        if self.needs_donut(extracted_data):
+            if defer_donut:
+                logger.info("Regex extraction returned Unknown, returning early with Donut pending...")
+                extracted_data["donut_pending"] = True
+            else:
+                logger.info("Regex extraction returned Unknown, falling back to Donut...")
+                if image is None and image_loader is not None:
+                    image = image_loader()
+                self.donut_fallback(extracted_data, image, document_type)
         
+        return self.finalize(file_path, image, extracted_data, raw_text, face, avg_confidence, store_image, face_id)
+
+    def parse_text(self, raw_text: str, lines: List[str]) -> Tuple[Dict[str, Any], Any]:
+        """Classifies OCR text in a single scan and parses it with the matching regex heuristics."""
+        classification = self.cleaner.classifier.classify(raw_text)
+        extracted_data = self.cleaner.extract_document(raw_text, lines, classification)
+        if extracted_data.get("document_type") != "Unknown":
+            extracted_data["document_type_confidence"] = classification.confidence
+        return extracted_data, classification
+
+    def needs_donut(self, extracted_data: Dict[str, Any]) -> bool:
+        return self.use_donut and extracted_data.get("document_type") == "Unknown"
+
+    def donut_fallback(self, extracted_data: Dict[str, Any], image: np.ndarray, document_type: Optional[str] = None):
+        """
+        Runs Donut on the document image and fills the fields regex left empty.
+        Donut only runs when the classifier found no type at all, so the generation budget
+        comes from the request's `document_type` hint (DonutEngine.budget_for), if any.
+        """
+        donut_data = self._run_donut(image, document_type)
+        self._merge_donut(extracted_data, donut_data)
+
+    def finalize(self, file_path: str, image: Optional[np.ndarray], extracted_data: Dict[str, Any], raw_text: str,
+                 face: Optional[Union[str, bytes]], avg_confidence: float, store_image: Optional[bool] = None,
+                 face_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Adds the result metadata, validates it and records it in the dataset.
+        `face` is what detect_face returned; JPEG bytes ("url" mode) are stored under `face_id`.
+        """
         # Add metadata
         if extracted_data.get("document_type") == "Unknown" and raw_text:
             extracted_data["raw_text"] = raw_text
 
-        extracted_data["face_image"] = face_b64
+        if isinstance(face, bytes):
+            extracted_data.update(store_face(face_id or ResultCache.hash_file(file_path), face))
+        else:
+            extracted_data["face_image"] = face
         extracted_data["ocr_accuracy_score"] = round(avg_confidence * 100, 2)
         
         # 5. Pydantic Validation
         is_valid, final_data, error_msg = Validator.validate_document(extracted_data)
         
         # 6. Dataset Building
+        if store_image is None:
+            # PDFs are stored as their rendered first page when one exists, otherwise the PDF itself is copied
+            store_image = file_path.lower().endswith(".pdf")
         self.dataset_builder.save_record(
             original_image_path=file_path,
             is_valid=is_valid,
             data=final_data,
-            error_msg=error_msg
+            error_msg=error_msg,
+            image=image if store_image else None
         )
         
         return final_data
@@ -0,0 +1,118 @@
+import os
+import logging
+import threading
+from multiprocessing.connection import Client
+from typing import Tuple, List, Union, Optional, Dict, Any
+import numpy as np
+from .inference_server import default_authkey
+
+logger = logging.getLogger(__name__)
+
+class InferenceClient:
+    """
+    Thin client for pipeline.inference_server. Connections are not thread-safe,
+    so each thread keeps its own and reconnects once if the server restarted.
+    """
+    def __init__(self, address: str, authkey: Optional[bytes] = None):
+        self.address = address
+        self.authkey = authkey or default_authkey()
+        self._local = threading.local()
+        self._info = None
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited through fork (e.g. opened while preloading) belongs to the parent
+        if conn is None or self._local.pid != os.getpid():
+            conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def call(self, method: str, *args, **kwargs):
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send((method, args, kwargs))
+                status, payload = conn.recv()
+                break
+            except (EOFError, ConnectionError, BrokenPipeError, FileNotFoundError) as e:
+                self._local.conn = None
+                if attempt:
+                    raise ConnectionError(f"Inference server at {self.address} unavailable: {e}")
+                logger.warning(f"Inference server connection lost ({e}), reconnecting...")
+        if status != "ok":
+            raise RuntimeError(f"Inference server error in {method}: {payload}")
+        return payload
+
+    def info(self) -> Dict[str, Any]:
+        if self._info is None:
+            self._info = self.call("info")
+        return self._info
+
+
+class RemoteOCREngine:
+    """Drop-in for OCREngine, served by the inference server."""
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    @property
+    def lang(self) -> str:
+        return self.client.info()["lang"]
+
+    def load(self):
+        # Models live in the server; this only checks it is reachable
+        self.client.call("ping")
+
+    def extract_text(self, image: Union[str, np.ndarray]) -> Tuple[str, List[str], float]:
+        return self.client.call("ocr.extract_text", image)
+
+    def extract_text_batch(self, images: List[Union[str, np.ndarray]]) -> List[Tuple[str, List[str], float]]:
+        return self.client.call("ocr.extract_text_batch", images) if images else []
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self.client.call("ocr.get_metrics")
+
+
+class RemoteDonutEngine:
+    """
+    Drop-in for DonutEngine, served (and batched across clients) by the inference server.
+    Against a server started with --no-donut it degrades like a failing DonutEngine: every
+    call returns empty results instead of raising.
+    """
+    def __init__(self, client: InferenceClient):
+        self.client = client
+        self._warned = False
+
+    @property
+    def model_name(self) -> Optional[str]:
+        return self.client.info()["donut_model"]
+
+    @property
+    def variant(self) -> Optional[str]:
+        return self.client.info()["donut_variant"]
+
+    @property
+    def available(self) -> bool:
+        available = self.model_name is not None
+        if not available and not self._warned:
+            logger.warning(f"Inference server at {self.client.address} has no Donut model, Donut fallbacks return empty results")
+            self._warned = True
+        return available
+
+    def load(self):
+        self.client.call("ping")
+
+    def process_image(self, image: Union[str, np.ndarray], **kwargs) -> Dict[str, Any]:
+        if not self.available:
+            return {}
+        return self.client.call("donut.process_image", image, **kwargs)
+
+    def process_batch(self, images: List[Union[str, np.ndarray]], *args, **kwargs) -> List[Dict[str, Any]]:
+        if not self.available:
+            return [{} for _ in images]
+        return self.client.call("donut.process_batch", images, *args, **kwargs)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        if not self.available:
+            return {}
+        return self.client.call("donut.get_metrics")
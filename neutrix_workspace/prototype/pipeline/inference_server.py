@@ -0,0 +1,175 @@
+"""
+Standalone inference service hosting OCREngine and DonutEngine for every API and Celery worker on a node.
+
+    INFERENCE_AUTHKEY=<secret> python -m pipeline.inference_server --socket /run/neutrix/inference.sock
+
+Clients (pipeline.inference_client) connect over a Unix socket with multiprocessing.connection.
+Messages are pickled, so the server refuses to start without INFERENCE_AUTHKEY and only the
+user running it (and its clients) can reach the socket: its directory is 0700 and the socket 0600.
+Requests from all clients share the same queues, so concurrent OCR calls run as one batched
+recognizer pass and concurrent Donut fallbacks as one batched decode.
+"""
+import os
+import time
+import queue
+import logging
+import argparse
+import threading
+from concurrent.futures import Future
+from multiprocessing.connection import Listener
+from typing import Callable, List, Any, Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = "/run/neutrix/inference.sock"
+
+def default_authkey() -> bytes:
+    authkey = os.environ.get("INFERENCE_AUTHKEY")
+    if not authkey:
+        raise RuntimeError("INFERENCE_AUTHKEY must be set to a shared secret for the inference server and its clients")
+    return authkey.encode("utf-8")
+
+def prepare_socket_dir(address: str):
+    """Creates the socket's directory as 0700, or refuses one that other users could write to or list."""
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.stat(directory)
+    if st.st_uid != os.getuid():
+        raise RuntimeError(f"Inference socket directory {directory} is not owned by this user")
+    if st.st_mode & 0o077:
+        raise RuntimeError(f"Inference socket directory {directory} must not be accessible to other users (chmod 700)")
+
+
+class _BatchQueue:
+    """Collects single requests from any client for up to `max_wait_ms` or `max_batch_size` items and runs them as one batch."""
+    def __init__(self, name: str, run_batch: Callable[[List[Any]], List[Any]], max_batch_size: int, max_wait_ms: int):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True).start()
+
+    def submit(self, item) -> Any:
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            futures = [future for _, future in batch]
+            try:
+                for future, result in zip(futures, self.run_batch([item for item, _ in batch])):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {e}")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            self.batches += 1
+            self.requests += len(batch)
+
+
+class InferenceServer:
+    def __init__(self, address: str = DEFAULT_SOCKET, authkey: bytes = None, use_donut: bool = True):
+        from .ocr_engine import OCREngine
+        from .donut_engine import DonutEngine
+        from .donut_batcher import DonutBatcher
+
+        self.address = address
+        self.authkey = authkey or default_authkey()
+        self.ocr_engine = OCREngine()
+        self.donut_engine = DonutEngine() if use_donut else None
+
+        max_batch_size = int(os.environ.get("INFERENCE_BATCH_MAX_SIZE", 8))
+        max_wait_ms = int(os.environ.get("INFERENCE_BATCH_MAX_WAIT_MS", 20))
+        self.ocr_queue = _BatchQueue("ocr", self.ocr_engine.extract_text_batch, max_batch_size, max_wait_ms)
+        self.donut_batcher = DonutBatcher(self.donut_engine, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms) if self.donut_engine else None
+
+        self.handlers: Dict[str, Callable] = {
+            "ping": lambda: "pong",
+            "info": self.info,
+            "ocr.extract_text": self.ocr_queue.submit,
+            "ocr.extract_text_batch": self.ocr_engine.extract_text_batch,
+            "ocr.get_metrics": self.metrics,
+        }
+        if self.donut_engine:
+            self.handlers.update({
+                "donut.process_image": self.donut_batcher.process_image,
+                "donut.process_batch": self.donut_engine.process_batch,
+                "donut.get_metrics": self.donut_engine.get_metrics,
+            })
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "lang": self.ocr_engine.lang,
+            "donut_model": self.donut_engine.model_name if self.donut_engine else None,
+            "donut_variant": self.donut_engine.variant if self.donut_engine else None,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self.ocr_engine.get_metrics(), server_batches=self.ocr_queue.batches, server_requests=self.ocr_queue.requests)
+
+    def serve_forever(self):
+        logger.info("⏳ Loading models for the inference server...")
+        self.ocr_engine.load()
+        if self.donut_engine:
+            self.donut_engine.load()
+
+        prepare_socket_dir(self.address)
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            os.chmod(self.address, 0o600)
+            logger.info(f"✅ Inference server listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning(f"Rejected inference client: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, ConnectionResetError):
+                    return
+                handler = self.handlers.get(method)
+                try:
+                    if handler is None:
+                        raise ValueError(f"Unknown inference method: {method}")
+                    conn.send(("ok", handler(*args, **kwargs)))
+                except Exception as e:
+                    logger.error(f"Inference call {method} failed: {e}")
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def main():
+    from utils.logger import setup_logging
+    setup_logging()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", default=os.environ.get("INFERENCE_SERVER_SOCKET") or DEFAULT_SOCKET)
+    parser.add_argument("--no-donut", action="store_true")
+    args = parser.parse_args()
+    InferenceServer(args.socket, use_donut=not args.no_donut).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
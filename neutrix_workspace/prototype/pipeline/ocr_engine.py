@@ -1,47 +1,189 @@
 from paddleocr import PaddleOCR
+import cv2
 import numpy as np
+import os
 import logging
-from typing import Tuple, List
+import threading
+from typing import Tuple, List, Union, Optional, Callable, Dict, Any
+try:
+    from paddleocr.tools.infer.predict_system import sorted_boxes
+    from paddleocr.tools.infer.utility import get_rotate_crop_image
+    BATCH_OCR_AVAILABLE = True
+except ImportError:
+    BATCH_OCR_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 class OCREngine:
-    def __init__(self, lang: str = "en"):
+    BACKEND_MKLDNN = "mkldnn"
+    BACKEND_SAFE = "safe"
+
+    def __init__(self, lang: str = "en", rec_batch_num: int = 6, max_mkldnn_strikes: Optional[int] = None):
         self.lang = lang
+        self.rec_batch_num = rec_batch_num
         self.ocr = None
+        self.fallback_ocr = None
+
+        # After this many MKLDNN crashes the worker permanently switches to the safe backend
+        if max_mkldnn_strikes is None:
+            max_mkldnn_strikes = int(os.environ.get("OCR_MKLDNN_MAX_STRIKES", 3))
+        self.max_mkldnn_strikes = max_mkldnn_strikes
+        self.mkldnn_strikes = 0
+        self.safe_mode = False
+
+        self._lock = threading.Lock()
+        # Warm-up runs on a background thread, so the first request may race it for the model
+        self._load_lock = threading.Lock()
+        self._served = {self.BACKEND_MKLDNN: 0, self.BACKEND_SAFE: 0}
+
+    def _build_model(self, enable_mkldnn: bool) -> PaddleOCR:
+        # Strict Memory Bounding applied to prevent Exit 247 on low-RAM machines
+        return PaddleOCR(
+            use_angle_cls=True,
+            lang=self.lang,
+            enable_mkldnn=enable_mkldnn,
+            use_gpu=False,
+            drop_score=0.8,
+            rec_batch_num=self.rec_batch_num,
+            show_log=False
+        )
 
     def _get_model(self):
         if self.ocr is None:
+            with self._load_lock:
+                if self.ocr is None:
+                    try:
+                        logger.info("Initializing PaddleOCR (Lazy Load)...")
+                        self.ocr = self._build_model(enable_mkldnn=True)
+                        logger.info("PaddleOCR ready. (CPU mode, MKLDNN enabled, Angle Cls enabled, strict drop_score)")
+                    except Exception as e:
+                        logger.error(f"PaddleOCR initialization failed: {e}")
+                        raise
+        return self.ocr
+
+    def load(self):
+        """Loads PaddleOCR now instead of on the first request (warm-up, preload)."""
+        self._get_model()
+
+    def _get_fallback_model(self):
+        if self.fallback_ocr is None:
+            with self._lock:
+                if self.fallback_ocr is None:
+                    logger.info("Initializing safe PaddleOCR fallback (MKLDNN disabled)...")
+                    self.fallback_ocr = self._build_model(enable_mkldnn=False)
+                    logger.info("Safe PaddleOCR fallback ready.")
+        return self.fallback_ocr
+
+    def _infer(self, run: Callable, count: int = 1):
+        """
+        Runs inference on the MKLDNN model, retrying on the cached safe model if it crashes.
+        Each crash is a strike; after max_mkldnn_strikes the worker stays on the safe backend.
+        """
+        if not self.safe_mode:
             try:
-                logger.info("Initializing PaddleOCR (Lazy Load)...")
-                # Strict Memory Bounding applied to prevent Exit 247 on low-RAM machines
-                self.ocr = PaddleOCR(
-                    use_angle_cls=True, 
-                    lang=self.lang,
-                    enable_mkldnn=True,
-                    use_gpu=False,
-                    drop_score=0.8,
-                    show_log=False
-                )
-                logger.info("PaddleOCR ready. (CPU mode, MKLDNN enabled, Angle Cls enabled, strict drop_score)")
+                result = run(self._get_model())
+                self._record(self.BACKEND_MKLDNN, count)
+                return result
             except Exception as e:
-                logger.error(f"PaddleOCR initialization failed: {e}")
-                raise
-        return self.ocr
+                self._strike(e)
+
+        result = run(self._get_fallback_model())
+        self._record(self.BACKEND_SAFE, count)
+        return result
+
+    def _strike(self, error: Exception):
+        with self._lock:
+            self.mkldnn_strikes += 1
+            strikes = self.mkldnn_strikes
+            if strikes >= self.max_mkldnn_strikes and not self.safe_mode:
+                self.safe_mode = True
+                # Release the unstable model, the safe backend serves everything from now on
+                self.ocr = None
+                logger.error(f"MKLDNN inference failed {strikes} times. Switching this worker permanently to the safe CPU backend.")
+                return
+        logger.warning(f"MKLDNN fast-inference crashed ({error}). Strike {strikes}/{self.max_mkldnn_strikes}, using safe CPU configuration...")
+
+    def _record(self, backend: str, count: int):
+        with self._lock:
+            self._served[backend] += count
 
-    def extract_text(self, image_path: str) -> Tuple[str, List[str], float]:
+    def get_metrics(self) -> Dict[str, Any]:
+        """Returns how often each backend served a request plus the MKLDNN health state."""
+        with self._lock:
+            return {
+                "served": dict(self._served),
+                "mkldnn_strikes": self.mkldnn_strikes,
+                "max_mkldnn_strikes": self.max_mkldnn_strikes,
+                "safe_mode": self.safe_mode,
+                "fallback_loaded": self.fallback_ocr is not None,
+            }
+
+    def extract_text(self, image: Union[str, np.ndarray]) -> Tuple[str, List[str], float]:
         """
-        Extracts text from an image.
+        Extracts text from an image path or an already decoded image array.
         Returns: (raw_text_string, list_of_lines, average_confidence)
         """
-        model = self._get_model()
+        ocr_result = self._infer(lambda model: model.ocr(image))
+        return self._parse_result(ocr_result)
+
+    def extract_text_batch(self, images: List[Union[str, np.ndarray]]) -> List[Tuple[str, List[str], float]]:
+        """
+        Extracts text from several images at once.
+        Detection runs per image, then every detected text crop from all images
+        goes through the angle classifier and recognizer as one batch.
+        Returns one (raw_text_string, list_of_lines, average_confidence) per input.
+        """
+        if not images:
+            return []
+        if not BATCH_OCR_AVAILABLE:
+            return [self.extract_text(image) for image in images]
+
         try:
-            ocr_result = model.ocr(image_path)
+            return self._infer(lambda model: self._run_batch(model, images), count=len(images))
         except Exception as e:
-            logger.warning(f"MKLDNN fast-inference crashed ({e}). Falling back to safe CPU configuration...")
-            fallback_model = PaddleOCR(use_angle_cls=True, lang=self.lang, enable_mkldnn=False, use_gpu=False, drop_score=0.8, show_log=False)
-            ocr_result = fallback_model.ocr(image_path)
-            
+            logger.warning(f"Batched OCR failed ({e}). Falling back to per-image extraction...")
+            return [self.extract_text(image) for image in images]
+
+    def _run_batch(self, model, images: List[Union[str, np.ndarray]]) -> List[Tuple[str, List[str], float]]:
+        # 1. Detection per image, remembering which crops belong to which input
+        all_crops = []
+        owners = []
+        for idx, image in enumerate(images):
+            img = cv2.imread(image) if isinstance(image, str) else image
+            if img is None:
+                logger.warning(f"Batched OCR could not read input #{idx}, skipping.")
+                continue
+            if img.ndim == 2:
+                img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+
+            dt_boxes, _ = model.text_detector(img)
+            if dt_boxes is None or len(dt_boxes) == 0:
+                continue
+            for box in sorted_boxes(dt_boxes):
+                all_crops.append(get_rotate_crop_image(img, np.array(box, dtype=np.float32)))
+                owners.append(idx)
+
+        lines = [[] for _ in images]
+        confidences = [[] for _ in images]
+
+        # 2. One classifier + recognizer pass over every crop from every image
+        if all_crops:
+            if model.use_angle_cls:
+                all_crops, _, _ = model.text_classifier(all_crops)
+            rec_res, _ = model.text_recognizer(all_crops)
+
+            for owner, (text, score) in zip(owners, rec_res):
+                if score >= model.drop_score:
+                    lines[owner].append(text)
+                    confidences[owner].append(score)
+
+        results = []
+        for img_lines, img_confidences in zip(lines, confidences):
+            avg_confidence = float(np.mean(img_confidences)) if img_confidences else 0.0
+            results.append((" ".join(img_lines), img_lines, avg_confidence))
+        return results
+
+    def _parse_result(self, ocr_result) -> Tuple[str, List[str], float]:
         lines = []
         confidences = []
 
@@ -70,5 +212,5 @@ class OCREngine:
 
         raw_text = " ".join(lines)
         avg_confidence = float(np.mean(confidences)) if confidences else 0.0
-        
+
         return raw_text, lines, avg_confidence
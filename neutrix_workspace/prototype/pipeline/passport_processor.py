@@ -1,6 +1,6 @@
-import re
 import logging
 from typing import Dict, Any
+from .patterns import Common, Passport
 
 logger = logging.getLogger(__name__)
 
@@ -22,12 +22,12 @@ def process_passport(raw_text: str, full_text_lines: list) -> Dict[str, Any]:
     lines = [line.strip() for line in full_text_lines if line.strip()]
     
     # 1. Given Names
-    given_match = re.search(r"(?:GIVEN\s*NAME[S]?|GIVEN\s*NAME\(S\))[\s:]*([A-Z\s]+?)(?=\s+SURNAME|\s+SEX|\s+NATIONALITY|\s+DATE|\n|$)", text_upper)
+    given_match = Passport.GIVEN_NAMES.search(text_upper)
     if given_match:
          data["given_names"] = given_match.group(1).strip()
          
     # 2. Surname
-    surname_match = re.search(r"SURNAME[\s:]*([A-Z\s]+?)(?=\s+GIVEN|\s+NATIONALITY|\s+DATE|\n|$)", text_upper)
+    surname_match = Passport.SURNAME.search(text_upper)
     if surname_match:
          data["surname"] = surname_match.group(1).strip()
          
@@ -39,9 +39,10 @@ def process_passport(raw_text: str, full_text_lines: list) -> Dict[str, Any]:
          sex_dob_idx = -1
          
          for i, line in enumerate(lines):
-             if re.match(r"^[A-Z][0-9]{7}$", line.upper()):
+             line_upper = line.upper()
+             if Passport.NUMBER_LINE.match(line_upper):
                  if pp_idx == -1: pp_idx = i
-             elif "SEX" in line.upper() or re.match(r"\b\d{2}[/-]\d{2}[/-]\d{4}\b", line) or "BIRTH" in line.upper():
+             elif "SEX" in line_upper or Common.DATE.match(line) or "BIRTH" in line_upper:
                  if pp_idx != -1 and sex_dob_idx == -1: sex_dob_idx = i
                  
          if pp_idx != -1 and sex_dob_idx != -1 and (sex_dob_idx - pp_idx) > 1:
@@ -54,14 +55,14 @@ def process_passport(raw_text: str, full_text_lines: list) -> Dict[str, Any]:
                  data["given_names"] = " ".join(name_parts[1:])
          
     # 3. DOB
-    dob_match = re.search(r"DATE\s*OF\s*BIRTH[\s:]*(\d{2}[/-]\d{2}[/-]\d{4})", text_upper)
+    dob_match = Passport.DOB_LABELLED.search(text_upper)
     if not dob_match:
-         dob_match = re.search(r"\b(\d{2}[/-]\d{2}[/-]\d{4})\b", text_upper)
+         dob_match = Common.DATE.search(text_upper)
     if dob_match:
          data["date_of_birth"] = dob_match.group(1).replace("-", "/")
          
     # 4. Gender / Sex
-    gender_match = re.search(r"(?:SEX|GENDER)[\s:]*(M|F|MALE|FEMALE)", text_upper)
+    gender_match = Passport.GENDER.search(text_upper)
     if gender_match:
          g = gender_match.group(1)
          data["sex"] = "M" if g.startswith("M") else "F"
@@ -69,7 +70,7 @@ def process_passport(raw_text: str, full_text_lines: list) -> Dict[str, Any]:
     # Extract Dates from lines (usually format DD/MM/YYYY)
     dates = []
     for line in lines:
-        d = re.search(r"\b(\d{2}[/-]\d{2}[/-]\d{4})\b", line)
+        d = Common.DATE.search(line)
         if d:
             dates.append(d.group(1).replace("-", "/"))
             
@@ -103,11 +104,11 @@ def process_passport(raw_text: str, full_text_lines: list) -> Dict[str, Any]:
                      data["place_of_issue"] = line.strip()
 
     # 5. Passport Number (Strict layout or MRZ fragment fallback)
-    passport_match = re.search(r"PASSPORT\s*N[O0]\.?[\s:]*([A-Z][0-9]{7})", text_upper)
+    passport_match = Passport.NUMBER_LABELLED.search(text_upper)
     if passport_match:
          data["passport_number"] = passport_match.group(1)
     else:
-         raw_pp = re.search(r"\b([A-Z][0-9]{7})\b", text_upper)
+         raw_pp = Passport.NUMBER.search(text_upper)
          if raw_pp:
              data["passport_number"] = raw_pp.group(1)
 
@@ -152,8 +153,10 @@ def process_passport(raw_text: str, full_text_lines: list) -> Dict[str, Any]:
                  if sex_char in ["M", "F", "X"]:
                      data["sex"] = sex_char
              # If truncated, the letter M or F often precedes a string of numbers like M3302211 or is surrounded by digits
-             if "sex" not in data and re.search(r"\d+([MFX])\d+", mrz2):
-                 data["sex"] = re.search(r"\d+([MFX])\d+", mrz2).group(1)
+             if "sex" not in data:
+                 sex_match = Passport.MRZ_SEX.search(mrz2)
+                 if sex_match:
+                     data["sex"] = sex_match.group(1)
              
     # Fill full_name if parts exist
     if data.get("given_names") and data.get("surname"):
@@ -0,0 +1,80 @@
+import re
+from typing import Dict, Pattern
+
+# Every field parser pulls its regexes from here. Patterns are compiled once at import
+# and registered as "<document>.<field>", so hot per-line loops never hit re's small
+# internal cache and a pattern is shared instead of being re-declared in each parser.
+REGISTRY: Dict[str, Pattern] = {}
+
+def register(name: str, pattern: str, flags: int = 0) -> Pattern:
+    if name in REGISTRY:
+        raise ValueError(f"Pattern already registered: {name}")
+    compiled = re.compile(pattern, flags)
+    REGISTRY[name] = compiled
+    return compiled
+
+def get(name: str) -> Pattern:
+    return REGISTRY[name]
+
+
+class Common:
+    DATE = register("common.date", r"\b(\d{2}[/-]\d{2}[/-]\d{4})\b")
+    DATE_DASHED = register("common.date_dashed", r"\d{2}-\d{2}-\d{4}")
+    DATE_ISO = register("common.date_iso", r"\d{4}-\d{2}-\d{2}")
+    PINCODE = register("common.pincode", r"\b\d{6}\b")
+    DIGITS = register("common.digits", r"^\d+$")
+    WHITESPACE = register("common.whitespace", r"\s+")
+
+
+class Aadhaar:
+    NUMBER = register("aadhaar.number", r"\b(\d{4}\s?\d{4}\s?\d{4})\b")
+    YEAR_OF_BIRTH = register("aadhaar.year_of_birth", r"Year of Birth\s*[:\-]?\s*(\d{4})", re.IGNORECASE)
+    MALE = register("aadhaar.gender_male", r"\b(Male|MALE)\b")
+    FEMALE = register("aadhaar.gender_female", r"\b(Female|FEMALE)\b")
+    NAME_TITLE = register("aadhaar.name_title_case", r"^[A-Z][a-z]+(\s[A-Z][a-z]+)+$")
+    NAME_UPPER = register("aadhaar.name_upper_case", r"^[A-Z\s]+$")
+
+
+class PAN:
+    NUMBER = register("pan.number", r"[A-Z]{5}[0-9]{4}[A-Z]")
+
+
+class Marksheet:
+    UNIVERSITY = register("marksheet.university", r"(Visvesvaraya\s+Technological\s+University|VTU|Anna\s+University)", re.IGNORECASE)
+    USN = register("marksheet.usn", r"\b([1-4][A-Z]{2}\d{2}[A-Z]{2,6}\d{1,3})\b")
+    SEMESTER_HEADER = register("marksheet.semester_header", r"Semester\s*[:\-]?\s*(\d+)", re.IGNORECASE)
+    SUBJECT_CODE = register("marksheet.subject_code", r"^\d{2}[A-Z]{2,3}\d{2,4}$")
+    SUBJECT_CODE_SHORT = register("marksheet.subject_code_short", r"^[A-Z]{2,3}\d{2,4}$")
+    RESULT_LETTER = register("marksheet.result_letter", r"^[PFAWX]$")
+
+
+class DrivingLicense:
+    """Structured driving license parser (RegexCleaner.parse_dl)."""
+    FORM_NUMBER = register("driving_license.form_number", r"FORM\s*-\s*\d+", re.IGNORECASE)
+    ADDRESS_PARTS = register("driving_license.address_parts", r"[,|]")
+    ADDRESS_TOWN = register("driving_license.address_town", r"(?i)(TOWN\b)")
+
+
+class DrivingLicenseBasic:
+    """Label based driving license parser (process_driving_license), run on upper-cased text."""
+    NUMBER_LABELLED = register("driving_license_basic.number_labelled", r"DL\s*NO\.?\s*[:\-]?\s*([A-Z0-9 ]+)")
+    NUMBER_RAW = register("driving_license_basic.number_raw", r"\b([A-Z]{2}[0-9]{2}[0-9\s-]{7,15})\b")
+    NUMBER_STRICT = register("driving_license_basic.number_strict", r"^[A-Z]{2}[0-9]{2}[0-9]{7,}$")
+    NON_ALNUM = register("driving_license_basic.non_alnum", r"[^A-Z0-9]")
+    NAME = register("driving_license_basic.name", r"NAME\s*[:\-]?\s*([A-Za-z\s]+?)(?=\s+D\.?O\.?B|\s+S/W/D|\s+DOB|$)")
+    NON_ALPHA = register("driving_license_basic.non_alpha", r"[^A-Z\s]")
+    DOB = register("driving_license_basic.dob", r"D\.?O\.?B\.?\s*[:\-]?\s*(\d{2}-\d{2}-\d{4})")
+    VALID_TILL = register("driving_license_basic.valid_till", r"VALID\s*TILL\s*[:\-]?\s*(\d{2}-\d{2}-\d{4})")
+    ADDRESS = register("driving_license_basic.address", r"ADDRESS\s*[:\-]?\s*(.*?)\s*(SIGN\.|SIGN\s+LICENCING|SIGN|HOLDER|$)", re.DOTALL)
+
+
+class Passport:
+    """Passport parser (process_passport), run on upper-cased text."""
+    GIVEN_NAMES = register("passport.given_names", r"(?:GIVEN\s*NAME[S]?|GIVEN\s*NAME\(S\))[\s:]*([A-Z\s]+?)(?=\s+SURNAME|\s+SEX|\s+NATIONALITY|\s+DATE|\n|$)")
+    SURNAME = register("passport.surname", r"SURNAME[\s:]*([A-Z\s]+?)(?=\s+GIVEN|\s+NATIONALITY|\s+DATE|\n|$)")
+    NUMBER_LINE = register("passport.number_line", r"^[A-Z][0-9]{7}$")
+    NUMBER_LABELLED = register("passport.number_labelled", r"PASSPORT\s*N[O0]\.?[\s:]*([A-Z][0-9]{7})")
+    NUMBER = register("passport.number", r"\b([A-Z][0-9]{7})\b")
+    DOB_LABELLED = register("passport.dob_labelled", r"DATE\s*OF\s*BIRTH[\s:]*(\d{2}[/-]\d{2}[/-]\d{4})")
+    GENDER = register("passport.gender", r"(?:SEX|GENDER)[\s:]*(M|F|MALE|FEMALE)")
+    MRZ_SEX = register("passport.mrz_sex", r"\d+([MFX])\d+")
@@ -0,0 +1,181 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """
+    Two-tier cache for extraction results keyed by content hash.
+    Tier 1 is an in-process LRU, tier 2 an optional on-disk JSON store
+    bounded by total size and entry age.
+    """
+    # Walking the disk tier is O(entries), so eviction runs every few writes instead of on each one
+    SWEEP_EVERY = 32
+
+    def __init__(self, max_entries: int = 256, cache_dir: Optional[str] = None,
+                 ttl_seconds: int = 86400, max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._writes_since_sweep = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            logger.info(f"Result cache disk tier enabled at {self.cache_dir}")
+
+    @classmethod
+    def from_env(cls) -> Optional["ResultCache"]:
+        if os.environ.get("RESULT_CACHE_ENABLED", "True").lower() != "true":
+            return None
+        return cls(
+            max_entries=int(os.environ.get("RESULT_CACHE_SIZE", 256)),
+            cache_dir=os.environ.get("RESULT_CACHE_DIR") or None,
+            ttl_seconds=int(os.environ.get("RESULT_CACHE_TTL", 86400)),
+            max_disk_bytes=int(os.environ.get("RESULT_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+        )
+
+    @staticmethod
+    def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+        """SHA-256 of a file's bytes, streamed so large PDFs are never fully loaded."""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def make_key(content_hash: str, version: str) -> str:
+        return hashlib.sha256(f"{content_hash}|{version}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._memory_put(key, value, now)
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Dict[str, Any]):
+        now = time.time()
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._memory_put(key, value, now)
+        self._disk_put(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, memory_entries=len(self._memory))
+
+    def _memory_put(self, key: str, value: Dict[str, Any], stored_at: float):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Result cache read failed for {key}: {e}")
+            return None
+
+    def _disk_put(self, key: str, value: Dict[str, Any]):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so concurrent workers never read a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Result cache write failed for {key}: {e}")
+            return
+
+        with self._lock:
+            self._writes_since_sweep += 1
+            if self._writes_since_sweep < self.SWEEP_EVERY:
+                return
+            self._writes_since_sweep = 0
+        try:
+            self._evict_disk()
+        except Exception as e:
+            logger.warning(f"Result cache eviction failed: {e}")
+
+    def _evict_disk(self):
+        """Drops expired entries, then the oldest ones until the tier fits in max_disk_bytes."""
+        now = time.time()
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.ttl_seconds:
+                    self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_disk_bytes:
+            return
+        for _, size, path in sorted(entries):
+            self._remove(path)
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,107 @@
+import os
+import time
+import logging
+import threading
+import cv2
+import numpy as np
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class WarmupState:
+    """Per-process warm-up progress, read by the readiness endpoint."""
+    PENDING = "pending"
+    WARMING = "warming"
+    READY = "ready"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = self.PENDING
+        self.error = None
+        self.steps = {}
+        self.duration_s = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in (self.READY, self.SKIPPED)
+
+    def update(self, **fields):
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "status": self.status,
+                "error": self.error,
+                "steps_s": dict(self.steps),
+                "duration_s": self.duration_s,
+                "pid": os.getpid(),
+            }
+
+WARMUP_STATE = WarmupState()
+
+def synthetic_document() -> np.ndarray:
+    """
+    Blank card with a few lines of printed text, generated in memory. Real text is needed so
+    detection, angle classification and recognition all run once, not just the detector.
+    """
+    image = np.full((420, 680, 3), 255, dtype=np.uint8)
+    for row, text in enumerate(["GOVERNMENT OF INDIA", "WARMUP SAMPLE", "DOB: 01/01/1990", "1234 5678 9012"]):
+        cv2.putText(image, text, (30, 80 + row * 90), cv2.FONT_HERSHEY_SIMPLEX, 1.3, (0, 0, 0), 2, cv2.LINE_AA)
+    return image
+
+def warm_up(extractor, include_donut: Optional[bool] = None, state: WarmupState = WARMUP_STATE) -> Dict[str, Any]:
+    """
+    Loads every model the pipeline uses and runs one synthetic inference through each,
+    so MKLDNN kernels are compiled before the first real request arrives.
+    A model that fails to load marks warm-up FAILED (and /api/v1/ready 503).
+    Failures are recorded but never raised: models still lazy-load on first use.
+    """
+    if include_donut is None:
+        include_donut = os.environ.get("WARMUP_DONUT", "True").lower() == "true"
+
+    state.update(status=WarmupState.WARMING, error=None)
+    started = time.perf_counter()
+    steps = {}
+    try:
+        image = synthetic_document()
+
+        step_start = time.perf_counter()
+        # Inference swallows its own errors and returns empty results, so models are loaded
+        # explicitly first: a load failure has to reach the except below and mark the worker FAILED
+        extractor.ocr_engine.load()
+        proc_image = extractor.preprocessor.preprocess_image(image)
+        extractor.preprocessor.extract_face(image)
+        raw_text, _, _ = extractor.ocr_engine.extract_text(proc_image)
+        extractor.cleaner.classifier.classify(raw_text)
+        steps["ocr"] = round(time.perf_counter() - step_start, 2)
+
+        if include_donut and extractor.donut_engine is not None:
+            step_start = time.perf_counter()
+            extractor.donut_engine.load()
+            extractor.donut_engine.process_image(image)
+            steps["donut"] = round(time.perf_counter() - step_start, 2)
+
+        duration = round(time.perf_counter() - started, 2)
+        state.update(status=WarmupState.READY, steps=steps, duration_s=duration)
+        logger.info(f"✅ Warm-up finished in {duration}s {steps}")
+    except Exception as e:
+        state.update(status=WarmupState.FAILED, error=str(e), steps=steps,
+                     duration_s=round(time.perf_counter() - started, 2))
+        logger.error(f"❌ Warm-up failed: {e}", exc_info=True)
+    return state.snapshot()
+
+def start_warmup(extractor, background: bool = True, state: WarmupState = WARMUP_STATE):
+    """Runs warm-up per WARMUP_ON_START; in the background so the server can answer liveness probes meanwhile."""
+    if os.environ.get("WARMUP_ON_START", "True").lower() != "true":
+        state.update(status=WarmupState.SKIPPED)
+        return
+    if background:
+        threading.Thread(target=warm_up, args=(extractor,), kwargs={"state": state}, name="warmup", daemon=True).start()
+    else:
+        warm_up(extractor, state=state)
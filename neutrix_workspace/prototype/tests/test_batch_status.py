@@ -0,0 +1,89 @@
+import pytest
+
+flask = pytest.importorskip("flask")
+pytest.importorskip("celery")
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from app import routes, tasks
+
+
+class FakeResult:
+    """AsyncResult stand-in that counts how often the backend state is read."""
+    reads = 0
+
+    def __init__(self, state, info=None):
+        self._state = state
+        self.info = info
+
+    @property
+    def state(self):
+        FakeResult.reads += 1
+        return self._state
+
+
+@pytest.fixture
+def batch(monkeypatch):
+    results = {}
+
+    def use(chunks):
+        manifest = {"items": [], "chunks": []}
+        for task_id, (state, info, filenames) in enumerate(chunks):
+            first = len(manifest["items"])
+            manifest["items"].extend(filenames)
+            manifest["chunks"].append({"task_id": str(task_id), "items": list(range(first, len(manifest["items"])))})
+            results[str(task_id)] = FakeResult(state, info)
+        monkeypatch.setattr(tasks, "load_batch", lambda batch_id: manifest if batch_id == "b1" else None)
+        monkeypatch.setattr(tasks.process_documents_batch_async, "AsyncResult", lambda task_id: results[task_id])
+        FakeResult.reads = 0
+        with flask.Flask(__name__).test_request_context():
+            response = routes.get_batch_status("b1")
+            return response.get_json()
+
+    return use
+
+
+def test_items_follow_their_chunk(batch):
+    status = batch([
+        ("SUCCESS", [{"name": "A"}, {"error": "unreadable"}], ["a.jpg", "b.jpg"]),
+        ("PROCESSING", None, ["c.jpg"]),
+        ("PENDING", None, ["d.jpg"]),
+    ])
+
+    assert [item["state"] for item in status["items"]] == ["SUCCESS", "FAILURE", "PROCESSING", "PENDING"]
+    assert status["items"][0]["result"] == {"name": "A"}
+    assert status["items"][1]["error"] == "unreadable"
+    assert [item["filename"] for item in status["items"]] == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+    assert status["counts"] == {"PENDING": 1, "PROCESSING": 1, "SUCCESS": 1, "FAILURE": 1}
+    assert status["state"] == "PROCESSING"
+
+
+def test_state_is_read_once_per_chunk(batch):
+    batch([("SUCCESS", [{}, {}, {}], ["a", "b", "c"]), ("PENDING", None, ["d", "e"])])
+
+    assert FakeResult.reads == 2
+
+
+@pytest.mark.parametrize("chunks, state", [
+    ([("PENDING", None, ["a"]), ("PENDING", None, ["b"])], "PENDING"),
+    ([("SUCCESS", [{}], ["a"]), ("SUCCESS", [{}], ["b"])], "SUCCESS"),
+    ([("SUCCESS", [{}], ["a"]), ("FAILURE", "boom", ["b"])], "PARTIAL_FAILURE"),
+    ([("FAILURE", "boom", ["a", "b"])], "FAILURE"),
+    ([("SUCCESS", [{"error": "x"}], ["a"])], "FAILURE"),
+])
+def test_batch_state(batch, chunks, state):
+    assert batch(chunks)["state"] == state
+
+
+def test_failed_chunk_reports_its_error_on_every_item(batch):
+    status = batch([("FAILURE", "worker lost", ["a", "b"])])
+
+    assert [item["error"] for item in status["items"]] == ["worker lost", "worker lost"]
+
+
+def test_unknown_batch(monkeypatch):
+    monkeypatch.setattr(tasks, "load_batch", lambda batch_id: None)
+    with flask.Flask(__name__).test_request_context():
+        _, status = routes.get_batch_status("missing")
+
+    assert status == 404
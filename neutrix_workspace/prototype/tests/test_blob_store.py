@@ -0,0 +1,127 @@
+import os
+import time
+import hashlib
+
+import pytest
+
+from utils.blob_store import BlobStore, LocalBlobStore, BlobCache
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalBlobStore(root=str(tmp_path / "blobs"), ttl_seconds=60)
+
+
+def leases(store, key):
+    return [name for name in os.listdir(store.root) if name.startswith(key + ".") and name.endswith(".lease")]
+
+
+def age(path, seconds=120):
+    stale = time.time() - seconds
+    os.utime(path, (stale, stale))
+
+
+def test_payloads_are_content_addressed(store):
+    key, lease = store.put_bytes(b"document", ".PDF")
+
+    assert key == hashlib.sha256(b"document").hexdigest() + ".pdf"
+    assert lease
+    with store.open(key) as f:
+        assert f.read() == b"document"
+
+
+def test_identical_payloads_share_one_file(store):
+    key_a, _ = store.put_bytes(b"document", ".jpg")
+    key_b, _ = store.put_bytes(b"document", ".jpg")
+
+    assert key_a == key_b
+    assert len(leases(store, key_a)) == 2
+    assert len([name for name in os.listdir(store.root) if not name.endswith(".lease")]) == 2  # payload + .lock
+
+
+def test_payload_is_deleted_with_its_last_lease(store):
+    key, lease_a = store.put_bytes(b"document", ".jpg")
+    _, lease_b = store.put_bytes(b"document", ".jpg")
+
+    store.release(key, lease_a)
+    assert os.path.exists(store.local_path(key))
+    store.release(key, lease_b)
+
+    assert not os.path.exists(store.local_path(key))
+    assert leases(store, key) == []
+    with pytest.raises(FileNotFoundError):
+        store.open(key)
+
+
+def test_release_without_lease_is_a_no_op(store):
+    key, _ = store.put_bytes(b"document", ".jpg")
+    store.release(key, None)
+
+    assert os.path.exists(store.local_path(key))
+
+
+def test_named_put_without_lease(store):
+    key, lease = store.put_bytes(b"face", key="abc.face.jpg", lease=False)
+
+    assert (key, lease) == ("abc.face.jpg", None)
+    assert leases(store, key) == []
+    store.put_bytes(b"newer face", key="abc.face.jpg", lease=False)
+    with store.open(key) as f:
+        assert f.read() == b"newer face"
+
+
+def test_sweep_removes_expired_payloads(store):
+    old_key, _ = store.put_bytes(b"old", ".jpg", lease=False)
+    new_key, _ = store.put_bytes(b"new", ".jpg", lease=False)
+    age(store.local_path(old_key))
+
+    store.sweep()
+
+    assert not os.path.exists(store.local_path(old_key))
+    assert os.path.exists(store.local_path(new_key))
+    assert os.path.exists(os.path.join(store.root, ".lock"))
+
+
+def test_sweep_keeps_payloads_with_a_live_lease(store):
+    key, lease = store.put_bytes(b"long batch", ".pdf")
+    age(store.local_path(key))
+
+    store.sweep()
+
+    assert os.path.exists(store.local_path(key))
+    store.release(key, lease)
+    assert not os.path.exists(store.local_path(key))
+
+
+def test_sweep_expires_stale_leases_then_their_payload(store):
+    key, _ = store.put_bytes(b"crashed worker", ".pdf")
+    age(store.local_path(key))
+    for name in leases(store, key):
+        age(os.path.join(store.root, name))
+
+    store.sweep()
+
+    assert leases(store, key) == []
+    assert not os.path.exists(store.local_path(key))
+
+
+def test_blob_store_is_abstract():
+    with pytest.raises(TypeError):
+        BlobStore()
+
+
+def test_cache_uses_local_payloads_in_place(store, tmp_path):
+    key, _ = store.put_bytes(b"document", ".jpg")
+    cache = BlobCache(store, cache_dir=str(tmp_path / "cache"))
+
+    assert cache.fetch(key) == store.local_path(key)
+    assert cache.stats() == {"local": 1, "hits": 0, "misses": 0}
+
+
+def test_arrays_round_trip_compressed(store, tmp_path):
+    np = pytest.importorskip("numpy")
+    image = np.arange(48, dtype=np.uint8).reshape(4, 4, 3)
+    key, _ = store.put_array(image)
+
+    assert key.endswith(".npz")
+    np.testing.assert_array_equal(BlobCache(store, cache_dir=str(tmp_path / "cache")).fetch_array(key), image)
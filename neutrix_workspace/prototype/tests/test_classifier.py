@@ -0,0 +1,61 @@
+from pipeline import classifier
+from pipeline.classifier import DocumentClassifier
+
+
+def test_signatures_matching_the_same_span_all_vote():
+    signatures = [
+        (r"DL\s?No", {classifier.DRIVING_LICENSE: 1}),
+        (r"(?i:dl\sno)", {classifier.DRIVING_LICENSE_BASIC: 2}),
+    ]
+    result = DocumentClassifier(signatures).classify("DL No : KA01 20110012345")
+
+    assert dict(result.ranking) == {classifier.DRIVING_LICENSE: 1, classifier.DRIVING_LICENSE_BASIC: 2}
+    assert result.document_type == classifier.DRIVING_LICENSE_BASIC
+
+
+def test_dl_number_votes_for_both_license_parsers():
+    ranking = dict(DocumentClassifier().classify("DL No KA01").ranking)
+
+    assert ranking[classifier.DRIVING_LICENSE] == 3
+    assert ranking[classifier.DRIVING_LICENSE_BASIC] == 4
+
+
+def test_signature_votes_once_however_often_it_matches():
+    signatures = [(r"(?i:marks)", {classifier.MARKSHEET: 1})]
+    result = DocumentClassifier(signatures).classify("Marks 40 marks 50 MARKS 90")
+
+    assert result.ranking == [(classifier.MARKSHEET, 1)]
+
+
+def test_scores_and_confidence():
+    result = DocumentClassifier().classify("Government of India Rahul Kumar DOB: 01/01/1990 MALE 1234 5678 9012")
+
+    assert result.document_type == classifier.AADHAAR
+    assert result.ranking == [(classifier.AADHAAR, 5)]
+    assert result.confidence == 1.0
+
+
+def test_ties_follow_priority_order():
+    signatures = [
+        (r"passport", {classifier.PASSPORT: 2}),
+        (r"university", {classifier.MARKSHEET: 2}),
+    ]
+    result = DocumentClassifier(signatures).classify("passport university")
+
+    assert result.document_type == classifier.MARKSHEET
+    assert result.confidence == 0.5
+
+
+def test_unmatched_text_is_unknown():
+    result = DocumentClassifier().classify("lorem ipsum")
+
+    assert result.document_type == classifier.UNKNOWN
+    assert result.confidence == 0.0
+    assert result.ranking == []
+
+
+def test_below_min_score_is_unknown():
+    result = DocumentClassifier(min_score=4).classify("Semester result")
+
+    assert result.document_type == classifier.UNKNOWN
+    assert result.ranking == [(classifier.MARKSHEET, 1)]
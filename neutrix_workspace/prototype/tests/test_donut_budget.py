@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("transformers")
+
+import numpy as np
+from pipeline.donut_engine import DonutEngine
+from pipeline.extractor import HybridExtractorPipeline
+
+
+class RecordingRunner:
+    """Stands in for DonutEngine/DonutBatcher and records the budget each call resolves to."""
+    def __init__(self):
+        self.engine = DonutEngine.__new__(DonutEngine)
+        self.engine.budgets = DonutEngine._load_budgets()
+        self.budgets = []
+
+    def process_image(self, image, document_type=None):
+        self.budgets.append(self.engine.budget_for(document_type))
+        return {}
+
+
+@pytest.fixture
+def pipeline():
+    extractor = HybridExtractorPipeline.__new__(HybridExtractorPipeline)
+    extractor.donut_batcher = None
+    extractor.donut_engine = RecordingRunner()
+    return extractor
+
+
+def test_hint_selects_type_budget_on_unknown_document(pipeline):
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+    pipeline.donut_fallback({"document_type": "Unknown"}, image, document_type="pan")
+    pipeline.enrich_with_donut({"document_type": "Unknown", "donut_pending": True}, image, document_type="Marksheet")
+
+    budgets = pipeline.donut_engine.budgets
+    assert budgets[0].max_new_tokens == 128
+    assert budgets[1].max_new_tokens == 512
+
+
+def test_missing_or_unknown_hint_uses_default_budget(pipeline):
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+    pipeline.donut_fallback({"document_type": "Unknown"}, image)
+    pipeline.donut_fallback({"document_type": "Unknown"}, image, document_type="library card")
+
+    default = pipeline.donut_engine.engine.budgets["default"]
+    assert pipeline.donut_engine.budgets == [default, default]
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from pipeline.inference_client import RemoteDonutEngine
+
+
+class FakeClient:
+    address = "/run/neutrix/inference.sock"
+
+    def __init__(self, donut_model):
+        self.donut_model = donut_model
+        self.calls = []
+
+    def info(self):
+        return {"lang": "en", "donut_model": self.donut_model, "donut_variant": "fp32" if self.donut_model else None}
+
+    def call(self, method, *args, **kwargs):
+        self.calls.append(method)
+        return {"method": method}
+
+
+def test_server_without_donut_degrades_to_empty_results():
+    client = FakeClient(donut_model=None)
+    engine = RemoteDonutEngine(client)
+
+    assert engine.model_name is None
+    assert engine.process_image("page.jpg", document_type="pan") == {}
+    assert engine.process_batch(["a.jpg", "b.jpg"]) == [{}, {}]
+    assert engine.get_metrics() == {}
+    assert client.calls == []
+
+
+def test_server_with_donut_serves_calls():
+    client = FakeClient(donut_model="naver-clova-ix/donut-base")
+    engine = RemoteDonutEngine(client)
+
+    assert engine.process_image("page.jpg") == {"method": "donut.process_image"}
+    assert client.calls == ["donut.process_image"]
+
+
+def test_load_only_checks_the_server_is_reachable():
+    client = FakeClient(donut_model=None)
+    RemoteDonutEngine(client).load()
+
+    assert client.calls == ["ping"]
@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("paddleocr")
+
+import numpy as np
+from pipeline import ocr_engine
+from pipeline.ocr_engine import OCREngine
+
+
+class FakeModel:
+    """
+    Stands in for PaddleOCR's detector/classifier/recognizer. Image i is filled with the value i
+    and has BOXES[i] text boxes; each crop is recognized as "img<i>-line<k>".
+    """
+    BOXES = {0: 2, 1: 0, 2: 1}
+    use_angle_cls = True
+    drop_score = 0.5
+
+    def __init__(self):
+        self.recognizer_calls = []
+
+    def text_detector(self, img):
+        count = self.BOXES[int(img[0, 0, 0])]
+        return np.array([[[k, 0], [1, 0], [1, 1], [0, 1]] for k in range(count)], dtype=np.float32), None
+
+    def text_classifier(self, crops):
+        return crops, None, None
+
+    def text_recognizer(self, crops):
+        self.recognizer_calls.append(list(crops))
+        # The second line of image 0 falls below drop_score
+        return [(f"img{image}-line{k}", 0.4 if (image, k) == (0, 1) else 0.9) for image, k in crops], None
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(ocr_engine, "BATCH_OCR_AVAILABLE", True)
+    monkeypatch.setattr(ocr_engine, "sorted_boxes", lambda boxes: list(boxes), raising=False)
+    monkeypatch.setattr(ocr_engine, "get_rotate_crop_image", lambda img, box: (int(img[0, 0, 0]), int(box[0][0])), raising=False)
+    engine = OCREngine()
+    engine.ocr = FakeModel()
+    return engine
+
+
+def test_batch_results_follow_input_order(engine):
+    images = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(3)]
+
+    results = engine.extract_text_batch(images)
+
+    assert [lines for _, lines, _ in results] == [["img0-line0"], [], ["img2-line0"]]
+    assert [text for text, _, _ in results] == ["img0-line0", "", "img2-line0"]
+    assert results[0][2] == pytest.approx(0.9)
+    assert results[1][2] == 0.0
+
+
+def test_crops_of_all_images_are_recognized_in_one_pass(engine):
+    images = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(3)]
+
+    engine.extract_text_batch(images)
+
+    assert engine.ocr.recognizer_calls == [[(0, 0), (0, 1), (2, 0)]]
+    assert engine.get_metrics()["served"][OCREngine.BACKEND_MKLDNN] == 3
+
+
+def test_empty_batch(engine):
+    assert engine.extract_text_batch([]) == []
+    assert engine.ocr.recognizer_calls == []
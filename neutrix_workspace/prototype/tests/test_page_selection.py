@@ -0,0 +1,39 @@
+import pytest
+
+from utils.page_selection import parse_page_selection
+
+
+@pytest.mark.parametrize("selection, expected", [
+    (None, [0, 1, 2, 3]),
+    ("", [0, 1, 2, 3]),
+    ("all", [0, 1, 2, 3]),
+    (" FIRST ", [0]),
+    ("2", [1]),
+    ("1-3", [0, 1, 2]),
+    ("1-2,4", [0, 1, 3]),
+    ("3,1", [2, 0]),
+    ("1-3,2-4", [0, 1, 2, 3]),
+    (" 1 - 2 , 4 ", [0, 1, 3]),
+])
+def test_selections(selection, expected):
+    assert parse_page_selection(selection, page_count=4) == expected
+
+
+def test_ranges_are_clipped_to_the_document():
+    assert parse_page_selection("3-9", page_count=4) == [2, 3]
+    assert parse_page_selection("7", page_count=4) == []
+
+
+def test_empty_document():
+    assert parse_page_selection("first", page_count=0) == []
+    assert parse_page_selection("all", page_count=0) == []
+
+
+def test_max_pages_truncates():
+    assert parse_page_selection("all", page_count=10, max_pages=3) == [0, 1, 2]
+
+
+@pytest.mark.parametrize("selection", ["abc", "1-", "0", "3-1", "1;2", "-2"])
+def test_invalid_selections(selection):
+    with pytest.raises(ValueError):
+        parse_page_selection(selection, page_count=4)
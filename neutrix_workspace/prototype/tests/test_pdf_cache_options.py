@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("fitz")
+
+from pipeline.extractor import HybridExtractorPipeline
+from utils.pdf_processor import PDFProcessor
+
+
+class FourPages(PDFProcessor):
+    def page_count(self, pdf):
+        return 4
+
+
+@pytest.fixture
+def pipeline():
+    extractor = HybridExtractorPipeline.__new__(HybridExtractorPipeline)
+    extractor.pdf_processor = FourPages.__new__(FourPages)
+    extractor.default_pages = "first"
+    extractor.max_pages = 10
+    return extractor
+
+
+@pytest.mark.parametrize("a, b", [
+    ("1-2", "1,2"),
+    (None, "first"),
+    ("all", "1-4"),
+    ("2-9", "2,3,4"),
+])
+def test_equivalent_selections_share_options(pipeline, a, b):
+    assert pipeline.pdf_cache_options("doc.pdf", a) == pipeline.pdf_cache_options("doc.pdf", b)
+
+
+def test_options_carry_indexes_and_docling(pipeline):
+    assert pipeline.pdf_cache_options("doc.pdf", "3,1", use_docling=True) == "pages=2,0;docling=True"
+    assert pipeline.pdf_cache_options("doc.pdf", "1,3") != pipeline.pdf_cache_options("doc.pdf", "3,1")
@@ -0,0 +1,84 @@
+import os
+import time
+
+from pipeline import result_cache
+from pipeline.result_cache import ResultCache
+
+
+def test_miss_then_memory_hit():
+    cache = ResultCache()
+    key = ResultCache.make_key(ResultCache.hash_bytes(b"document"), "v1")
+
+    assert cache.get(key) is None
+    cache.put(key, {"name": "Rahul"})
+
+    assert cache.get(key) == {"name": "Rahul"}
+    assert cache.stats() == {"memory_hits": 1, "disk_hits": 0, "misses": 1, "memory_entries": 1}
+
+
+def test_cached_values_are_copies():
+    cache = ResultCache()
+    value = {"lines": ["a"]}
+    cache.put("k", value)
+    value["lines"].append("b")
+    cache.get("k")["lines"].append("c")
+
+    assert cache.get("k") == {"lines": ["a"]}
+
+
+def test_key_depends_on_version():
+    content_hash = ResultCache.hash_bytes(b"document")
+
+    assert ResultCache.make_key(content_hash, "pages=0") != ResultCache.make_key(content_hash, "pages=0,1")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    cache.get("a")
+    cache.put("c", {"v": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("c") == {"v": 3}
+
+
+def test_memory_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    cache = ResultCache(ttl_seconds=60)
+    cache.put("k", {"v": 1})
+
+    now[0] += 60
+    assert cache.get("k") == {"v": 1}
+    now[0] += 1
+    assert cache.get("k") is None
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    ResultCache(cache_dir=str(tmp_path)).put("ab12", {"v": 1})
+    cache = ResultCache(cache_dir=str(tmp_path))
+
+    assert cache.get("ab12") == {"v": 1}
+    assert cache.get("ab12") == {"v": 1}
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_expired_disk_entries_are_removed(tmp_path):
+    ResultCache(cache_dir=str(tmp_path)).put("ab12", {"v": 1})
+    path = tmp_path / "ab" / "ab12.json"
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+
+    assert ResultCache(cache_dir=str(tmp_path), ttl_seconds=60).get("ab12") is None
+    assert not path.exists()
+
+
+def test_hash_file_matches_hash_bytes(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"x" * 3000)
+
+    assert ResultCache.hash_file(str(path), chunk_size=1024) == ResultCache.hash_bytes(b"x" * 3000)
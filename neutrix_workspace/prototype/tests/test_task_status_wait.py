@@ -0,0 +1,71 @@
+import pytest
+
+flask = pytest.importorskip("flask")
+pytest.importorskip("celery")
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from app import routes
+
+
+@pytest.fixture
+def status(monkeypatch):
+    """Calls get_task_status with a query string; returns (body, http status, timeouts long-polled with)."""
+    timeouts = []
+
+    def fake_updates(task_id, timeout, keepalive):
+        timeouts.append(timeout)
+        yield {"state": "SUCCESS", "result": {"name": "A"}}
+
+    monkeypatch.setattr(routes, "_task_status", lambda task_id: {"state": "PENDING", "status": "Pending..."})
+    monkeypatch.setattr(routes, "_status_updates", fake_updates)
+    monkeypatch.setenv("EVENTS_MAX_WAIT", "60")
+
+    def get(query):
+        with flask.Flask(__name__).test_request_context(f"/api/v1/status/t1{query}"):
+            response = routes.get_task_status("t1")
+            if isinstance(response, tuple):
+                response, code = response
+            else:
+                code = response.status_code
+            return response.get_json(), code, timeouts
+
+    return get
+
+
+@pytest.mark.parametrize("query", ["", "?wait=0", "?wait=-3"])
+def test_without_positive_wait_answers_right_away(status, query):
+    body, code, timeouts = status(query)
+
+    assert (body["state"], code) == ("PENDING", 200)
+    assert timeouts == []
+
+
+def test_wait_long_polls_for_the_update(status):
+    body, code, timeouts = status("?wait=2.5")
+
+    assert (body["state"], code) == ("SUCCESS", 200)
+    assert timeouts == [2.5]
+
+
+def test_wait_is_capped_by_events_max_wait(status):
+    _, _, timeouts = status("?wait=3600")
+
+    assert timeouts == [60.0]
+
+
+@pytest.mark.parametrize("query", ["?wait=soon", "?wait=", "?wait=nan", "?wait=inf", "?wait=-inf"])
+def test_non_finite_wait_is_rejected(status, query):
+    body, code, timeouts = status(query)
+
+    assert code == 400
+    assert "wait" in body["error"]
+    assert timeouts == []
+
+
+def test_long_poll_releases_its_slot(status):
+    # More polls than EVENTS_MAX_STREAMS slots, each one still long-polls
+    for _ in range(32):
+        _, _, timeouts = status("?wait=1")
+
+    assert len(timeouts) == 32
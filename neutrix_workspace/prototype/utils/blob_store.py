@@ -0,0 +1,389 @@
+import os
+import io
+import time
+import uuid
+import glob
+import fcntl
+import shutil
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, closing
+from typing import BinaryIO, Tuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+class BlobStore(ABC):
+    """
+    Content-addressed store for uploads that outlive the request (async tasks).
+    Each payload is stored once under `<sha256><ext>`, whatever the client called it,
+    and that key is all a task needs to carry.
+    Every user of a payload holds a lease and releases it when done with the payload.
+    """
+    @abstractmethod
+    def put(self, stream: BinaryIO, extension: str = "", key: Optional[str] = None,
+            lease: bool = True) -> Tuple[str, Optional[str]]:
+        """
+        Streams a payload into the store. Returns (key, lease).
+        An explicit `key` stores it under that name instead of its hash, replacing any previous payload.
+        With `lease=False` no lease is taken (the returned lease is None) and the payload only expires.
+        """
+
+    def put_bytes(self, data: bytes, extension: str = "", key: Optional[str] = None,
+                  lease: bool = True) -> Tuple[str, Optional[str]]:
+        return self.put(io.BytesIO(data), extension, key, lease)
+
+    def put_array(self, array: "np.ndarray") -> Tuple[str, str]:
+        """
+        Stores a decoded image or other array as a compressed .npz (lossless, any dtype),
+        so the next stage loads it without decoding the original upload again.
+        """
+        # Only the staged pipeline stores arrays, so the store itself imports without numpy
+        import numpy as np
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, array=array)
+        buffer.seek(0)
+        return self.put(buffer, ".npz")
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Readable stream over a stored payload, raises FileNotFoundError if it is gone."""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path of the payload if this process can read it directly, None for remote stores."""
+        return None
+
+    @abstractmethod
+    def release(self, key: str, lease: Optional[str]):
+        """Drops a lease taken by put; the payload may be deleted once no lease is left."""
+
+    @staticmethod
+    def content_hash(key: str) -> str:
+        return os.path.splitext(key)[0]
+
+    @staticmethod
+    def _spool(stream: BinaryIO, directory: str, extension: str) -> Tuple[str, str]:
+        """Copies a stream into a temp file in `directory` while hashing it. Returns (key, tmp_path)."""
+        digest = hashlib.sha256()
+        tmp_path = os.path.join(directory, f".{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+        except Exception:
+            _remove(tmp_path)
+            raise
+        return f"{digest.hexdigest()}{extension.lower()}", tmp_path
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blob store on a local directory, or a volume mounted on every node (NFS, EFS...).
+    The payload is deleted when the last lease is released, and anything older than
+    the TTL is swept regardless.
+    """
+    SWEEP_EVERY = 32
+
+    def __init__(self, root: str = os.path.join("uploads", "blobs"), ttl_seconds: int = 3600):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(self.root, exist_ok=True)
+        self._lock_path = os.path.join(self.root, ".lock")
+        self._puts_since_sweep = 0
+        self._counter_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        # API and worker processes share the directory, so leases are updated under a file lock
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def put(self, stream: BinaryIO, extension: str = "", key: Optional[str] = None,
+            lease: bool = True) -> Tuple[str, Optional[str]]:
+        digest_key, tmp_path = self._spool(stream, self.root, extension)
+        key = key or digest_key
+        lease = uuid.uuid4().hex if lease else None
+        try:
+            with self._locked():
+                if lease:
+                    open(self._lease_path(key, lease), "w").close()
+                # Identical payloads share one file; replacing it also refreshes its age
+                os.replace(tmp_path, self.local_path(key))
+        finally:
+            _remove(tmp_path)
+
+        self._maybe_sweep()
+        return key, lease
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.local_path(key), "rb")
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, os.path.basename(key))
+
+    def release(self, key: str, lease: Optional[str]):
+        """Drops a lease and deletes the payload once nobody else holds one."""
+        if not lease:
+            return
+        path = self.local_path(key)
+        with self._locked():
+            _remove(self._lease_path(key, lease))
+            if not glob.glob(glob.escape(path) + ".*.lease"):
+                _remove(path)
+
+    def _lease_path(self, key: str, lease: str) -> str:
+        return f"{self.local_path(key)}.{lease}.lease"
+
+    def _maybe_sweep(self):
+        with self._counter_lock:
+            self._puts_since_sweep += 1
+            if self._puts_since_sweep < self.SWEEP_EVERY:
+                return
+            self._puts_since_sweep = 0
+        try:
+            self.sweep()
+        except Exception as e:
+            logger.warning(f"Blob store sweep failed: {e}")
+
+    def sweep(self):
+        """
+        Deletes leases older than the TTL, e.g. left behind by a crashed worker, then payloads
+        older than the TTL that no live lease holds any more.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        with self._locked():
+            names = [name for name in os.listdir(self.root) if name != ".lock"]
+            leased = set()
+            for name in names:
+                if not name.endswith(".lease"):
+                    continue
+                if _older_than(os.path.join(self.root, name), cutoff):
+                    _remove(os.path.join(self.root, name))
+                else:
+                    # <key>.<lease>.lease
+                    leased.add(name[:-len(".lease")].rsplit(".", 1)[0])
+
+            for name in names:
+                if name.endswith(".lease") or name in leased:
+                    continue
+                path = os.path.join(self.root, name)
+                if _older_than(path, cutoff):
+                    _remove(path)
+
+
+class S3BlobStore(BlobStore):
+    """
+    Blob store on S3 or any S3-compatible service (MinIO, Ceph RGW...) via `endpoint_url`.
+    S3 offers no lock to count leases under, so releasing is a no-op and payloads are
+    expired by a lifecycle rule on the bucket (prefix `prefix`, e.g. one day).
+    """
+    def __init__(self, bucket: str, prefix: str = "uploads/", endpoint_url: Optional[str] = None,
+                 spool_dir: str = os.path.join("uploads", "blobs")):
+        if not BOTO3_AVAILABLE:
+            raise ImportError("boto3 is required for BLOB_STORE=s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.spool_dir = spool_dir
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    def put(self, stream: BinaryIO, extension: str = "", key: Optional[str] = None,
+            lease: bool = True) -> Tuple[str, Optional[str]]:
+        # The key is the content hash, so the payload is hashed into a local temp file first
+        digest_key, tmp_path = self._spool(stream, self.spool_dir, extension)
+        key = key or digest_key
+        try:
+            self.client.upload_file(tmp_path, self.bucket, self.prefix + key)
+        finally:
+            _remove(tmp_path)
+        return key, uuid.uuid4().hex if lease else None
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise FileNotFoundError(f"Blob {key} not found in s3://{self.bucket}/{self.prefix}")
+            raise
+
+    def release(self, key: str, lease: Optional[str]):
+        pass
+
+
+class BlobCache:
+    """
+    Worker-side LRU of fetched blobs, so retries, Donut enrichment and repeated
+    uploads of the same document do not stream it from the store again.
+    Blobs the store can serve from a local path are used in place.
+    Shared by the worker processes of a node, bounded by total size.
+    """
+    EVICT_EVERY = 16
+
+    def __init__(self, store: BlobStore, cache_dir: str = os.path.join("uploads", "blob_cache"),
+                 max_bytes: int = 1024 * 1024 * 1024):
+        self.store = store
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._fetches_since_evict = 0
+        self._stats = {"local": 0, "hits": 0, "misses": 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def fetch(self, key: str) -> str:
+        """Local path of a blob, streamed from the store on a miss."""
+        path = self.store.local_path(key)
+        if path is not None:
+            self._count("local")
+            return path
+
+        path = os.path.join(self.cache_dir, os.path.basename(key))
+        if os.path.exists(path):
+            # mtime doubles as the LRU clock, the files themselves are immutable
+            os.utime(path)
+            self._count("hits")
+            return path
+
+        self._count("misses")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with closing(self.store.open(key)) as src, open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        finally:
+            _remove(tmp_path)
+
+        with self._lock:
+            self._fetches_since_evict += 1
+            evict = self._fetches_since_evict >= self.EVICT_EVERY
+            if evict:
+                self._fetches_since_evict = 0
+        if evict:
+            try:
+                self._evict()
+            except Exception as e:
+                logger.warning(f"Blob cache eviction failed: {e}")
+        return path
+
+    def fetch_array(self, key: str) -> "np.ndarray":
+        import numpy as np
+        with np.load(self.fetch(key), allow_pickle=False) as archive:
+            return archive["array"]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _evict(self):
+        """Drops the least recently used blobs until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+
+def build_blob_store() -> BlobStore:
+    """Blob store selected by BLOB_STORE: local (default) or s3."""
+    return _build_store(
+        root=os.environ.get("BLOB_STORE_DIR", os.path.join("uploads", "blobs")),
+        prefix=os.environ.get("BLOB_S3_PREFIX", "uploads/"),
+        ttl_seconds=int(os.environ.get("BLOB_STORE_TTL", 3600)),
+    )
+
+def build_artifact_store() -> BlobStore:
+    """
+    Store for result artifacts such as face crops, on the same backend as the blob store.
+    Artifacts are never released, they expire with ARTIFACT_STORE_TTL (by default as long
+    as task results are kept); on S3 give ARTIFACT_S3_PREFIX a lifecycle rule of its own.
+    """
+    return _build_store(
+        root=os.environ.get("ARTIFACT_STORE_DIR", os.path.join("uploads", "artifacts")),
+        prefix=os.environ.get("ARTIFACT_S3_PREFIX", "artifacts/"),
+        ttl_seconds=int(os.environ.get("ARTIFACT_STORE_TTL", os.environ.get("CELERY_RESULT_EXPIRES", 86400))),
+    )
+
+def _build_store(root: str, prefix: str, ttl_seconds: int) -> BlobStore:
+    kind = os.environ.get("BLOB_STORE", "local").lower()
+    if kind == "s3":
+        return S3BlobStore(
+            bucket=os.environ.get("BLOB_S3_BUCKET", "neutrix-uploads"),
+            prefix=prefix,
+            endpoint_url=os.environ.get("BLOB_S3_ENDPOINT_URL") or None,
+            spool_dir=root,
+        )
+    if kind != "local":
+        logger.warning(f"Unknown BLOB_STORE '{kind}', using the local store")
+    return LocalBlobStore(root=root, ttl_seconds=ttl_seconds)
+
+_blob_store = None
+_blob_cache = None
+_artifact_store = None
+
+def get_blob_store() -> BlobStore:
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = build_blob_store()
+    return _blob_store
+
+def get_blob_cache() -> BlobCache:
+    global _blob_cache
+    if _blob_cache is None:
+        _blob_cache = BlobCache(
+            get_blob_store(),
+            cache_dir=os.environ.get("BLOB_CACHE_DIR", os.path.join("uploads", "blob_cache")),
+            max_bytes=int(os.environ.get("BLOB_CACHE_MAX_BYTES", 1024 * 1024 * 1024)),
+        )
+    return _blob_cache
+
+def get_artifact_store() -> BlobStore:
+    global _artifact_store
+    if _artifact_store is None:
+        _artifact_store = build_artifact_store()
+    return _artifact_store
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _older_than(path: str, cutoff: float) -> bool:
+    try:
+        return os.path.getmtime(path) < cutoff
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,55 @@
+import os
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Fields of /proc/<pid>/smaps_rollup worth reporting. Pss splits shared pages between the
+# processes mapping them, so summing Pss over workers gives the real footprint of a node.
+_SMAPS_FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_clean_mb",
+    "Shared_Dirty": "shared_dirty_mb",
+    "Private_Clean": "private_clean_mb",
+    "Private_Dirty": "private_dirty_mb",
+}
+
+def process_memory(pid: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """RSS/PSS breakdown of one process in MB, or None where /proc is unavailable (non-Linux)."""
+    pid = pid or os.getpid()
+    report = {"pid": pid}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                key = parts[0].rstrip(":")
+                if key in _SMAPS_FIELDS:
+                    report[_SMAPS_FIELDS[key]] = round(int(parts[1]) / 1024, 1)
+    except (FileNotFoundError, PermissionError, ProcessLookupError):
+        return None
+    return report
+
+def child_pids(pid: int) -> List[int]:
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except (FileNotFoundError, PermissionError):
+        pass
+    return children
+
+def worker_memory_report() -> Dict[str, Any]:
+    """
+    Memory of this process and of its sibling workers (the other children of the
+    gunicorn master / Celery parent), so per-worker cost is visible from any one of them.
+    """
+    parent = os.getppid()
+    workers = [report for report in (process_memory(pid) for pid in sorted(child_pids(parent))) if report]
+    return {
+        "self": process_memory(),
+        "parent": process_memory(parent),
+        "workers": workers,
+        "total_pss_mb": round(sum(report.get("pss_mb", 0) for report in workers), 1),
+    }
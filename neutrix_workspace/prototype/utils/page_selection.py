@@ -0,0 +1,34 @@
+import re
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+def parse_page_selection(selection: Optional[str], page_count: int, max_pages: Optional[int] = None) -> List[int]:
+    """
+    Turns a page selection into zero-based page indexes.
+    Accepts "all" (or empty), "first", or 1-based ranges like "1-3,5".
+    """
+    selection = (selection or "all").strip().lower()
+    if selection == "all":
+        indexes = list(range(page_count))
+    elif selection == "first":
+        indexes = [0] if page_count > 0 else []
+    else:
+        indexes = []
+        for part in selection.split(","):
+            match = re.fullmatch(r"\s*(\d+)\s*(?:-\s*(\d+)\s*)?", part)
+            if not match:
+                raise ValueError(f"Invalid page selection: {selection!r}")
+            start = int(match.group(1))
+            end = int(match.group(2) or start)
+            if start < 1 or end < start:
+                raise ValueError(f"Invalid page range: {part.strip()!r}")
+            for page_num in range(start, min(end, page_count) + 1):
+                if page_num - 1 not in indexes:
+                    indexes.append(page_num - 1)
+
+    if max_pages is not None and len(indexes) > max_pages:
+        logger.warning(f"Page selection truncated from {len(indexes)} to {max_pages} pages.")
+        indexes = indexes[:max_pages]
+    return indexes
@@ -1,19 +1,73 @@
 import os
+import re
 import fitz  # PyMuPDF
+import cv2
+import numpy as np
 import logging
-from typing import List, Tuple, Optional
+import threading
+from contextlib import contextmanager
+from typing import List, Tuple, Optional, Dict, Any, Union
 try:
     from docling.document_converter import DocumentConverter
     DOCLING_AVAILABLE = True
 except ImportError:
     DOCLING_AVAILABLE = False
 
+from utils.page_selection import parse_page_selection
+
 logger = logging.getLogger(__name__)
 
+# Replacement and control characters show up when a PDF font has no usable text mapping
+_GARBLED_CHARS = re.compile(r"[\ufffd\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+class PDFDocument:
+    """
+    A PDF opened once for a whole request and shared by its page workers.
+    A fitz.Document is not thread-safe, so page access is serialized per document
+    only: other requests render their own documents concurrently.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._doc = fitz.open(path)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            yield self._doc
+
+    def close(self):
+        with self._lock:
+            self._doc.close()
+
+    def __enter__(self) -> "PDFDocument":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Methods reading pages take either a path (opened for that call) or an open PDFDocument
+PDFSource = Union[str, PDFDocument]
+
+@contextmanager
+def _document(pdf: PDFSource):
+    if isinstance(pdf, PDFDocument):
+        with pdf.locked() as doc:
+            yield doc
+    else:
+        with fitz.open(pdf) as doc:
+            yield doc
+
+def _path(pdf: PDFSource) -> str:
+    return pdf.path if isinstance(pdf, PDFDocument) else pdf
+
 class PDFProcessor:
     def __init__(self, output_dir: str = "uploads"):
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
+        # A text layer replaces OCR only if it has enough clean text and spans most of the page content
+        self.text_layer_min_chars = int(os.environ.get("PDF_TEXT_MIN_CHARS", 40))
+        self.text_layer_min_coverage = float(os.environ.get("PDF_TEXT_MIN_COVERAGE", 0.5))
         if DOCLING_AVAILABLE:
             self.converter = DocumentConverter()
             logger.info("Docling initialized for PDF document processing.")
@@ -45,6 +99,96 @@ class PDFProcessor:
             
         return image_paths
 
+    @staticmethod
+    def open(pdf_path: str) -> PDFDocument:
+        """Opens a PDF once for all the page reads of a request; use it as a context manager."""
+        return PDFDocument(pdf_path)
+
+    def page_count(self, pdf: PDFSource) -> int:
+        with _document(pdf) as doc:
+            return len(doc)
+
+    # Kept on the class for existing callers; the parser itself needs no PDF libraries
+    parse_page_selection = staticmethod(parse_page_selection)
+
+    def render_page(self, pdf: PDFSource, page_index: int, dpi: int = 300) -> np.ndarray:
+        """Rasterizes a single page straight into a BGR array, without touching disk."""
+        with _document(pdf) as doc:
+            pix = doc.load_page(page_index).get_pixmap(dpi=dpi, alpha=False)
+            page = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        code = cv2.COLOR_GRAY2BGR if pix.n == 1 else cv2.COLOR_RGB2BGR
+        return cv2.cvtColor(page, code)
+
+    def extract_text_layer(self, pdf: PDFSource, page_index: int) -> Optional[List[str]]:
+        """
+        Reads the embedded text layer of a born-digital page with PyMuPDF.
+        Returns the page lines in reading order when the layer is usable as OCR input,
+        or None when the page has to be rasterized and OCR'd.
+        """
+        pdf_path = _path(pdf)
+        try:
+            with _document(pdf) as doc:
+                if doc.needs_pass:
+                    return None
+                page_dict = doc.load_page(page_index).get_text("dict", sort=True)
+        except Exception as e:
+            logger.warning(f"Text layer read failed for {pdf_path} page {page_index + 1}: {e}")
+            return None
+
+        lines = []
+        text_boxes = []
+        content_boxes = []
+        for block in page_dict.get("blocks", []):
+            content_boxes.append(block["bbox"])
+            if block.get("type") != 0:
+                continue
+            for line in block.get("lines", []):
+                text = " ".join(span.get("text", "").strip() for span in line.get("spans", [])).strip()
+                if text:
+                    lines.append(text)
+                    text_boxes.append(line["bbox"])
+
+        char_count = sum(len(line) for line in lines)
+        if char_count < self.text_layer_min_chars:
+            return None
+        if len(_GARBLED_CHARS.findall("".join(lines))) > 0.1 * char_count:
+            logger.info(f"Text layer of {pdf_path} page {page_index + 1} looks garbled, using OCR.")
+            return None
+
+        coverage = self._box_area(self._union_box(text_boxes)) / max(self._box_area(self._union_box(content_boxes)), 1.0)
+        if coverage < self.text_layer_min_coverage:
+            logger.info(f"Text layer of {pdf_path} page {page_index + 1} covers {coverage:.0%} of the content, using OCR.")
+            return None
+        return lines
+
+    def extract_page_images(self, pdf: PDFSource, page_index: int) -> List[np.ndarray]:
+        """Decodes the raster images embedded in a page (e.g. the holder photo), largest first."""
+        raw_images = []
+        try:
+            with _document(pdf) as doc:
+                for info in doc.load_page(page_index).get_images(full=True):
+                    raw_images.append(doc.extract_image(info[0])["image"])
+        except Exception as e:
+            logger.warning(f"Embedded image extraction failed for {_path(pdf)} page {page_index + 1}: {e}")
+
+        images = []
+        for raw in raw_images:
+            image = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is not None:
+                images.append(image)
+        return sorted(images, key=lambda img: img.shape[0] * img.shape[1], reverse=True)
+
+    @staticmethod
+    def _union_box(boxes) -> Tuple[float, float, float, float]:
+        if not boxes:
+            return 0.0, 0.0, 0.0, 0.0
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+    @staticmethod
+    def _box_area(box) -> float:
+        return max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+
     def extract_structure_docling(self, pdf_path: str) -> Optional[dict]:
         """
         Extract structured layout logic using Docling.
@@ -60,3 +204,60 @@ class PDFProcessor:
         except Exception as e:
              logger.error(f"Docling analysis failed for {pdf_path}: {e}")
              return None
+
+    def extract_layout_docling(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Runs Docling and reduces its output to compact per-page layout blocks.
+        Returns None when Docling is unavailable or fails.
+        """
+        structure = self.extract_structure_docling(pdf_path)
+        if structure is None:
+            return None
+        return self.layout_from_docling(structure)
+
+    @staticmethod
+    def layout_from_docling(structure: dict) -> Dict[str, Any]:
+        """
+        Converts a Docling export into {"pages": {"<page_no>": {"size": [w, h], "blocks": [...]}}}.
+        Each block has a label, its text (empty for tables and pictures) and a bbox
+        [left, top, right, bottom] in PDF points with a top-left origin.
+        """
+        pages = {}
+        for page_no, page in (structure.get("pages") or {}).items():
+            size = page.get("size") or {}
+            pages[str(page_no)] = {"size": [size.get("width", 0.0), size.get("height", 0.0)], "blocks": []}
+
+        for collection in ("texts", "tables", "pictures"):
+            for item in structure.get(collection) or []:
+                for prov in item.get("prov") or []:
+                    page = pages.setdefault(str(prov.get("page_no")), {"size": [0.0, 0.0], "blocks": []})
+                    bbox = prov.get("bbox") or {}
+                    left, top, right, bottom = (float(bbox.get(k, 0.0)) for k in ("l", "t", "r", "b"))
+                    if str(bbox.get("coord_origin", "")).upper().endswith("BOTTOMLEFT"):
+                        top, bottom = page["size"][1] - top, page["size"][1] - bottom
+                    page["blocks"].append({
+                        "label": str(item.get("label", collection)),
+                        "text": (item.get("text") or "").strip() if collection == "texts" else "",
+                        "bbox": [left, min(top, bottom), right, max(top, bottom)],
+                    })
+        return {"pages": pages}
+
+    @staticmethod
+    def layout_text_lines(layout: Dict[str, Any], page_index: int) -> List[str]:
+        """Text lines of a page in Docling reading order."""
+        page = layout.get("pages", {}).get(str(page_index + 1)) or {}
+        return [block["text"] for block in page.get("blocks", []) if block.get("text")]
+
+    @staticmethod
+    def layout_region(layout: Dict[str, Any], page_index: int, dpi: int = 300, margin: int = 40) -> Optional[Tuple[int, int, int, int]]:
+        """Pixel box (x1, y1, x2, y2) enclosing every layout block of a page, at the given render DPI."""
+        page = layout.get("pages", {}).get(str(page_index + 1)) or {}
+        boxes = [block["bbox"] for block in page.get("blocks", [])]
+        if not boxes:
+            return None
+        scale = dpi / 72.0
+        x1 = max(0, int(min(b[0] for b in boxes) * scale) - margin)
+        y1 = max(0, int(min(b[1] for b in boxes) * scale) - margin)
+        x2 = int(max(b[2] for b in boxes) * scale) + margin
+        y2 = int(max(b[3] for b in boxes) * scale) + margin
+        return x1, y1, x2, y2